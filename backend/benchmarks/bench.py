@@ -0,0 +1,304 @@
+"""
+Microbenchmarks for the numeric hot paths.
+
+Times the option pricer, IV solvers, IV history contract selection, screener scoring, feature engineering and
+ML inference on fixed synthetic inputs at several sizes, writes the results as
+JSON and compares them against a stored baseline.
+
+Usage (from the repo root):
+    python backend/benchmarks/bench.py                    # run + compare to baseline
+    python backend/benchmarks/bench.py --update-baseline  # run + store as new baseline
+    python backend/benchmarks/bench.py --quick --filter iv
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(BENCH_DIR))
+
+# Benchmarks never touch the network, but config.py insists on a key
+os.environ.setdefault("POLYGON_API_KEY", "benchmark")
+
+from options_lib import OptionPricingModel, IVEstimator
+import iv_selection
+from screener import Screener
+from ml.features import FeatureEngineer
+
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results.json")
+CONTRACT_SIZES = [1, 1_000, 100_000]
+TICKER_SIZES = [1, 500, 3000]
+# Scalar (per-contract Python loop) APIs are capped; 100k scalar solves take minutes
+SCALAR_MAX = 1_000
+REGRESSION_THRESHOLD = 1.25
+SEED = 42
+
+# --- Synthetic inputs ---
+
+def make_contracts(n: int) -> Dict[str, np.ndarray]:
+    rng = np.random.default_rng(SEED)
+    S = rng.uniform(20, 500, n)
+    K = S * np.exp(rng.normal(0, 0.2, n))
+    T = rng.uniform(7, 800, n) / 365.0
+    sigma = rng.uniform(0.1, 1.2, n)
+    is_call = rng.random(n) < 0.5
+    price = OptionPricingModel.black_scholes_batch(S, K, T, 0.05, sigma, is_call=is_call)
+    return {"S": S, "K": K, "T": T, "sigma": sigma, "is_call": is_call, "price": price}
+
+def make_chain_listing(n: int) -> List[Dict[str, Any]]:
+    """About n reference-data contracts: weekly expiries, call/put pairs on a $1 strike ladder."""
+    n_strikes = 100
+    weeks = max(1, n // (2 * n_strikes))
+    first = datetime(2023, 1, 6)
+    contracts = []
+    for w in range(weeks):
+        exp = (first + pd.Timedelta(weeks=w)).strftime("%Y-%m-%d")
+        for k in range(50, 50 + n_strikes):
+            for kind in ("call", "put"):
+                contracts.append({"ticker": f"O:TST{w}{kind[0].upper()}{k}", "expiration_date": exp,
+                                  "strike_price": float(k), "contract_type": kind})
+    return contracts
+
+def make_details(n: int) -> List[Dict[str, Any]]:
+    rng = np.random.default_rng(SEED)
+    details = []
+    for i in range(n):
+        details.append({
+            "symbol": f"T{i}",
+            "peg_ratio": float(rng.uniform(0.2, 3.0)),
+            "return_on_equity": float(rng.uniform(-0.1, 0.4)),
+            "operating_margins": float(rng.uniform(-0.1, 0.4)),
+            "debt_to_equity": float(rng.uniform(0, 3)),
+            "current_price": float(rng.uniform(10, 500)),
+            "target_mean": float(rng.uniform(10, 600)),
+            "iv_rank": float(rng.uniform(0, 1)),
+            "iv_short": float(rng.uniform(0.1, 0.8)),
+            "historical_volatility": float(rng.uniform(0.1, 0.8)),
+            "insider_net_shares": float(rng.normal(0, 1000)),
+        })
+    return details
+
+def make_ohlcv(days: int = 300, seed: int = SEED) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+    return pd.DataFrame({
+        "date": pd.date_range("2023-01-02", periods=days, freq="B"),
+        "open": close * (1 + rng.normal(0, 0.005, days)),
+        "high": close * 1.01,
+        "low": close * 0.99,
+        "close": close,
+        "volume": rng.integers(1_000, 100_000, days).astype(float),
+    })
+
+# --- Benchmark cases ---
+# Each case: (name, size, setup) where setup() returns the zero-arg callable to time.
+
+def build_cases(quick: bool = False) -> List[Tuple[str, int, Callable[[], Callable[[], Any]]]]:
+    contract_sizes = CONTRACT_SIZES[:2] if quick else CONTRACT_SIZES
+    ticker_sizes = TICKER_SIZES[:2] if quick else TICKER_SIZES
+    cases = []
+
+    for n in contract_sizes:
+        def pricing_batch(n=n):
+            c = make_contracts(n)
+            return lambda: OptionPricingModel.black_scholes_batch(c["S"], c["K"], c["T"], 0.05, c["sigma"], is_call=c["is_call"])
+        cases.append(("pricing.black_scholes_batch", n, pricing_batch))
+
+        def iv_batch(n=n):
+            c = make_contracts(n)
+            return lambda: IVEstimator.impl_vol_batch(c["price"], c["S"], c["K"], c["T"], 0.05, is_call=c["is_call"])
+        cases.append(("iv.impl_vol_batch", n, iv_batch))
+
+        if n <= SCALAR_MAX:
+            def pricing_scalar(n=n):
+                c = make_contracts(n)
+                rows = list(zip(c["S"], c["K"], c["T"], c["sigma"], c["is_call"]))
+                def run():
+                    for s, k, t, sig, call in rows:
+                        if call:
+                            OptionPricingModel.black_scholes_call(s, k, t, 0.05, sig)
+                        else:
+                            OptionPricingModel.black_scholes_put(s, k, t, 0.05, sig)
+                return run
+            cases.append(("pricing.black_scholes_scalar", n, pricing_scalar))
+
+            def iv_scalar(n=n):
+                c = make_contracts(n)
+                rows = list(zip(c["price"], c["S"], c["K"], c["T"], c["is_call"]))
+                def run():
+                    for p, s, k, t, call in rows:
+                        if call:
+                            IVEstimator.impl_vol_call(p, s, k, t, 0.05)
+                        else:
+                            IVEstimator.impl_vol_put(p, s, k, t, 0.05)
+                return run
+            cases.append(("iv.impl_vol_scalar", n, iv_scalar))
+
+        if n > 1:
+            def plan_history(n=n):
+                contracts = make_chain_listing(n)
+                ohlcv = make_ohlcv(days=250)
+                history = pd.DataFrame({"Close": ohlcv["close"].to_numpy()}, index=ohlcv["date"])
+                return lambda: iv_selection.plan_iv_history(contracts, history)
+            cases.append(("iv.plan_iv_history", n, plan_history))
+
+    for n in ticker_sizes:
+        def score(n=n):
+            screener = Screener(data_provider=None)
+            details = make_details(n)
+            p_fcf = np.random.default_rng(SEED).uniform(-5, 40, n)
+            def run():
+                for d, pf in zip(details, p_fcf):
+                    screener._calculate_score(d, pf, 0.1)
+            return run
+        cases.append(("screener.calculate_score", n, score))
+
+        def features(n=n):
+            engineer = FeatureEngineer()
+            frames = [make_ohlcv(seed=SEED + i % 50) for i in range(n)]
+            def run():
+                for df in frames:
+                    engineer.generate_features(df.copy())
+            return run
+        cases.append(("features.generate_features", n, features))
+
+        def predict(n=n):
+            from ml.predict import Predictor
+            predictor = Predictor()
+            if predictor.model is None:
+                return None
+            frames = [make_ohlcv(seed=SEED + i % 50) for i in range(n)]
+            def run():
+                for i, df in enumerate(frames):
+                    predictor.predict_one(f"T{i}", df)
+            return run
+        cases.append(("predict.predict_one", n, predict))
+
+    return cases
+
+# --- Runner ---
+
+def time_callable(fn: Callable[[], Any], repeat: int, min_time: float = 0.2, slow_run: float = 2.0) -> Dict[str, float]:
+    """
+    Run fn at least `repeat` times (and at least min_time seconds), return stats in seconds.
+    Cases slower than slow_run seconds count the warm-up and stop after two samples.
+    """
+    t0 = time.perf_counter()
+    fn()  # warm-up
+    warmup = time.perf_counter() - t0
+    samples = []
+    if warmup > slow_run:
+        samples.append(warmup)
+        repeat = min(repeat, 2)
+    start = time.perf_counter()
+    while len(samples) < repeat or (time.perf_counter() - start < min_time and len(samples) < 100):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "runs": len(samples),
+    }
+
+def run_benchmarks(quick: bool = False, name_filter: Optional[str] = None, repeat: int = 5) -> Dict[str, Any]:
+    results = {}
+    for name, size, setup in build_cases(quick):
+        if name_filter and name_filter not in name:
+            continue
+        key = f"{name}[{size}]"
+        fn = setup()
+        if fn is None:
+            print(f"  {key:<45} skipped (unavailable)")
+            continue
+        stats = time_callable(fn, repeat=repeat)
+        stats["size"] = size
+        stats["per_item_us"] = stats["median_s"] / size * 1e6
+        results[key] = stats
+        print(f"  {key:<45} {stats['median_s'] * 1e3:10.3f} ms  ({stats['per_item_us']:.2f} us/item)")
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = REGRESSION_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Compare median timings against a baseline.
+    Returns one row per benchmark present in both, with status
+    "regression" (slower than threshold x baseline), "improved" (faster than
+    baseline / threshold) or "ok".
+    """
+    rows = []
+    base_results = baseline.get("results", {})
+    for key, stats in current.get("results", {}).items():
+        base = base_results.get(key)
+        if not base or not base.get("median_s"):
+            continue
+        ratio = stats["median_s"] / base["median_s"]
+        if ratio > threshold:
+            status = "regression"
+        elif ratio < 1.0 / threshold:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append({"name": key, "baseline_s": base["median_s"], "current_s": stats["median_s"],
+                     "ratio": ratio, "status": status})
+    return rows
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run numeric hot-path microbenchmarks.")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write this run's JSON results")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Slowdown ratio flagged as a regression")
+    parser.add_argument("--quick", action="store_true", help="Skip the largest sizes")
+    parser.add_argument("--filter", dest="name_filter", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--repeat", type=int, default=5, help="Minimum timed runs per benchmark")
+    args = parser.parse_args(argv)
+
+    print("Running benchmarks...")
+    current = run_benchmarks(quick=args.quick, name_filter=args.name_filter, repeat=args.repeat)
+    with open(args.output, "w") as f:
+        json.dump(current, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found. Run with --update-baseline to create one.")
+        return 0
+
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    rows = compare(current, baseline, args.threshold)
+    regressions = [r for r in rows if r["status"] == "regression"]
+    print(f"\nComparison against {args.baseline} (threshold {args.threshold:.2f}x):")
+    for r in rows:
+        print(f"  {r['name']:<45} {r['ratio']:6.2f}x  {r['status']}")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) detected.")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Daily price history for many symbols at once.
+
+yf.download takes a list of tickers and returns one wide frame with
+(field, symbol) columns. download_history pulls the universe in chunks of
+BULK_HISTORY_CHUNK symbols, and BulkHistory keeps the result as a single
+(days, fields, symbols) array that per-symbol frames are views into. The
+ingestion run hands each worker its symbol's frame (HV, term structure, IV
+history) and the ML loader validates and saves them, instead of one history
+request per symbol.
+"""
+from datetime import date, datetime
+from typing import Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from config import BULK_HISTORY_CHUNK
+from http_session import get_yf_session
+
+class BulkHistory:
+    """
+    Bars of many symbols on a shared date index. values is (days, fields, symbols);
+    rows a symbol did not trade (not yet listed, delisted, failed download) are NaN.
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        """frame: columns (field, symbol), as yf.download(group_by="column") returns."""
+        if frame.columns.nlevels != 2:
+            raise ValueError("Expected (field, symbol) columns")
+        self.fields: List[str] = list(dict.fromkeys(frame.columns.get_level_values(0)))
+        self.symbols: List[str] = list(dict.fromkeys(frame.columns.get_level_values(1)))
+        self.index = frame.index
+        full = pd.MultiIndex.from_product([self.fields, self.symbols])
+        # The one copy: the whole universe into a contiguous float block
+        self.values = (frame.reindex(columns=full).to_numpy(dtype=float)
+                       .reshape(len(frame.index), len(self.fields), len(self.symbols)))
+        self._column = {s: j for j, s in enumerate(self.symbols)}
+        self._close = self.fields.index("Close") if "Close" in self.fields else 0
+
+    @classmethod
+    def concat(cls, frames: Iterable[pd.DataFrame]) -> "BulkHistory":
+        """Join chunk downloads on the union of their dates."""
+        frames = [f for f in frames if f is not None and not f.empty]
+        if not frames:
+            return cls(pd.DataFrame(columns=pd.MultiIndex.from_tuples([], names=["Price", "Ticker"])))
+        wide = pd.concat(frames, axis=1, sort=True)
+        return cls(wide.loc[:, ~wide.columns.duplicated()])
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._column
+
+    def array(self, symbol: str, field: str = "Close") -> np.ndarray:
+        """One field of one symbol over the full index (a view, NaN where not traded)."""
+        return self.values[:, self.fields.index(field), self._column[symbol]]
+
+    def frame(self, symbol: str) -> pd.DataFrame:
+        """
+        The symbol's bars as a DataFrame like Ticker.history returns: only the
+        days it has a close. A view into values unless the symbol has holes
+        in the middle of its history (then those rows are dropped, a copy).
+        Empty if the symbol is unknown or has no data.
+        """
+        j = self._column.get(symbol)
+        if j is None:
+            return pd.DataFrame(columns=self.fields)
+        traded = np.isfinite(self.values[:, self._close, j])
+        rows = np.flatnonzero(traded)
+        if rows.size == 0:
+            return pd.DataFrame(columns=self.fields)
+        span = slice(rows[0], rows[-1] + 1)
+        block, index = self.values[span, :, j], self.index[span]
+        if rows.size < rows[-1] + 1 - rows[0]:
+            keep = traded[span]
+            block, index = block[keep], index[keep]
+        return pd.DataFrame(block, index=index, columns=self.fields, copy=False)
+
+def _download_chunk(symbols: List[str], **kwargs) -> pd.DataFrame:
+    data = yf.download(symbols, group_by="column", progress=False, threads=True,
+                       session=get_yf_session(), **kwargs)
+    if data is None or data.empty:
+        return None
+    if data.columns.nlevels == 1:
+        # Single-symbol downloads can come back with flat columns
+        data = data.set_axis(pd.MultiIndex.from_product([data.columns, symbols]), axis=1)
+    return data
+
+def download_history(symbols: Iterable[str], chunk_size: int = None,
+                     start: Union[str, date, datetime] = None, end: Union[str, date, datetime] = None,
+                     period: Optional[str] = None, actions: bool = False) -> BulkHistory:
+    """
+    Daily bars for symbols, chunk_size (default BULK_HISTORY_CHUNK) symbols per
+    yf.download call. Pass period ("1y", ...) or start/end. A chunk that fails
+    is reported and left out; its symbols come back empty.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    chunk_size = chunk_size or BULK_HISTORY_CHUNK
+    kwargs = {"actions": actions}
+    if period:
+        kwargs["period"] = period
+    else:
+        kwargs.update(start=start, end=end)
+
+    frames = []
+    for i in range(0, len(symbols), chunk_size):
+        chunk = symbols[i:i + chunk_size]
+        try:
+            frames.append(_download_chunk(chunk, **kwargs))
+        except Exception as e:
+            print(f"Bulk history download failed for {chunk[0]}..{chunk[-1]}: {e}")
+    return BulkHistory.concat(frames)
@@ -29,3 +29,66 @@ if not POLYGON_API_KEY:
 
 # Feature Flags
 ENABLE_IV_RANK = os.getenv("ENABLE_IV_RANK", "False").lower() == "true"
+
+# Data Caches
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+IV_SURFACE_CACHE_DIR = os.getenv("IV_SURFACE_CACHE_DIR", os.path.join(DATA_DIR, "iv_surfaces"))
+SVI_PARAMS_DIR = os.getenv("SVI_PARAMS_DIR", os.path.join(DATA_DIR, "svi"))
+ENABLE_SVI_SMOOTHING = os.getenv("ENABLE_SVI_SMOOTHING", "True").lower() == "true"
+
+# Polygon HTTP response cache
+ENABLE_HTTP_CACHE = os.getenv("ENABLE_HTTP_CACHE", "True").lower() == "true"
+HTTP_CACHE_PATH = os.getenv("HTTP_CACHE_PATH", os.path.join(DATA_DIR, "http_cache.sqlite"))
+HTTP_CACHE_MAX_MB = int(os.getenv("HTTP_CACHE_MAX_MB", "1024"))
+
+# HTTP transport: concurrent Polygon requests per process, and the keep-alive pool that serves them
+POLYGON_MAX_CONCURRENCY = int(os.getenv("POLYGON_MAX_CONCURRENCY", "4"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", str(POLYGON_MAX_CONCURRENCY)))
+# Requests in flight at once through one async Polygon client
+POLYGON_MAX_IN_FLIGHT = int(os.getenv("POLYGON_MAX_IN_FLIGHT", "64"))
+
+# Shared rate limits (token buckets in a SQLite file used by every worker process)
+ENABLE_RATE_LIMITER = os.getenv("ENABLE_RATE_LIMITER", "True").lower() == "true"
+RATE_LIMITER_PATH = os.getenv("RATE_LIMITER_PATH", os.path.join(DATA_DIR, "rate_limits.sqlite"))
+# bucket -> (requests per second, burst)
+RATE_LIMITS = {
+    "polygon.reference": (float(os.getenv("POLYGON_REFERENCE_RPS", "20")), 20),
+    "polygon.aggs": (float(os.getenv("POLYGON_AGGS_RPS", "50")), 50),
+    "polygon.snapshot": (float(os.getenv("POLYGON_SNAPSHOT_RPS", "50")), 50),
+    "yahoo": (float(os.getenv("YAHOO_RPS", "4")), 8),
+}
+
+# Current IV from one paged chain snapshot (quotes included) instead of contract listing + per-contract snapshots
+CURRENT_IV_FROM_CHAIN = os.getenv("CURRENT_IV_FROM_CHAIN", "False").lower() == "true"
+
+# Local options contract reference index
+ENABLE_CONTRACT_INDEX = os.getenv("ENABLE_CONTRACT_INDEX", "True").lower() == "true"
+CONTRACT_INDEX_PATH = os.getenv("CONTRACT_INDEX_PATH", os.path.join(DATA_DIR, "contracts.sqlite"))
+
+# Daily option closes loaded from Polygon flat files (see flat_files.py)
+FLAT_FILES_DIR = os.getenv("FLAT_FILES_DIR", os.path.join(DATA_DIR, "flat_files", "us_options_opra", "day_aggs_v1"))
+OPTION_BARS_STORE_DIR = os.getenv("OPTION_BARS_STORE_DIR", os.path.join(DATA_DIR, "option_bars"))
+ENABLE_OPTION_BARS_STORE = os.getenv("ENABLE_OPTION_BARS_STORE", "True").lower() == "true"
+
+# Symbols per multi-ticker Yahoo history download (see bulk_history.py)
+BULK_HISTORY_CHUNK = int(os.getenv("BULK_HISTORY_CHUNK", "100"))
+
+# Local daily OHLCV store (see price_store.py), kept current by ingestion
+ENABLE_PRICE_STORE = os.getenv("ENABLE_PRICE_STORE", "True").lower() == "true"
+PRICE_STORE_DIR = os.getenv("PRICE_STORE_DIR", os.path.join(DATA_DIR, "prices"))
+# Calendar days loaded for a symbol new to the store (covers the ML loader's 2.5 years)
+PRICE_STORE_HISTORY_DAYS = int(os.getenv("PRICE_STORE_HISTORY_DAYS", "1100"))
+
+# Where ingest gets its data: live, record (live, HTTP responses saved to REPLAY_ARCHIVE), replay (REPLAY_ARCHIVE, offline)
+# or synthetic (a generated universe, offline)
+DATA_PROVIDER = os.getenv("DATA_PROVIDER", "live").lower()
+REPLAY_ARCHIVE = os.getenv("REPLAY_ARCHIVE", os.path.join(DATA_DIR, "replay.sqlite"))
+# Replayed requests sleep for their recorded latency times this factor (0: no delay)
+REPLAY_LATENCY_SCALE = float(os.getenv("REPLAY_LATENCY_SCALE", "0"))
+
+# DATA_PROVIDER=synthetic: a generated universe for load tests (see synthetic.py)
+SYNTHETIC_SYMBOLS = int(os.getenv("SYNTHETIC_SYMBOLS", "3000"))
+SYNTHETIC_SEED = int(os.getenv("SYNTHETIC_SEED", "0"))
+# Mean injected latency per upstream call, and the fraction of calls that fail
+SYNTHETIC_LATENCY_MS = float(os.getenv("SYNTHETIC_LATENCY_MS", "0"))
+SYNTHETIC_ERROR_RATE = float(os.getenv("SYNTHETIC_ERROR_RATE", "0"))
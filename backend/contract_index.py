@@ -0,0 +1,164 @@
+import os
+import sqlite3
+import logging
+import threading
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTRACTS_ENDPOINT = "/v3/reference/options/contracts"
+# Columns kept per contract, named as in Polygon's reference API
+FIELDS = ("ticker", "underlying_ticker", "expiration_date", "strike_price", "contract_type",
+          "exercise_style", "shares_per_contract")
+
+# Open-ended listings (active chains) are windowed out to this horizon, then one last open window
+LISTING_HORIZON_DAYS = 3 * 365
+MAX_LISTING_WINDOWS = 32
+# The index keeps active contracts out to the farthest LEAPs (Januaries listed up to ~2.7 years out)
+LEAPS_HORIZON_DAYS = 1000
+
+def expiration_windows(start: date, end: Optional[date], first_days: int,
+                       max_windows: int = MAX_LISTING_WINDOWS,
+                       doubling: bool = False) -> List[Tuple[date, Optional[date]]]:
+    """
+    Split expirations [start, end] into non-overlapping inclusive windows for
+    parallel listing. A bounded range (e.g. expired contracts, listed about
+    evenly over time) gets equal windows of first_days, widened to stay under
+    max_windows. An open range (end None), or a bounded one with doubling (the
+    active chain: dense weeklies up front, sparse LEAPs later), gets windows
+    doubling from first_days, the last one ending at end or open-ended.
+    """
+    first_days = max(1, first_days)
+    windows = []
+    if end is not None and not doubling:
+        span = (end - start).days + 1
+        size = max(first_days, -(-span // max_windows))
+        lo = start
+        while lo <= end:
+            hi = min(end, lo + timedelta(days=size - 1))
+            windows.append((lo, hi))
+            lo = hi + timedelta(days=1)
+        return windows
+
+    horizon = end if end is not None else start + timedelta(days=LISTING_HORIZON_DAYS)
+    lo, size = start, first_days
+    while lo <= horizon and len(windows) < max_windows - 1:
+        hi = lo + timedelta(days=size - 1)
+        if end is not None and hi >= end:
+            break
+        windows.append((lo, hi))
+        lo, size = hi + timedelta(days=1), size * 2
+    if end is None or lo <= end:
+        windows.append((lo, end))
+    return windows
+
+class ContractIndex:
+    """
+    Local SQLite copy of Polygon's options contract reference data, indexed by
+    (underlying, expiration, strike, type).
+
+    A contract's terms never change and an expired contract never reappears,
+    so sync() only asks Polygon for what can have changed since the last sync:
+    contracts that expired in between, and the current active chain out to
+    horizon_days (which picks up newly listed contracts, including new strikes
+    on listed expiries). Both are merged with INSERT OR IGNORE. Lookups are
+    then local range queries over lookback_days back to horizon_days ahead.
+    """
+
+    def __init__(self, path: str, lookback_days: int = 400, horizon_days: int = LEAPS_HORIZON_DAYS):
+        self.path = path
+        self.lookback_days = lookback_days
+        self.horizon_days = horizon_days
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS contracts ("
+                " ticker TEXT PRIMARY KEY, underlying_ticker TEXT NOT NULL, expiration_date TEXT NOT NULL,"
+                " strike_price REAL NOT NULL, contract_type TEXT NOT NULL,"
+                " exercise_style TEXT, shares_per_contract INTEGER)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_contracts_chain"
+                " ON contracts(underlying_ticker, expiration_date, strike_price, contract_type)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sync_state ("
+                " underlying_ticker TEXT PRIMARY KEY, expired_through TEXT NOT NULL, active_synced_on TEXT NOT NULL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def sync_state(self, underlying: str) -> Optional[Dict[str, str]]:
+        row = self._conn().execute(
+            "SELECT expired_through, active_synced_on FROM sync_state WHERE underlying_ticker = ?", (underlying,)
+        ).fetchone()
+        return {"expired_through": row[0], "active_synced_on": row[1]} if row else None
+
+    def sync(self, underlying: str, list_contracts: Callable[[Dict[str, Any]], List[Dict[str, Any]]],
+             today: date = None) -> int:
+        """
+        Bring one underlying up to date. list_contracts(params) must return every
+        result of a (paged) /v3/reference/options/contracts query.
+        At most once per day; returns the number of contracts added.
+        """
+        today = today or date.today()
+        state = self.sync_state(underlying)
+        if state and state["active_synced_on"] == today.isoformat():
+            return 0
+
+        yesterday = today - timedelta(days=1)
+        expired_from = (date.fromisoformat(state["expired_through"]) if state
+                        else today - timedelta(days=self.lookback_days))
+        base = {"underlying_ticker": underlying, "limit": 1000, "sort": "expiration_date", "order": "asc"}
+
+        # Expired since the last sync; a closed date range, so the response never changes
+        fetched = list_contracts({**base, "expired": "true",
+                                  "expiration_date.gte": expired_from.isoformat(),
+                                  "expiration_date.lte": yesterday.isoformat()})
+        fetched += list_contracts({**base, "expired": "false",
+                                   "expiration_date.gte": today.isoformat(),
+                                   "expiration_date.lte": (today + timedelta(days=self.horizon_days)).isoformat()})
+
+        rows = [tuple(c.get(f) for f in FIELDS) for c in fetched
+                if c.get("ticker") and c.get("expiration_date") and c.get("strike_price") is not None]
+        with self._conn() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                f"INSERT OR IGNORE INTO contracts ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})", rows
+            )
+            added = conn.total_changes - before
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state (underlying_ticker, expired_through, active_synced_on) VALUES (?, ?, ?)",
+                (underlying, yesterday.isoformat(), today.isoformat()),
+            )
+        logger.debug(f"Contract index sync for {underlying}: {len(rows)} fetched, {added} new")
+        return added
+
+    def contracts(self, underlying: str, exp_from: str = None, exp_to: str = None,
+                  min_strike: float = None, max_strike: float = None,
+                  contract_type: str = None) -> List[Dict[str, Any]]:
+        """
+        Contracts of one underlying filtered by expiration (inclusive ISO dates),
+        strike range and type. Sorted by expiration, strike, type.
+        """
+        clauses, args = ["underlying_ticker = ?"], [underlying]
+        for clause, value in (("expiration_date >= ?", exp_from), ("expiration_date <= ?", exp_to),
+                              ("strike_price >= ?", min_strike), ("strike_price <= ?", max_strike),
+                              ("contract_type = ?", contract_type)):
+            if value is not None:
+                clauses.append(clause)
+                args.append(value)
+        cursor = self._conn().execute(
+            f"SELECT {', '.join(FIELDS)} FROM contracts WHERE {' AND '.join(clauses)}"
+            " ORDER BY expiration_date, strike_price, contract_type", args
+        )
+        return [dict(zip(FIELDS, row)) for row in cursor]
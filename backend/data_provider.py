@@ -1,11 +1,28 @@
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional, List
 import yfinance as yf
-import requests
-from datetime import datetime, timedelta
-from config import POLYGON_API_KEY
-from options_lib import IVEstimator, OptionPricingModel
-from utils import retry_with_backoff
+from datetime import datetime, timedelta, date
+import os
+from config import (POLYGON_API_KEY, IV_SURFACE_CACHE_DIR, SVI_PARAMS_DIR, ENABLE_SVI_SMOOTHING,
+                    ENABLE_HTTP_CACHE, HTTP_CACHE_PATH, HTTP_CACHE_MAX_MB,
+                    ENABLE_CONTRACT_INDEX, CONTRACT_INDEX_PATH, CURRENT_IV_FROM_CHAIN,
+                    ENABLE_OPTION_BARS_STORE, OPTION_BARS_STORE_DIR, POLYGON_MAX_CONCURRENCY,
+                    ENABLE_PRICE_STORE, PRICE_STORE_DIR)
+from iv_surface import IVSurface
+from svi import SVICalibrator
+from http_cache import ResponseCache, cache_key, ttl_for
+from contract_index import ContractIndex, CONTRACTS_ENDPOINT, expiration_windows
+from http_session import get_session, get_yf_session, parse_json
+from polygon_async import AsyncPolygonClient, POLYGON_RETRY
+from rate_limiter import get_rate_limiter, polygon_bucket
+import iv_selection
+from utils import RetryPolicy, RETRY_BUDGET, get_circuit_breaker, http_status
+from occ import ChainModel, build_occ_ticker
+from option_chain import OptionChain
+from flat_files import OptionBarStore
+from price_store import PriceStore, period_start
+from run_memo import memoized
+from replay import taping
 import concurrent.futures
 import pandas as pd
 import numpy as np
@@ -23,10 +40,38 @@ class DataProvider(ABC):
     def get_advanced_metrics(self, symbol: str, include_iv_rank: bool = True) -> Dict[str, Any]:
         pass
 
+# Missing symbols and parse errors fail fast; throttling and outages back off
+YAHOO_RETRY = RetryPolicy("yahoo", retries=4, backoff_in_seconds=2, max_backoff=30, maximize_jitter=False,
+                          budget=RETRY_BUDGET, breaker=get_circuit_breaker("yahoo"))
+
+def _yf_ticker(symbol: str) -> Any:
+    """yf.Ticker bound to this process's shared session."""
+    return yf.Ticker(symbol, session=get_yf_session())
+
 class YFinanceProvider(DataProvider):
-    @retry_with_backoff(retries=10, backoff_in_seconds=2)
+    def __init__(self):
+        self._prefetched: Dict[tuple, pd.DataFrame] = {}
+        self._price_store = None
+
+    @property
+    def price_store(self) -> Optional[PriceStore]:
+        if self._price_store is None and ENABLE_PRICE_STORE and os.path.isdir(PRICE_STORE_DIR) and not taping():
+            self._price_store = PriceStore(PRICE_STORE_DIR)
+        return self._price_store
+
+    def _stored(self, symbol: str) -> Optional[PriceStore]:
+        """The price store, if it holds symbol through the last closed session."""
+        store = self.price_store
+        return store if store is not None and store.is_fresh(symbol) else None
+
+    def prefetch_history(self, symbol: str, hist: pd.DataFrame, period: str = "1y"):
+        """Serve the next get_history(symbol, period) from hist (e.g. a bulk_history download)."""
+        self._prefetched[(symbol, period)] = hist
+
+    @memoized("info")
+    @YAHOO_RETRY
     def get_ticker_details(self, symbol: str) -> Dict[str, Any]:
-        ticker = yf.Ticker(symbol)
+        ticker = _yf_ticker(symbol)
         info = ticker.info
         return {
             "symbol": symbol,
@@ -51,18 +96,49 @@ class YFinanceProvider(DataProvider):
             "total_revenue": info.get("totalRevenue"),
         }
 
-    @retry_with_backoff(retries=10, backoff_in_seconds=2)
+    @memoized("options")
+    @YAHOO_RETRY
     def get_options_chain(self, symbol: str) -> Dict[str, Any]:
-        ticker = yf.Ticker(symbol)
+        ticker = _yf_ticker(symbol)
         expirations = ticker.options
         return {
             "symbol": symbol,
             "expirations": expirations
         }
 
-    @retry_with_backoff(retries=10, backoff_in_seconds=2)
-    def get_advanced_metrics(self, symbol: str, include_iv_rank: bool = True) -> Dict[str, Any]:
-        ticker = yf.Ticker(symbol)
+    @memoized("history")
+    @YAHOO_RETRY
+    def get_history(self, symbol: str, period: str = "1y") -> pd.DataFrame:
+        """Daily OHLCV. Shared within a run: treat as read-only."""
+        hist = self._prefetched.pop((symbol, period), None)
+        if hist is not None and not hist.empty:
+            return hist
+        store, start = self._stored(symbol), period_start(period, date.today())
+        if store is not None and start is not None:
+            hist = store.read(symbol, start=start)
+            if not hist.empty:
+                return hist
+        return _yf_ticker(symbol).history(period=period)
+
+    @YAHOO_RETRY
+    def get_history_range(self, symbol: str, start: date, end: date) -> pd.DataFrame:
+        """Daily OHLCV for start <= day < end, from the price store when it is current."""
+        store = self._stored(symbol)
+        if store is not None:
+            hist = store.read(symbol, start=start, end=end - timedelta(days=1))
+            if not hist.empty:
+                return hist
+        return _yf_ticker(symbol).history(start=start.strftime('%Y-%m-%d'), end=end.strftime('%Y-%m-%d'))
+
+    @memoized("chain")
+    @YAHOO_RETRY
+    def get_option_chain_frames(self, symbol: str, expiration: str) -> Any:
+        """Yahoo calls/puts frames for one expiry. Shared within a run: treat as read-only."""
+        return _yf_ticker(symbol).option_chain(expiration)
+
+    @YAHOO_RETRY
+    def get_advanced_metrics(self, symbol: str, include_iv_rank: bool = True, include_term_structure: bool = True) -> Dict[str, Any]:
+        ticker = _yf_ticker(symbol)
         metrics = {
             "insider_net_shares": None,
             "historical_volatility": None,
@@ -82,18 +158,29 @@ class YFinanceProvider(DataProvider):
             print(f"Error fetching insider data for {symbol}: {e}")
 
         # 2. Historical Volatility
+        hist = None
         try:
-            hist = ticker.history(period="1y")
+            hist = self.get_history(symbol, period="1y")
             if not hist.empty and len(hist) > 200:
-                hist['Log_Ret'] = np.log(hist['Close'] / hist['Close'].shift(1))
-                daily_std = hist['Log_Ret'].std()
+                log_ret = np.log(hist['Close'] / hist['Close'].shift(1))
+                daily_std = log_ret.std()
                 metrics["historical_volatility"] = daily_std * np.sqrt(252)
         except Exception as e:
             print(f"Error fetching HV for {symbol}: {e}")
 
         # 3. IV Term Structure
+        if include_term_structure and hist is not None and not hist.empty:
+            metrics.update(self.get_term_structure(symbol, hist['Close'].iloc[-1]))
+
+        return metrics
+
+    def get_term_structure(self, symbol: str, current_price: float) -> Dict[str, Any]:
+        """
+        ATM IV of the expiries nearest 30 and 365 days, read from Yahoo option chains.
+        """
+        metrics = {}
         try:
-            expirations = ticker.options
+            expirations = self.get_options_chain(symbol)["expirations"]
             if expirations and len(expirations) > 1:
                 today = datetime.now()
                 exp_dates = []
@@ -111,12 +198,11 @@ class YFinanceProvider(DataProvider):
                     
                     if long_term[0] > 180: 
                         def get_atm_iv(exp_date_str):
-                            opts = ticker.option_chain(exp_date_str)
+                            opts = self.get_option_chain_frames(symbol, exp_date_str)
                             calls = opts.calls
-                            curr = hist['Close'].iloc[-1]
                             calls = calls[calls['impliedVolatility'] > 0]
                             if calls.empty: return None
-                            closest_row = calls.iloc[(calls['strike'] - curr).abs().argsort()[:1]]
+                            closest_row = calls.iloc[(calls['strike'] - current_price).abs().argsort()[:1]]
                             if not closest_row.empty:
                                 return closest_row.iloc[0]['impliedVolatility']
                             return None
@@ -132,24 +218,74 @@ class YFinanceProvider(DataProvider):
 
         return metrics
 
+# OCC ticker guessing for get_current_iv: how far back chains are learned from,
+# and how many (expiry, strike) guesses are tried before listing the chain
+OCC_MODEL_LOOKBACK_DAYS = 120
+OCC_MAX_PROBES = 4
+# Contract listings with a window this deep (in pages) are reported
+LISTING_PAGES_WARN = 3
+
 class PolygonProvider(DataProvider):
     BASE_URL = "https://api.polygon.io"
 
     def __init__(self):
         self.api_key = POLYGON_API_KEY
+        self._surface_cache = {}
+        self._chain_cache = {}
+        self._http_cache = None
+        self._contract_index = None
+        self._option_bar_store = None
+        self.listing_pages = {}  # (symbol, expired) -> [(expiration gte, lte, pages)] of its last such listing
+
+    @property
+    def http_cache(self) -> Optional[ResponseCache]:
+        # Opened lazily so constructing a provider never touches disk. Off while
+        # requests are recorded or replayed (see replay.py), like the stores below.
+        if self._http_cache is None and ENABLE_HTTP_CACHE and not taping():
+            self._http_cache = ResponseCache(HTTP_CACHE_PATH, HTTP_CACHE_MAX_MB * 1024 * 1024)
+        return self._http_cache
+
+    @property
+    def option_bar_store(self) -> Optional[OptionBarStore]:
+        if (self._option_bar_store is None and ENABLE_OPTION_BARS_STORE and os.path.isdir(OPTION_BARS_STORE_DIR)
+                and not taping()):
+            self._option_bar_store = OptionBarStore(OPTION_BARS_STORE_DIR)
+        return self._option_bar_store
+
+    @property
+    def contract_index(self) -> Optional[ContractIndex]:
+        if self._contract_index is None and ENABLE_CONTRACT_INDEX and not taping():
+            self._contract_index = ContractIndex(CONTRACT_INDEX_PATH)
+        return self._contract_index
+
+    def _get_json(self, endpoint: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
+        params = dict(params or {})
+        cache = self.http_cache
+        if cache is None:
+            return self._fetch_json(endpoint, params)[0]
 
-    @retry_with_backoff(retries=10, backoff_in_seconds=1, maximize_jitter=True)
-    def _get_json(self, endpoint: str, params: Dict[str, Any] = {}) -> Dict[str, Any]:
-        params["apiKey"] = self.api_key
+        key = cache_key(endpoint, params)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        data, content = self._fetch_json(endpoint, params)
+        cache.put(key, content, ttl_for(endpoint, params))
+        return data
+
+    @POLYGON_RETRY
+    def _fetch_json(self, endpoint: str, params: Dict[str, Any]):
+        """Network fetch (or the replay tape's, through get_session). Returns (parsed json, raw body)."""
         url = f"{self.BASE_URL}{endpoint}"
-        # Removed try/except to allow retry_with_backoff to work.
+        limiter = get_rate_limiter()
+        if limiter:
+            limiter.acquire(polygon_bucket(endpoint))
+        # Errors propagate so POLYGON_RETRY can classify and retry them.
         # Added timeout to prevent hanging.
-        resp = requests.get(url, params=params, timeout=10)
+        resp = get_session().get(url, params={**params, "apiKey": self.api_key}, timeout=10)
         resp.raise_for_status()
-        return resp.json()
+        return parse_json(resp.content), resp.content
             
     def _get_all_contracts(self, symbol: str, min_strike: float=None, max_strike: float=None) -> List[Dict[str, Any]]:
-        contracts = []
         start_date = (datetime.now() - timedelta(days=400)).strftime("%Y-%m-%d")
         params = {
             "underlying_ticker": symbol,
@@ -161,41 +297,99 @@ class PolygonProvider(DataProvider):
         }
         if min_strike: params["strike_price.gte"] = min_strike
         if max_strike: params["strike_price.lte"] = max_strike
-        url = "/v3/reference/options/contracts"
-        
-        # We need to fetch both expired AND active. 
-        # Polygon API might filter if expired=true is distinct from "all" or active.
-        # Actually, "expired" param: "Query for expired contracts. Default is false."
-        # If we set true, do we get ONLY expired?
-        # Docs say: "If true, search expired options. If false, search active options."
-        # So we likely need TWO loops or two requests? Or is there a way to get both?
-        # Usually it's exclusive. Let's fetch expired first, then active.
-        
+
+        # "expired" is exclusive: true searches only expired contracts, false only active ones.
         # 1. Fetch Expired
-        self._fetch_contracts_loop(url, params.copy(), contracts, symbol)
-        
-        # 2. Fetch Active (remove expired param or set to false)
-        active_params = params.copy()
-        active_params["expired"] = "false"
-        self._fetch_contracts_loop(url, active_params, contracts, symbol)
-            
+        contracts = self._list_contracts(params)
+
+        # 2. Fetch Active
+        contracts += self._list_contracts({**params, "expired": "false"})
         return contracts
 
-    def _fetch_contracts_loop(self, url, params, contracts, symbol):
+    def _get_contracts(self, symbol: str, min_strike: float = None, max_strike: float = None,
+                       exp_from: str = None, exp_to: str = None) -> List[Dict[str, Any]]:
+        """
+        Contracts for symbol from the local index (synced incrementally, at most
+        once a day), filtered locally. Without the index, lists from Polygon.
+        """
+        index = self.contract_index
+        if index is None:
+            contracts = self._get_all_contracts(symbol, min_strike=min_strike, max_strike=max_strike)
+            return [c for c in contracts
+                    if (exp_from is None or c.get("expiration_date", "") >= exp_from)
+                    and (exp_to is None or c.get("expiration_date", "") <= exp_to)]
+
+        index.sync(symbol, self._list_contracts)
+        if exp_from is None:
+            exp_from = (date.today() - timedelta(days=index.lookback_days)).isoformat()
+        return index.contracts(symbol, exp_from=exp_from, exp_to=exp_to, min_strike=min_strike, max_strike=max_strike)
+
+    def _list_contracts(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Every contract matching a /v3/reference/options/contracts query, with no
+        cap. Results come sorted by expiration, so if the first page isn't the
+        last, the rest of the expiration range is split into windows
+        (contract_index.expiration_windows, sized from the first page's span),
+        listed in parallel and merged by ticker.
+        Pages per window are recorded in self.listing_pages[(symbol, expired)],
+        so the expired and active listings of one symbol are kept apart.
+        """
+        params = {**params, "sort": "expiration_date", "order": "asc"}
+        symbol = params.get("underlying_ticker")
+        listing = (symbol, params.get("expired") == "true")
+        first = self._get_json(CONTRACTS_ENDPOINT, params)
+        results = list(first.get("results", []))
+        if not first.get("next_url") or not results:
+            self.listing_pages[listing] = [(params.get("expiration_date.gte"), params.get("expiration_date.lte"), 1)]
+            return results
+
+        first_exp = date.fromisoformat(results[0]["expiration_date"])
+        # The last expiry on the page may continue on the next one, so it's listed again
+        resume = date.fromisoformat(results[-1]["expiration_date"])
+        end = params.get("expiration_date.lte")
+        windows = expiration_windows(resume, date.fromisoformat(end) if end else None,
+                                     (resume - first_exp).days + 1, doubling=not listing[1])
+
+        def list_window(window):
+            lo, hi = window
+            window_params = {k: v for k, v in params.items() if k != "expiration_date.lte"}
+            window_params["expiration_date.gte"] = lo.isoformat()
+            if hi is not None:
+                window_params["expiration_date.lte"] = hi.isoformat()
+            stats = {"pages": 0}
+            return self._get_paged(CONTRACTS_ENDPOINT, window_params, stats), stats["pages"]
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=POLYGON_MAX_CONCURRENCY) as executor:
+            listed = list(executor.map(list_window, windows))
+
+        merged = {c.get("ticker"): c for c in results}
+        pages = [(params.get("expiration_date.gte"), resume.isoformat(), 1)]
+        for (lo, hi), (rows, n_pages) in zip(windows, listed):
+            for c in rows:
+                merged.setdefault(c.get("ticker"), c)
+            pages.append((lo.isoformat(), hi.isoformat() if hi else None, n_pages))
+        self.listing_pages[listing] = pages
+
+        deepest = max(n for _, _, n in pages)
+        if deepest > LISTING_PAGES_WARN:
+            print(f"Contract listing for {symbol} ({'expired' if listing[1] else 'active'}): {len(merged)} contracts in {len(pages)} windows, "
+                  f"up to {deepest} pages per window")
+        return list(merged.values())
+
+    def _get_paged(self, endpoint: str, params: Dict[str, Any], stats: Dict[str, int] = None) -> List[Dict[str, Any]]:
+        """Follow next_url cursors and return all results. stats["pages"] counts the pages read."""
+        results = []
         while True:
-            res = self._get_json(url, params)
-            results = res.get("results", [])
-            contracts.extend(results)
+            res = self._get_json(endpoint, params)
+            if stats is not None:
+                stats["pages"] = stats.get("pages", 0) + 1
+            results.extend(res.get("results", []))
             next_url = res.get("next_url")
-            if next_url:
-                if next_url.startswith(self.BASE_URL):
-                    url = next_url[len(self.BASE_URL):]
-                    params = {} 
-                else: break
-            else: break
-            if len(contracts) > 10000: # Bump limit for safety
-                print(f"Warning: Truncating contract search for {symbol} at 10000")
+            if not next_url or not next_url.startswith(self.BASE_URL):
                 break
+            endpoint = next_url[len(self.BASE_URL):]
+            params = {}
+        return results
 
     def get_ticker_details(self, symbol: str) -> Dict[str, Any]:
         details = self._get_json(f"/v3/reference/tickers/{symbol}")
@@ -224,198 +418,171 @@ class PolygonProvider(DataProvider):
             current_price = details.get("current_price")
             if not current_price: return None
 
-        # 1. Fetch Active Contracts (~30-90 days out)
-        # We don't need "all" history, just current chain.
-        # But Polygon's "contracts" endpoint with "expired=false" gives us the active chain.
-        # To be efficient, we can filter by expiration range directly in the API call.
-        
-        target_date = datetime.now() + timedelta(days=30)
-        min_exp = (datetime.now() + timedelta(days=20)).strftime("%Y-%m-%d")
-        max_exp = (datetime.now() + timedelta(days=60)).strftime("%Y-%m-%d")
-        
+        now = datetime.now()
+        if CURRENT_IV_FROM_CHAIN:
+            # One paged chain snapshot with quotes, instead of a listing plus per-contract snapshots
+            chain = self.get_option_chain(symbol, current_price)
+            iv = chain.atm_iv(30) if chain is not None else None
+            if iv is not None:
+                return iv
+
+        # 0. Guess the ATM tickers from the symbol's listing habits; no chain listing needed
+        iv = self._current_iv_from_occ(symbol, current_price, now)
+        if iv is not None:
+            return iv
+
+        # 1. Active contracts ~20-60 days out
+        if self.contract_index is not None:
+            params = iv_selection.current_iv_params(symbol, now)
+            contracts = self._get_contracts(symbol, exp_from=params["expiration_date.gte"], exp_to=params["expiration_date.lte"])
+        else:
+            contracts = self._list_contracts(iv_selection.current_iv_params(symbol, now))
+
+        # 2. ATM call/put at the expiry closest to 30 days
+        pair = iv_selection.pick_atm_pair(contracts, current_price, now + timedelta(days=30))
+        if pair is None: return None
+        best_exp, best_strike, call, put = pair
+
+        # 3. Premiums from the option snapshots
+        return iv_selection.atm_iv(self._option_price(call["ticker"]), self._option_price(put["ticker"]),
+                                   current_price, best_strike, best_exp, now)
+
+    def _option_price(self, option_ticker: str) -> Optional[float]:
+        return iv_selection.snapshot_price(self._get_json(f"/v2/snapshot/locale/us/markets/options/tickers/{option_ticker}"))
+
+    def _current_iv_from_occ(self, symbol: str, current_price: float, now: datetime) -> Optional[float]:
+        """
+        IV30 from ATM contracts whose OCC tickers are generated from the expiry
+        calendar and strike ladder of the symbol's recent chains in the contract
+        index. Probes the likeliest (expiry, strike) pairs directly and returns
+        None if none of them exists or trades, so the caller can list the chain.
+        """
+        index = self.contract_index
+        if index is None:
+            return None
+        today = now.date()
+        history = index.contracts(symbol, exp_from=(today - timedelta(days=OCC_MODEL_LOOKBACK_DAYS)).isoformat())
+        model = ChainModel.from_contracts(symbol, history)
+        if model is None:
+            return None
+
+        candidates = model.atm_candidates(current_price, today + timedelta(days=30),
+                                          today + timedelta(days=20), today + timedelta(days=60))
+        for exp, strike in candidates[:OCC_MAX_PROBES]:
+            try:
+                c_price = self._option_price(build_occ_ticker(symbol, exp, "call", strike))
+                p_price = self._option_price(build_occ_ticker(symbol, exp, "put", strike)) if c_price else None
+            except Exception as e:
+                if http_status(e) == 404:  # guessed a contract that isn't listed
+                    continue
+                raise
+            iv = iv_selection.atm_iv(c_price, p_price, current_price, strike, exp.isoformat(), now)
+            if iv is not None:
+                return iv
+        return None
+
+    def get_iv_surface(self, symbol: str, current_price: float = None) -> Optional[IVSurface]:
+        """
+        Today's IV surface, built from a single (paged) chain snapshot and, when
+        ENABLE_SVI_SMOOTHING is set, with each expiry's smile replaced by its SVI fit.
+        Cached in memory and on disk per symbol per day, so every consumer in
+        a run (and any later run the same day) shares one chain fetch.
+        """
+        today = date.today()
+        key = (symbol, today)
+        if key in self._surface_cache:
+            return self._surface_cache[key]
+
+        path = os.path.join(IV_SURFACE_CACHE_DIR, today.isoformat(), f"{symbol}.npz")
+        surface = IVSurface.load(path) if not taping() else None
+        if surface is None:
+            surface = self._build_iv_surface(symbol, current_price, today)
+            if surface is not None:
+                if ENABLE_SVI_SMOOTHING:
+                    try:
+                        surface = SVICalibrator(SVI_PARAMS_DIR).smooth(surface)
+                    except Exception as e:
+                        print(f"SVI calibration failed for {symbol}, using raw smiles: {e}")
+                if not taping():
+                    surface.save(path)
+        self._surface_cache[key] = surface
+        return surface
+
+    def _build_iv_surface(self, symbol: str, current_price: Optional[float], today: date) -> Optional[IVSurface]:
+        chain = self.get_option_chain(symbol, current_price)
+        return chain.surface() if chain is not None else None
+
+    def get_option_chain(self, symbol: str, current_price: float = None) -> Optional[OptionChain]:
+        """
+        Today's chain (7 to 800 days out) with bid/ask/last/OI per contract,
+        from one paged chain snapshot. Memoized per symbol per day, so current
+        IV, the surface and LEAPs candidates share the fetch.
+        """
+        today = date.today()
+        key = (symbol, today)
+        if key in self._chain_cache:
+            return self._chain_cache[key]
+
         params = {
-            "underlying_ticker": symbol,
-            "expiration_date.gte": min_exp,
-            "expiration_date.lte": max_exp,
-            "expired": "false",
-            "limit": 500,
-            "sort": "expiration_date",
-            "order": "asc"
+            "expiration_date.gte": (today + timedelta(days=7)).strftime("%Y-%m-%d"),
+            "expiration_date.lte": (today + timedelta(days=800)).strftime("%Y-%m-%d"),
+            "limit": 250,
         }
-        
-        contracts = []
-        self._fetch_contracts_loop("/v3/reference/options/contracts", params, contracts, symbol)
-        
-        if not contracts: return None
-        
-        # 2. Find closest expiry to 30 days
-        def parse_date(d): return datetime.strptime(d, "%Y-%m-%d")
-        
-        # Sort by proximity to target_date
-        contracts.sort(key=lambda x: abs((parse_date(x["expiration_date"]) - target_date).days))
-        best_exp = contracts[0]["expiration_date"]
-        
-        # Filter for best exp
-        candidates = [c for c in contracts if c["expiration_date"] == best_exp]
-        
-        # 3. Find ATM Strike
-        # Sort by proximity to current price
-        candidates.sort(key=lambda x: abs(x["strike_price"] - current_price))
-        if not candidates: return None
-        
-        best_strike = candidates[0]["strike_price"]
-        atm_contracts = [c for c in candidates if c["strike_price"] == best_strike]
-        
-        call = next((c for c in atm_contracts if c["contract_type"] == "call"), None)
-        put = next((c for c in atm_contracts if c["contract_type"] == "put"), None)
-        
-        if not call or not put: return None
-        
-        # 4. Get Current Price (Quote/Snapshot) for Option
-        # We need the PREMIUM.
-        # /v2/snapshot/locale/us/markets/options/tickers/{ticker}
-        
-        def get_price(tkr):
-            snap = self._get_json(f"/v2/snapshot/locale/us/markets/options/tickers/{tkr}")
-            # Try last trade, then mid of bid/ask
-            day = snap.get("results", {}).get("day", {})
-            if day.get("c"): return day.get("c")
-            # If no trade today, maybe checking bid/ask is better, but let's stick to simple "close" or "last"
-            # Actually, "lastQuote" might be better if volume is low.
-            # let's trust "close" for now or "last"
-            return day.get("c") # Close
-            
-        c_price = get_price(call["ticker"])
-        p_price = get_price(put["ticker"])
-        
-        if not c_price or not p_price: return None
-        
-        t_days = (parse_date(best_exp) - datetime.now()).days
-        if t_days <= 0: return None
-        t_years = t_days / 365.0
-        
-        iv_call = IVEstimator.impl_vol_call(c_price, current_price, best_strike, t_years)
-        iv_put = IVEstimator.impl_vol_put(p_price, current_price, best_strike, t_years)
-        
-        if iv_call and iv_put:
-             return (iv_call + iv_put) / 2
-        return None
+        snapshots = self._get_paged(f"/v3/snapshot/options/{symbol}", params)
+        chain = None
+        if snapshots:
+            chain = OptionChain.from_snapshots(symbol, snapshots, today, spot=current_price)
+            if chain is None:
+                # No underlying price in the snapshot
+                current_price = self.get_ticker_details(symbol).get("current_price")
+                if current_price:
+                    chain = OptionChain.from_snapshots(symbol, snapshots, today, spot=current_price)
+        self._chain_cache[key] = chain
+        return chain
+
+    def get_leaps_candidates(self, symbol: str, band: str = "stock_replacement", current_price: float = None,
+                             **kwargs) -> List[Dict[str, Any]]:
+        """LEAPs contracts in a delta band, from today's chain snapshot (see OptionChain.leaps_candidates)."""
+        chain = self.get_option_chain(symbol, current_price)
+        return chain.leaps_candidates(band, **kwargs) if chain is not None else []
 
-    def get_iv_history(self, symbol: str, stock_history: Any) -> List[Dict[str, Any]]:
+    _contract_bar_window = staticmethod(iv_selection.contract_bar_window)
+
+    def get_iv_history(self, symbol: str, stock_history: Any, initial_sigma: float = None) -> List[Dict[str, Any]]:
         """
-        Calculate 1 year of IV history. Slow, heavy.
-        Returns list of dicts: {"date": date_obj, "iv30": float}
+        Calculate daily IV history for the days in stock_history (1 year for a
+        backfill, a few days to fill a gap). Slow, heavy for a full year.
+        initial_sigma: optional warm start for the solver, e.g. the last stored IV30.
+        Returns list of dicts: {"date": "YYYY-MM-DD", "iv30": float}
         """
-        # 1. Determine Strike Range from History
         if stock_history.empty: return []
-        
-        # Approximate range to reduce payload
-        prices = stock_history['Close']
-        low_price = prices.min()
-        high_price = prices.max()
-        
-        # Filter contracts within 50% safety margin of 1y price range
-        min_strike = low_price * 0.5
-        max_strike = high_price * 1.5
-        
-        # 2. Fetch Contract Universe
-        all_contracts = self._get_all_contracts(symbol, min_strike=min_strike, max_strike=max_strike)
+
+        # 1. Fetch contract universe around the 1y price range
+        min_strike, max_strike = iv_selection.strike_bounds(stock_history)
+        all_contracts = self._get_contracts(symbol, min_strike=min_strike, max_strike=max_strike)
         if not all_contracts: return []
-            
-        contracts_by_exp = {}
-        for c in all_contracts:
-            exp = c.get("expiration_date")
-            if exp not in contracts_by_exp: contracts_by_exp[exp] = []
-            contracts_by_exp[exp].append(c)
-        exp_dates = sorted(contracts_by_exp.keys())
-        
-        # 2. Iterate each day in history
-        daily_contracts = {} 
-        needed_tickers = set()
-        
-        for date, row in stock_history.iterrows():
-            stock_price = row['Close']
-            current_date = pd.to_datetime(date).tz_localize(None)
-            target_date = current_date + timedelta(days=30)
-            
-            # Find expiration closest to target_date
-            valid_exps = [e for e in exp_dates if datetime.strptime(e, "%Y-%m-%d") > (current_date + timedelta(days=7))]
-            if not valid_exps: continue
-                
-            closest_exp = min(valid_exps, key=lambda x: abs((datetime.strptime(x, "%Y-%m-%d") - target_date).days))
-            candidates = contracts_by_exp[closest_exp]
-            closest_contract_group = sorted(candidates, key=lambda x: abs(x.get("strike_price") - stock_price))
-            
-            if not closest_contract_group: continue
 
-            best_strike = closest_contract_group[0].get("strike_price")
-            call_contract = next((c for c in candidates if c.get("strike_price") == best_strike and c.get("contract_type") == "call"), None)
-            put_contract = next((c for c in candidates if c.get("strike_price") == best_strike and c.get("contract_type") == "put"), None)
-            
-            if call_contract and put_contract:
-                dt_str = current_date.strftime("%Y-%m-%d")
-                daily_contracts[dt_str] = {
-                    "call": call_contract.get("ticker"),
-                    "put": put_contract.get("ticker"),
-                    "strike": best_strike,
-                    "t_days": (datetime.strptime(closest_exp, "%Y-%m-%d") - current_date).days,
-                    "date_obj": current_date # Store obj for return
-                }
-                needed_tickers.add(call_contract.get("ticker"))
-                needed_tickers.add(put_contract.get("ticker"))
-                
-        # 3. Batch Fetch History
-        contract_histories = {} 
-        def fetch_contract_history(ticker):
-            end = datetime.now()
-            start = end - timedelta(days=380) 
-            aggs = self._get_json(
-                 f"/v2/aggs/ticker/{ticker}/range/1/day/{start.strftime('%Y-%m-%d')}/{end.strftime('%Y-%m-%d')}",
-                 {"limit": 500}
-            )
-            res = aggs.get("results", [])
-            cmap = {}
-            for bar in res:
-                dt = datetime.fromtimestamp(bar['t'] / 1000.0).strftime("%Y-%m-%d")
-                cmap[dt] = bar['c']
-            return ticker, cmap
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-            future_to_ticker = {executor.submit(fetch_contract_history, t): t for t in needed_tickers}
-            for future in concurrent.futures.as_completed(future_to_ticker):
-                t, h = future.result()
-                contract_histories[t] = h
-                
-        # 4. Calculate Daily IV
-        results = []
-        for date_str, info in daily_contracts.items():
-            call_ticker = info['call']
-            put_ticker = info['put']
-            strike = info['strike']
-            t_days = info['t_days']
-            
-            if date_str not in stock_history.index:
-                try: s_price = stock_history.loc[date_str]['Close']
-                except: continue
-            else: s_price = stock_history.loc[date_str]['Close']
-                 
-            c_hist = contract_histories.get(call_ticker, {})
-            p_hist = contract_histories.get(put_ticker, {})
-            c_price = c_hist.get(date_str)
-            p_price = p_hist.get(date_str)
-            
-            if c_price and p_price and t_days > 0:
-                t_years = t_days / 365.0
-                iv_call = IVEstimator.impl_vol_call(c_price, s_price, strike, t_years)
-                iv_put = IVEstimator.impl_vol_put(p_price, s_price, strike, t_years)
-                if iv_call and iv_put:
-                    avg_iv = (iv_call + iv_put) / 2
-                    if 0 < avg_iv < 5.0: 
-                        results.append({
-                            "date": info["date_obj"].strftime("%Y-%m-%d"), 
-                            "iv30": avg_iv
-                        })
-        return results
+        # 2. ATM call/put ~30 days out for each day
+        daily_contracts, needed_tickers = iv_selection.plan_iv_history(all_contracts, stock_history)
+
+        # 3. Fetch every contract's bars concurrently
+        contract_histories = self._fetch_contract_closes(needed_tickers)
+
+        # 4. Calculate daily IV (one batched solve for calls, one for puts)
+        return iv_selection.solve_iv_history(daily_contracts, contract_histories, stock_history, initial_sigma)
+
+    def _fetch_contract_closes(self, expirations: Dict[str, str]) -> Dict[str, Dict[str, float]]:
+        if not expirations: return {}
+        closes = {}
+        store = self.option_bar_store
+        if store is not None:
+            # Expired contracts loaded from the flat files; anything missing there goes to the API
+            closes = store.closes(store.covered(expirations))
+            expirations = {t: e for t, e in expirations.items() if t not in closes}
+        if expirations:
+            client = AsyncPolygonClient(self.api_key, http_cache=self.http_cache)
+            closes.update(client.fetch_contract_closes_sync(expirations))
+        return closes
 
 class HybridProvider(DataProvider):
     def __init__(self):
@@ -428,11 +595,23 @@ class HybridProvider(DataProvider):
     def get_options_chain(self, symbol: str) -> Dict[str, Any]:
         return self.yf.get_options_chain(symbol)
 
-    def get_advanced_metrics(self, symbol: str, include_iv_rank: bool = True, fetch_mode: str = "full") -> Dict[str, Any]:
+    def get_leaps_candidates(self, symbol: str, band: str = "stock_replacement", **kwargs) -> List[Dict[str, Any]]:
+        return self.poly.get_leaps_candidates(symbol, band, **kwargs)
+
+    def prefetch_history(self, symbol: str, hist: pd.DataFrame, period: str = "1y"):
+        self.yf.prefetch_history(symbol, hist, period)
+
+    def get_advanced_metrics(self, symbol: str, include_iv_rank: bool = True, fetch_mode: str = "full",
+                             history_since: date = None, last_iv: float = None) -> Dict[str, Any]:
         """
-        fetch_mode: 'full' (calculate history) or 'current' (today only)
+        fetch_mode: 'full' (calculate 1y history), 'gap' (history from history_since,
+        plus today) or 'current' (today only). See iv_refresh.plan_iv_refresh.
+        last_iv: latest stored IV30, a warm start for the gap solve.
         """
-        yf_metrics = self.yf.get_advanced_metrics(symbol, include_iv_rank=include_iv_rank)
+        # With IV rank enabled the term structure comes from the Polygon IV surface,
+        # so skip Yahoo's per-expiry option chain downloads.
+        yf_metrics = self.yf.get_advanced_metrics(symbol, include_iv_rank=include_iv_rank,
+                                                  include_term_structure=not include_iv_rank)
         try:
             if not include_iv_rank:
                 return yf_metrics
@@ -441,20 +620,39 @@ class HybridProvider(DataProvider):
             if not stock_details: return yf_metrics
             current_price = stock_details.get("current_price")
 
-            # Check if we need history or just current
-            if fetch_mode == "current":
-                current_iv = self.poly.get_current_iv(symbol, current_price)
-                if current_iv:
-                    yf_metrics["iv30_current"] = current_iv # Pass back to be saved
-                    # We can't calc Rank without history here, but we can return the value.
-                    # Rank calc must happen in Ingest or by querying DB.
-            
+            surface = None
+            try:
+                surface = self.poly.get_iv_surface(symbol, current_price)
+            except Exception as e:
+                print(f"IV surface unavailable for {symbol}: {e}")
+
+            if surface is not None:
+                yf_metrics["iv_short"] = surface.iv30
+                yf_metrics["iv_long"] = surface.iv365
+                yf_metrics["iv_term_structure_ratio"] = surface.term_structure_ratio
+                yf_metrics["iv_skew"] = surface.skew()
+            elif current_price:
+                yf_metrics.update(self.yf.get_term_structure(symbol, current_price))
+
+            # Today's stored iv30 uses the same ATM nearest-expiry call/put method as the
+            # history rows (iv_selection), not the interpolated surface, so IV rank compares like with like
+            current_iv = self.poly.get_current_iv(symbol, current_price)
+            if current_iv:
+                yf_metrics["iv30_current"] = current_iv # Pass back to be saved
+                # We can't calc Rank without history here, but we can return the value.
+                # Rank calc must happen in Ingest or by querying DB.
+
+            if fetch_mode == "gap" and history_since:
+                # Only the days missing from the stored history
+                hist = self.yf.get_history_range(symbol, history_since, date.today())
+                if not hist.empty:
+                    iv_series_data = self.poly.get_iv_history(symbol, hist, initial_sigma=last_iv)
+                    if iv_series_data:
+                        yf_metrics["iv_history"] = iv_series_data
+
             elif fetch_mode == "full":
-                # Original logic for historical backfill
-                yf_ticker = yf.Ticker(symbol)
-                end_date = datetime.now()
-                start_date = end_date - timedelta(days=365)
-                hist = yf_ticker.history(start=start_date.strftime('%Y-%m-%d'), end=end_date.strftime('%Y-%m-%d'))
+                # Original logic for historical backfill; same 1y request as the HV calculation
+                hist = self.yf.get_history(symbol, period="1y")
                 
                 if hist.empty: return yf_metrics
                     
@@ -469,8 +667,9 @@ class HybridProvider(DataProvider):
                     high = max(iv_values)
                     current = iv_values[-1]
                     
-                    yf_metrics["iv_short"] = current # Legacy fields
-                    yf_metrics["iv_long"] = current
+                    if surface is None:
+                        yf_metrics["iv_short"] = current # Legacy fields
+                        yf_metrics["iv_long"] = current
                     if high > low:
                         yf_metrics["iv_rank"] = (current - low) / (high - low)
                     
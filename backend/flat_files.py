@@ -0,0 +1,243 @@
+"""
+Local store of daily option closes, loaded from Polygon's bulk flat files
+(us_options_opra/day_aggs_v1/YYYY/MM/YYYY-MM-DD.csv.gz, one file per trading
+day, already downloaded to a local directory).
+
+The loader streams each CSV in chunks and keeps only the contracts asked for,
+then merges them into one parquet file per underlying root. get_iv_history
+reads expired contracts' closes from here instead of requesting
+/v2/aggs per contract.
+
+Usage (from the repo root):
+    python backend/flat_files.py --symbols AAPL MSFT          # contracts the IV selection needs
+    python backend/flat_files.py --symbols AAPL --all-contracts
+"""
+import os
+import re
+import sys
+import json
+import glob
+import argparse
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from occ import parse_occ_ticker
+
+_FILE_DATE_RE = re.compile(r"(\d{4}-\d{2}-\d{2})\.csv\.gz$")
+_OCC_ROOT_RE = r"^O:([A-Z0-9.]+?)\d{6}[CP]\d{8}$"
+# Contract picked for a day expires ~8-45 days later; store coverage must reach back this far
+SELECTION_WINDOW_DAYS = 60
+CHUNK_ROWS = 500_000
+
+def option_root(ticker: str) -> str:
+    return parse_occ_ticker(ticker).underlying
+
+def flat_file_dates(csv_dir: str) -> Dict[str, str]:
+    """{YYYY-MM-DD: path} of every day-aggregates file under csv_dir (any nesting)."""
+    files = {}
+    for path in glob.glob(os.path.join(csv_dir, "**", "*.csv.gz"), recursive=True):
+        match = _FILE_DATE_RE.search(os.path.basename(path))
+        if match:
+            files[match.group(1)] = path
+    return files
+
+class OptionBarStore:
+    """
+    Daily closes per contract, one parquet file per underlying root
+    (columns: ticker, date, close), plus a manifest of what was loaded: the
+    first and last day of an unbroken run of flat files read, per root loaded
+    with every contract kept (--all-contracts) and per contract kept on its
+    own (the IV selection's contracts).
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.manifest_path = os.path.join(root, "manifest.json")
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, underlying_root: str) -> str:
+        return os.path.join(self.root, f"{underlying_root}.parquet")
+
+    def _manifest(self) -> Dict[str, Dict[str, List[str]]]:
+        """{"root_spans": {root: [first day, last day]}, "tickers": {ticker: [first day, last day]}}"""
+        manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+        # Older formats kept loaded days per root, which can't tell a gap from a holiday: load those days again
+        return {"root_spans": manifest.get("root_spans", {}), "tickers": manifest.get("tickers", {})}
+
+    def root_span(self, underlying_root: str) -> Optional[List[str]]:
+        """[first, last] day of the files read with every contract of one underlying root kept, or None."""
+        return self._manifest()["root_spans"].get(underlying_root)
+
+    def ticker_span(self, ticker: str) -> Optional[List[str]]:
+        """[first, last] day of the files read for a contract loaded on its own, or None."""
+        return self._manifest()["tickers"].get(ticker)
+
+    def mark_loaded(self, root_spans: Dict[str, List[str]] = None, ticker_spans: Dict[str, List[str]] = None):
+        """Replace the spans of whole roots and of contracts loaded on their own."""
+        manifest = self._manifest()
+        manifest["root_spans"].update(root_spans or {})
+        manifest["tickers"].update(ticker_spans or {})
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def covered(self, expirations: Dict[str, str]) -> Set[str]:
+        """
+        Tickers of {ticker: expiration} whose every selectable day, through
+        expiry, lies in one unbroken span of loaded files. Only expired
+        contracts qualify; live ones keep trading past the last loaded file.
+        """
+        manifest = self._manifest()
+        out = set()
+        for ticker, expiration in expirations.items():
+            first_needed = (date.fromisoformat(expiration) - timedelta(days=SELECTION_WINDOW_DAYS)).isoformat()
+            for span in (manifest["root_spans"].get(option_root(ticker)), manifest["tickers"].get(ticker)):
+                if span and span[0] <= first_needed and span[1] >= expiration:
+                    out.add(ticker)
+                    break
+        return out
+
+    def merge(self, frames: Dict[str, pd.DataFrame]):
+        """Add rows per underlying root, replacing any (ticker, date) already stored."""
+        for underlying_root, df in frames.items():
+            path = self._path(underlying_root)
+            if os.path.exists(path):
+                df = pd.concat([pd.read_parquet(path), df], ignore_index=True)
+            df = df.drop_duplicates(["ticker", "date"], keep="last").sort_values(["ticker", "date"])
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+
+    def closes(self, tickers: Iterable[str]) -> Dict[str, Dict[str, float]]:
+        """{ticker: {date string: close}} for the tickers found in the store."""
+        by_root: Dict[str, Set[str]] = {}
+        for t in tickers:
+            by_root.setdefault(option_root(t), set()).add(t)
+        out = {}
+        for underlying_root, wanted in by_root.items():
+            path = self._path(underlying_root)
+            if not os.path.exists(path):
+                continue
+            df = pd.read_parquet(path, columns=["ticker", "date", "close"],
+                                 filters=[("ticker", "in", sorted(wanted))])
+            for ticker, group in df.groupby("ticker"):
+                out[ticker] = dict(zip(group["date"], group["close"].astype(float)))
+        return out
+
+def load_flat_files(csv_dir: str, store: OptionBarStore, tickers: Optional[Set[str]] = None,
+                    roots: Optional[Set[str]] = None, start: str = None, end: str = None,
+                    reload: bool = False) -> Dict[str, int]:
+    """
+    Stream the day-aggregate files in csv_dir (optionally limited to [start, end])
+    into store, keeping rows whose ticker is in tickers or whose underlying root
+    is in roots. Days already loaded for every root and contract asked for are
+    skipped unless reload. Returns {"files": n, "rows": n}.
+    """
+    if not tickers and not roots:
+        raise ValueError("Pass the contracts (tickers) or underlyings (roots) to keep")
+    tickers = set(tickers or ())
+    roots = set(roots or ())
+    root_spans = {r: store.root_span(r) for r in roots}
+    spans = {t: store.ticker_span(t) for t in tickers}
+
+    def done(day: str) -> bool:
+        return all(span is not None and span[0] <= day <= span[1]
+                   for span in (*root_spans.values(), *spans.values()))
+
+    available = sorted(flat_file_dates(csv_dir).items())
+    in_range = [d for d, _ in available if (start is None or d >= start) and (end is None or d <= end)]
+    files = {d: p for d, p in available if d in set(in_range) and (reload or not done(d))}
+
+    kept: List[pd.DataFrame] = []
+    for day, path in files.items():
+        for chunk in pd.read_csv(path, usecols=["ticker", "close"], chunksize=CHUNK_ROWS):
+            chunk_roots = chunk["ticker"].str.extract(_OCC_ROOT_RE, expand=False)
+            chunk = chunk.assign(root=chunk_roots)[chunk["ticker"].isin(tickers) | chunk_roots.isin(roots)]
+            if not chunk.empty:
+                kept.append(chunk.assign(date=day))
+
+    rows = 0
+    if kept:
+        df = pd.concat(kept, ignore_index=True)
+        df["close"] = df["close"].astype(float)
+        rows = len(df)
+        store.merge({r: g.drop(columns="root") for r, g in df.groupby("root")})
+    available_days = [d for d, _ in available]
+    store.mark_loaded(_extend_spans(root_spans, in_range, available_days),
+                      _extend_spans(spans, in_range, available_days))
+    return {"files": len(files), "rows": rows}
+
+def _extend_spans(spans: Dict[str, Optional[List[str]]], read: List[str], available: List[str]) -> Dict[str, List[str]]:
+    """
+    Each root's or contract's span after reading the files dated read (a run of
+    available days, skipped ones included): joined with its old span when no
+    available day lies between the two, else just the new run.
+    """
+    if not read:
+        return {}
+    out = {}
+    for ticker, span in spans.items():
+        first, last = read[0], read[-1]
+        if span is not None:
+            lo, hi = min(first, span[0]), max(last, span[1])
+            between = [d for d in available if lo <= d <= hi]
+            covered = set(read) | {d for d in between if span[0] <= d <= span[1]}
+            if covered.issuperset(between):
+                first, last = lo, hi
+        out[ticker] = [first, last]
+    return out
+
+def needed_contracts(provider, symbol: str, days: int = 365) -> Set[str]:
+    """Contracts plan_iv_history picks for symbol over the last `days` days."""
+    import iv_selection
+    from data_provider import _yf_ticker
+    end = datetime.now()
+    hist = _yf_ticker(symbol).history(start=(end - timedelta(days=days)).strftime("%Y-%m-%d"),
+                                      end=end.strftime("%Y-%m-%d"))
+    if hist.empty:
+        return set()
+    min_strike, max_strike = iv_selection.strike_bounds(hist)
+    contracts = provider._get_contracts(symbol, min_strike=min_strike, max_strike=max_strike)
+    return set(iv_selection.plan_iv_history(contracts, hist)[1])
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from config import FLAT_FILES_DIR, OPTION_BARS_STORE_DIR
+
+    parser = argparse.ArgumentParser(description="Load Polygon options day-aggregate flat files into the local store.")
+    parser.add_argument("--symbols", nargs="+", required=True, help="Underlyings to load")
+    parser.add_argument("--csv-dir", default=FLAT_FILES_DIR, help="Directory of downloaded *.csv.gz day files")
+    parser.add_argument("--store", default=OPTION_BARS_STORE_DIR, help="Parquet store directory")
+    parser.add_argument("--start", help="First file date (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last file date (YYYY-MM-DD)")
+    parser.add_argument("--all-contracts", action="store_true",
+                        help="Keep every contract of the symbols, not just the ones the IV selection picks")
+    parser.add_argument("--reload", action="store_true", help="Re-read days already loaded")
+    args = parser.parse_args(argv)
+
+    store = OptionBarStore(args.store)
+    if args.all_contracts:
+        roots = {s.replace(".", "").upper() for s in args.symbols}
+        result = load_flat_files(args.csv_dir, store, roots=roots, start=args.start, end=args.end, reload=args.reload)
+    else:
+        from data_provider import PolygonProvider
+        provider = PolygonProvider()
+        tickers = set()
+        for symbol in args.symbols:
+            needed = needed_contracts(provider, symbol)
+            print(f"{symbol}: {len(needed)} contracts")
+            tickers |= needed
+        result = load_flat_files(args.csv_dir, store, tickers=tickers, start=args.start, end=args.end,
+                                 reload=args.reload)
+    print(f"Loaded {result['rows']} rows from {result['files']} files into {args.store}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
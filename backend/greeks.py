@@ -0,0 +1,84 @@
+import numpy as np
+from scipy.special import ndtr
+from scipy.stats import norm
+from typing import Dict, Tuple
+
+from options_lib import OptionPricingModel
+
+# Delta bands used to pick LEAP strikes (see docs/leaps.md, Strategy Selection)
+LEAPS_DELTA_BANDS: Dict[str, Tuple[float, float]] = {
+    "stock_replacement": (0.80, 0.90),
+    "aggressive": (0.30, 0.50),
+}
+
+class GreeksEngine:
+    @staticmethod
+    def compute(S, K, T, r, sigma, is_call=True) -> Dict[str, np.ndarray]:
+        """
+        Black-Scholes price and Greeks for many contracts in one NumPy pass.
+        All arguments accept scalars or arrays and are broadcast against each other.
+        d1/d2 are computed once (OptionPricingModel._d1_d2) and shared by every output.
+
+        Units (per contract, not per 100 shares):
+        delta: dPrice/dS
+        gamma: d2Price/dS2
+        vega:  dPrice/dsigma for a 1.00 (100 vol point) move
+        theta: dPrice/dt per year (negative = decay); divide by 365 for per day
+        rho:   dPrice/dr for a 1.00 (100%) move in rates
+
+        Expired contracts (T <= 0) get intrinsic price, delta 0/+-1 and zero for
+        the remaining Greeks. Returns a dict of float ndarrays.
+        """
+        S, K, T, r, sigma, is_call = np.broadcast_arrays(
+            np.asarray(S, dtype=float), np.asarray(K, dtype=float),
+            np.asarray(T, dtype=float), np.asarray(r, dtype=float),
+            np.asarray(sigma, dtype=float), np.asarray(is_call, dtype=bool)
+        )
+        shape = S.shape
+        out = {name: np.zeros(shape) for name in ("price", "delta", "gamma", "vega", "theta", "rho")}
+
+        # Expired: intrinsic value and a step delta
+        itm = np.where(is_call, S > K, S < K)
+        out["price"] = np.where(is_call, np.maximum(S - K, 0.0), np.maximum(K - S, 0.0))
+        out["delta"] = np.where(itm, np.where(is_call, 1.0, -1.0), 0.0)
+
+        live = T > 0
+        if not live.any():
+            return out
+
+        s, k, t, rr, sig, call = S[live], K[live], T[live], r[live], sigma[live], is_call[live]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            d1, d2 = OptionPricingModel._d1_d2(s, k, t, rr, sig)
+        sqrt_t = np.sqrt(t)
+        disc = np.exp(-rr * t)
+        pdf_d1 = norm.pdf(d1)
+        sign = np.where(call, 1.0, -1.0)
+        nd1 = ndtr(sign * d1)
+        nd2 = ndtr(sign * d2)
+
+        out["price"][live] = sign * (s * nd1 - k * disc * nd2)
+        out["delta"][live] = sign * nd1
+        out["gamma"][live] = pdf_d1 / (s * sig * sqrt_t)
+        out["vega"][live] = s * pdf_d1 * sqrt_t
+        out["theta"][live] = -(s * pdf_d1 * sig) / (2.0 * sqrt_t) - sign * rr * k * disc * nd2
+        out["rho"][live] = sign * k * t * disc * nd2
+        return out
+
+    @staticmethod
+    def delta(S, K, T, r, sigma, is_call=True) -> np.ndarray:
+        """
+        Convenience wrapper returning only delta.
+        """
+        return GreeksEngine.compute(S, K, T, r, sigma, is_call)["delta"]
+
+    @staticmethod
+    def select_by_delta(delta, band: str) -> np.ndarray:
+        """
+        Indices of contracts whose |delta| falls inside a named LEAPS_DELTA_BANDS band,
+        ordered by distance to the band midpoint (best match first).
+        """
+        low, high = LEAPS_DELTA_BANDS[band]
+        abs_delta = np.abs(np.asarray(delta, dtype=float))
+        idx = np.flatnonzero((abs_delta >= low) & (abs_delta <= high))
+        mid = (low + high) / 2.0
+        return idx[np.argsort(np.abs(abs_delta[idx] - mid), kind="stable")]
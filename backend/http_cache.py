@@ -0,0 +1,170 @@
+import os
+import re
+import json
+import time
+import zlib
+import sqlite3
+import logging
+import threading
+import multiprocessing.util
+from datetime import date
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+FOREVER = None  # ttl value for responses that never change
+
+# TTLs in seconds per endpoint class
+TTL_SNAPSHOT = 5 * 60            # live quotes/greeks
+TTL_OPEN_BARS = 60 * 60          # aggregates whose range includes today
+TTL_REFERENCE = 24 * 60 * 60     # contract listings, ticker details
+TTL_DEFAULT = 60 * 60
+
+_AGGS_RE = re.compile(r"^/v2/aggs/ticker/[^/]+/range/\d+/\w+/[^/]+/(\d{4}-\d{2}-\d{2})$")
+
+def ttl_for(endpoint: str, params: Dict[str, Any], today: Optional[date] = None) -> Optional[float]:
+    """
+    Cache lifetime for a Polygon endpoint. Returns seconds, or FOREVER.
+    Daily bars over a range that closed before today never change; neither does
+    the listing of contracts that had already expired.
+    """
+    today = today or date.today()
+    path = endpoint.split("?", 1)[0]
+    if "/snapshot/" in path:
+        return TTL_SNAPSHOT
+    match = _AGGS_RE.match(path)
+    if match:
+        return FOREVER if date.fromisoformat(match.group(1)) < today else TTL_OPEN_BARS
+    if path.startswith("/v3/reference/options/contracts"):
+        lte = params.get("expiration_date.lte")
+        if str(params.get("expired", "")).lower() == "true" and lte and date.fromisoformat(lte) < today:
+            return FOREVER
+        return TTL_REFERENCE
+    if path.startswith("/v3/reference/"):
+        return TTL_REFERENCE
+    return TTL_DEFAULT
+
+def cache_key(endpoint: str, params: Dict[str, Any]) -> str:
+    """Endpoint plus sorted params. The API key is never part of the key."""
+    items = sorted((k, str(v)) for k, v in (params or {}).items() if k != "apiKey")
+    return endpoint + "?" + "&".join(f"{k}={v}" for k, v in items)
+
+class ResponseCache:
+    """
+    SQLite-backed cache of raw JSON responses.
+
+    Bodies are stored zlib-compressed with an absolute expiry (NULL = never).
+    When the file grows past max_bytes the least recently used entries are
+    evicted; an entry's last access is only rewritten once it is TOUCH_AFTER
+    old, so most hits are pure reads. Hit/miss counts are kept in memory and
+    added to the database's counters by flush_stats, at the latest when the
+    process exits, so every worker process of an ingest run adds to one tally.
+    """
+    EVICT_CHECK_EVERY = 100  # writes between size checks
+    TOUCH_AFTER = 60 * 60    # seconds; LRU order only needs to be roughly right
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+        self._counts = {"hits": 0, "misses": 0}
+        self._counts_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, body BLOB NOT NULL, size INTEGER NOT NULL,"
+                " expires REAL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)")
+            conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO stats VALUES ('hits', 0), ('misses', 0)")
+        # Runs at interpreter exit, and when a multiprocessing worker exits
+        multiprocessing.util.Finalize(self, self.flush_stats, exitpriority=10)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections can't be shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name: str):
+        with self._counts_lock:
+            self._counts[name] += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT body, expires, last_access FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] < now):
+                self._count("misses")
+                return None
+            if now - row[2] >= self.TOUCH_AFTER:
+                with conn:
+                    conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._count("hits")
+            return json.loads(zlib.decompress(row[0]))
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            logger.warning(f"HTTP cache read failed for {key}: {e}")
+            return None
+
+    def flush_stats(self):
+        """Add this process's hit/miss counts since the last flush to the shared counters."""
+        with self._counts_lock:
+            counts, self._counts = self._counts, {"hits": 0, "misses": 0}
+        if not any(counts.values()):
+            return
+        try:
+            with self._conn() as conn:
+                conn.executemany("UPDATE stats SET value = value + ? WHERE name = ?",
+                                 [(n, name) for name, n in counts.items()])
+        except sqlite3.Error as e:
+            logger.warning(f"HTTP cache stats flush failed: {e}")
+
+    def put(self, key: str, content: bytes, ttl: Optional[float]):
+        now = time.time()
+        body = zlib.compress(content)
+        expires = None if ttl is FOREVER else now + ttl
+        try:
+            with self._conn() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, body, size, expires, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (key, body, len(body), expires, now),
+                )
+            self._writes += 1
+            if self._writes % self.EVICT_CHECK_EVERY == 0:
+                self.evict()
+        except sqlite3.Error as e:
+            logger.warning(f"HTTP cache write failed for {key}: {e}")
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under 90% of max_bytes."""
+        with self._conn() as conn:
+            conn.execute("DELETE FROM responses WHERE expires IS NOT NULL AND expires < ?", (time.time(),))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            target = total - int(self.max_bytes * 0.9)
+            freed = 0
+            doomed = []
+            for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access"):
+                doomed.append((key,))
+                freed += size
+                if freed >= target:
+                    break
+            conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+            logger.info(f"HTTP cache evicted {len(doomed)} entries ({freed} bytes)")
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters of every process that has flushed (this one first), entries and bytes."""
+        self.flush_stats()
+        with self._conn() as conn:
+            counts = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"hits": counts.get("hits", 0), "misses": counts.get("misses", 0), "entries": entries, "bytes": size}
@@ -0,0 +1,98 @@
+import os
+import json
+import logging
+from typing import Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import HTTP_POOL_SIZE
+from rate_limiter import get_rate_limiter
+from replay import Recorded, through_tape
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+class _TapedSession(requests.Session):
+    """requests session whose requests go through the replay tape, when one is installed."""
+    def request(self, method, url, params=None, **kwargs):
+        return through_tape(method, url, params, lambda: super(_TapedSession, self).request(method, url, params=params, **kwargs),
+                            _replayed_response)
+
+def _replayed_response(record: Recorded, url: str) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code, resp._content, resp.url, resp.encoding = record.status, record.body, url, "utf-8"
+    return resp
+
+try:
+    from curl_cffi import requests as curl_requests
+
+    class _PacedSession(curl_requests.Session):
+        """
+        curl_cffi session that draws every Yahoo request from the shared "yahoo"
+        budget, through the replay tape when one is installed (replays aren't paced).
+        """
+        def request(self, method, url, *args, params=None, **kwargs):
+            def send():
+                limiter = get_rate_limiter()
+                if limiter:
+                    limiter.acquire("yahoo")
+                return super(_PacedSession, self).request(method, url, *args, params=params, **kwargs)
+            return through_tape(method, url, params, send, _replayed_curl_response)
+
+    def _replayed_curl_response(record: Recorded, url: str) -> "curl_requests.Response":
+        resp = curl_requests.Response()
+        resp.status_code, resp.content, resp.url = record.status, record.body, url
+        resp.ok = record.status < 400
+        return resp
+except ImportError:
+    curl_requests = None
+
+# One session per process. Keyed by pid so a forked worker never reuses its
+# parent's sockets.
+_session = None
+_session_pid = None
+_yf_session = None
+_yf_session_pid = None
+
+def parse_json(content: bytes) -> Any:
+    """Decode a JSON body with orjson when installed."""
+    return _loads(content)
+
+def get_session() -> requests.Session:
+    """
+    Process-wide keep-alive session for REST APIs (Polygon).
+    The connection pool holds HTTP_POOL_SIZE connections so every worker thread
+    can keep its own connection open.
+    """
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        session = _TapedSession()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE, pool_block=True)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+        _session, _session_pid = session, os.getpid()
+    return _session
+
+def get_yf_session() -> Optional[Any]:
+    """
+    Process-wide session for yfinance. yfinance only accepts curl_cffi
+    sessions; returns None (yfinance's own default) when curl_cffi is missing.
+    """
+    global _yf_session, _yf_session_pid
+    if curl_requests is None:
+        return None
+    if _yf_session is None or _yf_session_pid != os.getpid():
+        try:
+            _yf_session = _PacedSession(impersonate="chrome")
+        except Exception as e:
+            logger.warning(f"Could not create yfinance session, using default: {e}")
+            _yf_session = None
+        _yf_session_pid = os.getpid()
+    return _yf_session
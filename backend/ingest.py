@@ -13,11 +13,24 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from database import SessionLocal, engine
 from models import Base, Stock, ScreenResult
-from data_provider import HybridProvider
+from data_provider import DataProvider, HybridProvider
+from rate_limiter import get_rate_limiter
+from iv_refresh import plan_iv_refresh, FULL_REFRESH
+from bulk_history import download_history
+from price_store import PriceStore, update_store
+from run_memo import run_scope
+from utils import RETRY_BUDGET, RETRY_BUDGET_PER_RUN
+import replay
+from replay import ResponseArchive, RecordingTape, ReplayTape, RecordingNewsFetcher, ReplayNewsFetcher
+from synthetic import SyntheticMarket, SyntheticProvider, SyntheticNewsFetcher
+from config import (ENABLE_IV_RANK, ENABLE_PRICE_STORE, PRICE_STORE_DIR, DATA_PROVIDER, REPLAY_ARCHIVE,
+                    REPLAY_LATENCY_SCALE, SYNTHETIC_SYMBOLS, SYNTHETIC_SEED, SYNTHETIC_LATENCY_MS,
+                    SYNTHETIC_ERROR_RATE)
 from screener import Screener
 from symbol_loader import get_sp1500_tickers
 from sentiment import SentimentService
 from ml.predict import Predictor
+from ml.features import MACRO_SYMBOLS
 
 def upsert_stock(db: Session, details: dict):
     """Update or insert stock static info."""
@@ -79,24 +92,33 @@ def upsert_result(db: Session, details: dict, sentiment_map: dict = None, ml_res
 
 def upsert_history(db: Session, symbol: str, history: list):
     """Batch insert historical IV data."""
-    # history is list of {'date': date_obj, 'iv30': float}
+    # history is list of {'date': date_obj or 'YYYY-MM-DD', 'iv30': float}
+    values = {}
     for item in history:
         d = item['date']
-        val = item['iv30']
-        
-        # Check existence (inefficient for bulk but safe for now)
-        res = db.query(ScreenResult).filter(
+        if isinstance(d, str):
+            d = date.fromisoformat(d)
+        values[d] = item['iv30']
+    if not values:
+        return
+
+    # One lookup for the rows that already exist, instead of one per date
+    existing = {
+        res.date: res for res in db.query(ScreenResult).filter(
             ScreenResult.symbol == symbol,
-            ScreenResult.date == d
-        ).first()
-        
+            ScreenResult.date.in_(list(values))
+        ).all()
+    }
+
+    for d, val in values.items():
+        res = existing.get(d)
         if not res:
             res = ScreenResult(symbol=symbol, date=d)
             db.add(res)
-        
+
         res.iv30 = val
         # We don't have other data for checking backfill, so just set iv30
-    
+
     db.commit()
 
 def calculate_and_save_rank(db: Session, symbol: str, result_date: date, details: dict):
@@ -131,15 +153,69 @@ def calculate_and_save_rank(db: Session, symbol: str, result_date: date, details
             res.raw_data = details # Resave with rank
             db.commit()
 
-def process_ticker_task(ticker: str, sentiment_score: float = 0.0):
+PROVIDER_MODES = ("live", "record", "replay", "synthetic")
+
+def make_provider(mode: str = None) -> DataProvider:
+    """
+    The provider for a run, per mode (default DATA_PROVIDER): live (HybridProvider),
+    record (live, every upstream response saved to REPLAY_ARCHIVE), replay (HybridProvider
+    served from REPLAY_ARCHIVE, no network) or synthetic (SYNTHETIC_SYMBOLS generated
+    tickers, no network). record and replay install their tape for this process.
+    """
+    mode = mode or DATA_PROVIDER
+    if mode == "synthetic":
+        return SyntheticProvider(SyntheticMarket(SYNTHETIC_SEED), SYNTHETIC_SYMBOLS,
+                                 SYNTHETIC_LATENCY_MS / 1000, SYNTHETIC_ERROR_RATE)
+    if mode == "replay":
+        replay.install(ReplayTape(ResponseArchive(REPLAY_ARCHIVE), REPLAY_LATENCY_SCALE))
+    elif mode == "record":
+        replay.install(RecordingTape(ResponseArchive(REPLAY_ARCHIVE)))
+    elif mode != "live":
+        raise ValueError(f"Unknown data provider mode {mode!r} (expected one of {PROVIDER_MODES})")
+    return HybridProvider()
+
+def make_news_fetcher(mode: str = None):
+    """Tiingo fetcher for the sentiment phase, recorded, replayed or generated like make_provider. None for live."""
+    mode = mode or DATA_PROVIDER
+    if mode == "synthetic":
+        return SyntheticNewsFetcher(SyntheticMarket(SYNTHETIC_SEED), SYNTHETIC_LATENCY_MS / 1000, SYNTHETIC_ERROR_RATE)
+    if mode == "replay":
+        return ReplayNewsFetcher(ResponseArchive(REPLAY_ARCHIVE), REPLAY_LATENCY_SCALE)
+    if mode == "record":
+        from sentiment import TiingoNewsFetcher
+        return RecordingNewsFetcher(TiingoNewsFetcher(os.getenv("TIINGO_API_KEY")), ResponseArchive(REPLAY_ARCHIVE))
+    return None
+
+def _init_worker(retry_budget: int):
+    """Worker process start: its share of the run's retry budget."""
+    RETRY_BUDGET.start_run(retry_budget)
+
+# One provider per worker process, reused across tasks so its HTTP sessions
+# (and their open connections) survive from one ticker to the next.
+_worker_screener = None
+
+def _get_worker_screener(provider_mode: str = None) -> Screener:
+    global _worker_screener
+    if _worker_screener is None:
+        _worker_screener = Screener(make_provider(provider_mode))
+    return _worker_screener
+
+def process_ticker_task(ticker: str, sentiment_score: float = 0.0, iv_plan=FULL_REFRESH, history=None,
+                        provider_mode: str = None):
     """
     Worker task to process a single ticker.
     This runs in a separate process.
+    iv_plan: iv_refresh.IVRefreshPlan saying how much IV history to fetch.
+    history: the ticker's 1y daily bars from the bulk download, if it has them.
+    provider_mode: see make_provider.
+    Upstream requests are memoized for this task only (the memo is keyed by
+    symbol, so nothing would be shared with the worker's next ticker).
+    Returns (details or None, this task's run memo counts {kind: {"calls", "avoided"}}).
     """
     try:
-        # Re-instantiate locally to avoid shared socket state issues
-        provider = HybridProvider()
-        screener = Screener(provider)
+        screener = _get_worker_screener(provider_mode)
+        if history is not None:
+            screener.data_provider.prefetch_history(ticker, history, period="1y")
         
         # We need to inject sentiment_score into the 'details' 
         # that screener.process_ticker returns, OR modify process_ticker to accept it.
@@ -166,25 +242,45 @@ def process_ticker_task(ticker: str, sentiment_score: float = 0.0):
         # Let's assume I will go back and fix Screener.process_ticker.
         # So here, I will call it with sentiment_score.
         
-        return screener.process_ticker(ticker, sentiment_score=sentiment_score)
+        with run_scope() as memo:
+            details = screener.process_ticker(ticker, fetch_mode=iv_plan.mode, sentiment_score=sentiment_score,
+                                              history_since=iv_plan.since, last_iv=iv_plan.last_iv)
+        return details, memo.stats()
     except Exception as e:
         raise e
 
-def ingest_data(limit: int = None, custom_tickers: list = None, force_sentiment: bool = False):
+def ingest_data(limit: int = None, custom_tickers: list = None, force_sentiment: bool = False,
+                provider_mode: str = None):
     print("Starting ingestion process...")
     
     # Initialize components
-    provider = HybridProvider()
+    provider_mode = provider_mode or DATA_PROVIDER
+    provider = make_provider(provider_mode)
     screener = Screener(provider)
+    if provider_mode in ("record", "replay"):
+        print(f"Data provider: {provider_mode} ({REPLAY_ARCHIVE})")
+        recorded_on = replay.current_tape().archive.recorded_on()
+        if provider_mode == "replay" and recorded_on not in (None, date.today()):
+            print(f"Replay: recorded on {recorded_on}; requests that carry today's date will miss.")
+    elif provider_mode == "synthetic":
+        print(f"Data provider: synthetic ({SYNTHETIC_SYMBOLS} symbols, seed {SYNTHETIC_SEED}, "
+              f"{SYNTHETIC_LATENCY_MS:g} ms latency, {SYNTHETIC_ERROR_RATE:.0%} errors)")
     
     # Get Tickers
     if custom_tickers:
         tickers = custom_tickers
+    elif provider_mode == "replay":
+        # The recorded run's universe, so nothing needs the network
+        tickers = replay.current_tape().archive.symbols()
+    elif provider_mode == "synthetic":
+        tickers = provider.symbols()
     else:
         tickers = get_sp1500_tickers()
         
     if limit:
         tickers = tickers[:limit]
+    if provider_mode == "record":
+        replay.current_tape().archive.put_symbols(custom_tickers if custom_tickers else tickers)
         
     display_count = len(tickers)
     print(f"Found {len(tickers)} tickers to process. (Limit applied: {limit})" if limit else f"Found {len(tickers)} tickers to process.")
@@ -194,7 +290,7 @@ def ingest_data(limit: int = None, custom_tickers: list = None, force_sentiment:
     # [PHASE 1] Sentiment Analysis
     try:
         print("Starting Sentiment Phase...")
-        sentiment_service = SentimentService(db)
+        sentiment_service = SentimentService(db, fetcher=make_news_fetcher(provider_mode))
         # Run async update
         asyncio.run(sentiment_service.update_sentiments(tickers[:limit] if limit else tickers, force_refresh=force_sentiment))
         
@@ -214,6 +310,37 @@ def ingest_data(limit: int = None, custom_tickers: list = None, force_sentiment:
     
     # [PHASE 1.5] Init ML Predictor
     predictor = Predictor()
+
+    # [PHASE 1.6] IV history plan: backfill only what screen_results is missing
+    iv_plans = {}
+    if ENABLE_IV_RANK:
+        iv_plans = plan_iv_refresh(db, custom_tickers if custom_tickers else tickers)
+        modes = [p.mode for p in iv_plans.values()]
+        print(f"IV history: {modes.count('full')} full backfills, {modes.count('gap')} gap fills, "
+              f"{modes.count('current')} current only.")
+
+    # [PHASE 1.7] Price history for the whole universe in a few multi-ticker downloads: appended
+    # to the local price store (workers and the ML predictor read it from there), or without
+    # the store handed to the workers. Symbols it misses fall back to a per-symbol request.
+    histories = None
+    price_store = None
+    try:
+        if provider_mode in ("record", "replay"):
+            # Per-symbol requests, so the recording holds each worker's history response
+            print(f"{provider_mode.capitalize()}: price history is requested per symbol through the tape.")
+        elif provider_mode == "synthetic":
+            print("Synthetic: price history is generated by the provider.")
+        elif ENABLE_PRICE_STORE:
+            price_store = PriceStore(PRICE_STORE_DIR)
+            store_counts = update_store(price_store, list(custom_tickers if custom_tickers else tickers)
+                                  + list(MACRO_SYMBOLS.values()))
+            print("Price store: " + ", ".join(f"{v} {k}" for k, v in store_counts.items()) + ".")
+            predictor.price_store = price_store
+        else:
+            histories = download_history(custom_tickers if custom_tickers else tickers, period="1y", actions=True)
+            print(f"Bulk price history: {len(histories)} symbols.")
+    except Exception as e:
+        print(f"Bulk price history failed, using per-symbol requests: {e}")
     
     # [PHASE 2] Data Phase (Parallelized)
     success_count = 0
@@ -224,9 +351,20 @@ def ingest_data(limit: int = None, custom_tickers: list = None, force_sentiment:
     MAX_WORKERS = 4 
     
     print(f"Starting Parallel Ingestion with {MAX_WORKERS} workers...")
+    poly = getattr(provider, "poly", None)
+    http_cache = poly.http_cache if poly is not None else None
+    cache_start = http_cache.stats() if http_cache else None
+    limiter = get_rate_limiter()
+    limits_start = limiter.stats() if limiter else None
+    memo_totals = {}  # run memo counts summed over worker tasks
+    data_start = time.perf_counter()
     
     try:
-        with concurrent.futures.ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        # Each worker counts its own retries; split RETRY_BUDGET_PER_RUN between them.
+        # A replay serves the final attempt of each recorded request, so retrying it changes nothing.
+        retry_budget = 0 if provider_mode == "replay" else max(1, RETRY_BUDGET_PER_RUN // MAX_WORKERS)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=MAX_WORKERS, initializer=_init_worker,
+                                                    initargs=(retry_budget,)) as executor:
             # Submit all tasks
             future_to_ticker = {}
             for t in (custom_tickers if custom_tickers else tickers):
@@ -235,7 +373,12 @@ def ingest_data(limit: int = None, custom_tickers: list = None, force_sentiment:
                 if sentiment_map and t in sentiment_map:
                     s_score = sentiment_map[t]['score'] or 0.0
                 
-                future_to_ticker[executor.submit(process_ticker_task, t, s_score)] = t
+                iv_plan = iv_plans.get(t, FULL_REFRESH)
+                history = histories.frame(t) if histories is not None else None
+                if history is not None and history.empty:
+                    history = None
+                future_to_ticker[executor.submit(process_ticker_task, t, s_score, iv_plan, history,
+                                                 provider_mode)] = t
             
             total = len(future_to_ticker)
             completed = 0
@@ -248,51 +391,32 @@ def ingest_data(limit: int = None, custom_tickers: list = None, force_sentiment:
                     print(f"Progress: {completed}/{total}...")
                 
                 try:
-                    data = future.result()
+                    data, memo_counts = future.result()
+                    for kind, counts in memo_counts.items():
+                        for k, v in counts.items():
+                            memo_totals.setdefault(kind, {"calls": 0, "avoided": 0})[k] += v
                     
                     if data:
                         # Sequential DB Write
-                        upsert_stock(db, data)
+                        stock = upsert_stock(db, data)
                         
-                        # Run ML Prediction (if history available)
-                        # We need history. Does `data` contain it? No, `data` is just details.
-                        # However, we have `iv_history` in `data['iv_history']` if configured? 
-                        # No, Ingest doesn't fetch history by default unless `metrics=full`.
-                        # But `dataset.py` fetches its own history. 
-                        # This ingestion script is for the "Daily" usage.
-                        # Realistically, we need to fetch history here or assume we have it.
-                        # For now, let's keep it simple: If we don't have history in memory, skip ML 
-                        # OR (Better) fetch it quickly inside `predict_one` or let Predictor handle it.
-                        # But Predictor needs a dataframe.
-                        # NOTE: For latency, we shouldn't fetch 2y history for every stock serially here.
-                        # Ideally, `process_ticker_task` returns history?
+                        # ML prediction from the price store's history (skipped without the store or a model)
+                        ml_result = None
+                        if price_store is not None:
+                            label, confidence = predictor.predict_one(ticker)
+                            if label:
+                                ml_result = (label, confidence)
                         
-                        # Let's assume we can't do ML in this loop efficiently without architectural change 
-                        # to pass history out.
-                        # But `HybridProvider.get_advanced_metrics` has a mode.
-                        
-                        # Wait, the prompt asked to "integrate inference into daily screener".
-                        # Let's try to fetch just enough history (e.g. 100 days) for ML inside the worker?
-                        # No, worker returns dict.
-                        
-                        # Let's try to just PASS None for now to scaffold, but the proper way is:
-                        # process_ticker_task -> returns (data, history_df)
-                        # But changing signature is risky.
-                        
-                        # Alternative: We run ML *inside* process_ticker_task? 
-                        # But `Predictor` loads the model (heavy). We don't want to load model in every process.
-                        
-                        # Compromise: We will skip ML in this specific `ingest.py` run for performance 
-                        # unless we implement a fast history fetch. 
-                        # actually, let's just scaffold the call.
-                        
-                        # For the sake of this task, I will add a TO-DO or minimal fetch.
-                        # Actually, `provider` inside `process_ticker_task` is fresh.
-                        
-                        # Let's NOT call predict here yet because we don't have the DF. 
-                        # We will update `upsert_result` signature but pass None for now.
-                        upsert_result(db, data, sentiment_map, ml_result=None)
+                        # Stored as screen_results rows below, not in today's raw_data
+                        iv_history = data.pop("iv_history", None)
+                        upsert_result(db, data, sentiment_map, ml_result=ml_result)
                         db.commit()
+
+                        if iv_history:
+                            if iv_plans.get(ticker, FULL_REFRESH).mode == "full":
+                                # Backfilled: later runs fill gaps even if the history stays sparse
+                                stock.iv_backfilled_on = date.today()
+                            upsert_history(db, ticker, iv_history)
                         
                         # Rank calc requires DB read, so we do it here in main thread
                         # ensuring read-your-writes consistency
@@ -312,6 +436,27 @@ def ingest_data(limit: int = None, custom_tickers: list = None, force_sentiment:
         db.close()
         
     print(f"Ingestion complete. Success: {success_count}, Errors: {error_count}")
+    elapsed = time.perf_counter() - data_start
+    processed = len(custom_tickers if custom_tickers else tickers)
+    print(f"Data phase: {processed} tickers in {elapsed:.1f}s ({processed / elapsed if elapsed else 0:.2f} tickers/s)")
+    if http_cache:
+        # Counters are shared by all worker processes through the cache database
+        cache_end = http_cache.stats()
+        hits = cache_end["hits"] - cache_start["hits"]
+        misses = cache_end["misses"] - cache_start["misses"]
+        print(f"HTTP cache: {hits} hits, {misses} misses, "
+              f"{cache_end['entries']} entries ({cache_end['bytes'] / 1e6:.1f} MB)")
+    if memo_totals:
+        avoided = sum(c["avoided"] for c in memo_totals.values())
+        detail = ", ".join(f"{kind} {c['avoided']}/{c['calls'] + c['avoided']}" for kind, c in sorted(memo_totals.items()))
+        print(f"Run memo: avoided {avoided} duplicate upstream calls ({detail})")
+    if limiter:
+        # Time workers spent paced by the shared rate limits, per budget
+        for bucket, end in sorted(limiter.stats().items()):
+            start = limits_start.get(bucket, {"acquired": 0, "waited_s": 0.0})
+            requests = end["acquired"] - start["acquired"]
+            if requests:
+                print(f"Rate limit {bucket}: {requests} requests, waited {end['waited_s'] - start['waited_s']:.1f}s")
 
 if __name__ == "__main__":
     import argparse
@@ -319,6 +464,10 @@ if __name__ == "__main__":
     parser.add_argument("--limit", type=int, help="Limit number of tickers to process")
     parser.add_argument("--tickers", nargs="+", help="Specific tickers to process")
     parser.add_argument("--force-sentiment", action="store_true", help="Force refresh of sentiment scores")
+    parser.add_argument("--provider", choices=PROVIDER_MODES,
+                        help="live, record (to REPLAY_ARCHIVE), replay (from REPLAY_ARCHIVE) or synthetic "
+                             "(SYNTHETIC_SYMBOLS generated tickers); default DATA_PROVIDER")
     
     args = parser.parse_args()
-    ingest_data(limit=args.limit, custom_tickers=args.tickers, force_sentiment=args.force_sentiment)
+    ingest_data(limit=args.limit, custom_tickers=args.tickers, force_sentiment=args.force_sentiment,
+                provider_mode=args.provider)
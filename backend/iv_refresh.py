@@ -0,0 +1,114 @@
+"""
+Decides how much IV history each symbol needs fetched on a run, from the
+iv30 history already stored in screen_results:
+
+  full    - no history yet, or too little of the IV rank window covered: backfill a year
+            through get_iv_history
+  gap     - the window is covered but ends before the last trading day: fetch only the missing days
+  current - the window is covered and up to date: today's IV only
+
+Coverage means the stored rows start near the window start and fill at least
+MIN_COVERAGE of its trading days. A symbol backfilled inside the window
+(stocks.iv_backfilled_on) counts as covered however sparse its rows: one listed
+less than a year ago, or an illiquid one whose contracts skip days, has all the
+history the backfill can return, so it gets gap fills from its last row.
+"""
+from collections import namedtuple
+from datetime import date, timedelta
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+from sqlalchemy import and_, func
+from sqlalchemy.orm import Session
+
+from models import ScreenResult, Stock
+
+# since: first missing date (gap mode only); last_iv: latest stored iv30, a warm start for the gap solve
+IVRefreshPlan = namedtuple("IVRefreshPlan", ["mode", "since", "last_iv"])
+
+FULL_REFRESH = IVRefreshPlan("full", None, None)
+
+# Stored iv30 inside the window: first and last dates, row count and the latest value
+IVCoverage = namedtuple("IVCoverage", ["first", "last", "rows", "last_iv"])
+
+# Share of the window's weekdays that must have a row (holidays are ~4% of them)
+MIN_COVERAGE = 0.9
+# Slack for the first row: the backfill's first bar can follow the window start by a long weekend
+START_SLACK_DAYS = 7
+
+# Keeps the IN (...) lists under SQLite's older 999-variable limit
+_QUERY_CHUNK = 500
+
+def missing_trading_days(last: date, today: date) -> int:
+    """Weekdays after last and before today (holidays count as missing; their gap fetch just comes back empty)."""
+    if last >= today:
+        return 0
+    return int(np.busday_count(last + timedelta(days=1), today))
+
+def covers_window(coverage: IVCoverage, window_start: date) -> bool:
+    """True if the rows start near window_start and leave no large holes up to their last date."""
+    if coverage.first > window_start + timedelta(days=START_SLACK_DAYS):
+        return False
+    expected = np.busday_count(window_start, coverage.last + timedelta(days=1))
+    return coverage.rows >= MIN_COVERAGE * expected
+
+def plan_for(coverage: Optional[IVCoverage], today: date, window_start: date,
+             backfilled_on: Optional[date] = None) -> IVRefreshPlan:
+    if coverage is None:
+        return FULL_REFRESH
+    backfilled = backfilled_on is not None and backfilled_on >= window_start
+    if not backfilled and not covers_window(coverage, window_start):
+        return FULL_REFRESH
+    last, last_iv = coverage.last, coverage.last_iv
+    if missing_trading_days(last, today) == 0:
+        return IVRefreshPlan("current", None, last_iv)
+    return IVRefreshPlan("gap", last + timedelta(days=1), last_iv)
+
+def latest_iv(db: Session, symbols: Iterable[str], since: date) -> Dict[str, IVCoverage]:
+    """{symbol: IVCoverage} of the stored iv30 on or after since (symbols without any are left out)."""
+    symbols = list(symbols)
+    latest = {}
+    for i in range(0, len(symbols), _QUERY_CHUNK):
+        chunk = symbols[i:i + _QUERY_CHUNK]
+        newest = db.query(
+            ScreenResult.symbol.label("symbol"),
+            func.max(ScreenResult.date).label("date"),
+            func.min(ScreenResult.date).label("first"),
+            func.count(ScreenResult.date).label("rows")
+        ).filter(
+            ScreenResult.symbol.in_(chunk),
+            ScreenResult.date >= since,
+            ScreenResult.iv30.isnot(None)
+        ).group_by(ScreenResult.symbol).subquery()
+
+        rows = db.query(ScreenResult.symbol, newest.c.first, ScreenResult.date, newest.c.rows, ScreenResult.iv30).join(
+            newest, and_(ScreenResult.symbol == newest.c.symbol, ScreenResult.date == newest.c.date)
+        ).filter(ScreenResult.iv30.isnot(None)).all()
+        for symbol, first, last, count, iv in rows:
+            latest[symbol] = IVCoverage(first, last, count, iv)
+    return latest
+
+def backfill_dates(db: Session, symbols: Iterable[str]) -> Dict[str, date]:
+    """{symbol: day of its last full IV history backfill} (symbols never backfilled are left out)."""
+    symbols = list(symbols)
+    dates = {}
+    for i in range(0, len(symbols), _QUERY_CHUNK):
+        rows = db.query(Stock.symbol, Stock.iv_backfilled_on).filter(
+            Stock.symbol.in_(symbols[i:i + _QUERY_CHUNK]), Stock.iv_backfilled_on.isnot(None)
+        ).all()
+        dates.update(rows)
+    return dates
+
+def plan_iv_refresh(db: Session, symbols: Iterable[str], today: date = None,
+                    lookback_days: int = 365) -> Dict[str, IVRefreshPlan]:
+    """
+    One plan per symbol. Only history inside the IV rank window (lookback_days)
+    counts; older rows would leave the window without a fresh backfill.
+    """
+    today = today or date.today()
+    symbols = list(symbols)
+    window_start = today - timedelta(days=lookback_days)
+    coverage = latest_iv(db, symbols, window_start)
+    backfilled = backfill_dates(db, symbols)
+    return {symbol: plan_for(coverage.get(symbol), today, window_start, backfilled.get(symbol))
+            for symbol in symbols}
@@ -0,0 +1,224 @@
+"""
+Contract selection and IV assembly shared by the sync PolygonProvider and the
+async Polygon client. Nothing here does I/O: callers fetch contracts, bars and
+snapshots however they like and hand the JSON results in.
+"""
+from datetime import datetime, timedelta, date
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+from options_lib import IVEstimator
+
+def parse_date(d: str) -> datetime:
+    return datetime.strptime(d, "%Y-%m-%d")
+
+def current_iv_params(symbol: str, now: datetime) -> Dict[str, Any]:
+    """Contract listing query for the active chain ~20-60 days out."""
+    return {
+        "underlying_ticker": symbol,
+        "expiration_date.gte": (now + timedelta(days=20)).strftime("%Y-%m-%d"),
+        "expiration_date.lte": (now + timedelta(days=60)).strftime("%Y-%m-%d"),
+        "expired": "false",
+        "limit": 500,
+        "sort": "expiration_date",
+        "order": "asc"
+    }
+
+def pick_atm_pair(contracts: List[Dict[str, Any]], current_price: float,
+                  target_date: datetime) -> Optional[Tuple[str, float, Dict[str, Any], Dict[str, Any]]]:
+    """
+    ATM call/put at the expiry closest to target_date.
+    Returns (expiration, strike, call, put) or None.
+    """
+    if not contracts: return None
+
+    # Sort by proximity to target_date
+    contracts = sorted(contracts, key=lambda x: abs((parse_date(x["expiration_date"]) - target_date).days))
+    best_exp = contracts[0]["expiration_date"]
+    candidates = [c for c in contracts if c["expiration_date"] == best_exp]
+
+    # Sort by proximity to current price
+    candidates.sort(key=lambda x: abs(x["strike_price"] - current_price))
+    if not candidates: return None
+
+    best_strike = candidates[0]["strike_price"]
+    atm_contracts = [c for c in candidates if c["strike_price"] == best_strike]
+    call = next((c for c in atm_contracts if c["contract_type"] == "call"), None)
+    put = next((c for c in atm_contracts if c["contract_type"] == "put"), None)
+    if not call or not put: return None
+    return best_exp, best_strike, call, put
+
+def snapshot_price(snap: Dict[str, Any]) -> Optional[float]:
+    """Option premium from a /v2/snapshot/.../options/tickers response (day close)."""
+    day = snap.get("results", {}).get("day", {})
+    return day.get("c")
+
+def atm_iv(c_price: float, p_price: float, current_price: float, strike: float,
+           expiration: str, now: datetime) -> Optional[float]:
+    """Average of call and put IV, or None if either fails."""
+    if not c_price or not p_price: return None
+    t_days = (parse_date(expiration) - now).days
+    if t_days <= 0: return None
+    t_years = t_days / 365.0
+
+    iv_call = IVEstimator.impl_vol_call(c_price, current_price, strike, t_years)
+    iv_put = IVEstimator.impl_vol_put(p_price, current_price, strike, t_years)
+    if iv_call and iv_put:
+        return (iv_call + iv_put) / 2
+    return None
+
+def strike_bounds(stock_history: pd.DataFrame) -> Tuple[float, float]:
+    """Contracts within a 50% safety margin of the 1y price range."""
+    prices = stock_history['Close']
+    return prices.min() * 0.5, prices.max() * 1.5
+
+def plan_iv_history(all_contracts: List[Dict[str, Any]],
+                    stock_history: pd.DataFrame) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+    """
+    Pick the ATM call/put ~30 days out for every day of stock_history.
+    Returns (daily_contracts keyed by date string, {contract ticker: expiration}).
+
+    Expiries are parsed once; each day is mapped to the expiry nearest
+    day + 30 (among those more than 7 days out) with searchsorted, and to the
+    strike nearest its close with one searchsorted per chosen expiry.
+    """
+    contracts = [c for c in all_contracts if c.get("expiration_date") and c.get("strike_price") is not None]
+    if not contracts or stock_history.empty:
+        return {}, {}
+
+    # 1. Expiries and per-expiry sorted strikes
+    exp_strs = np.array([c["expiration_date"] for c in contracts])
+    strikes = np.array([c["strike_price"] for c in contracts], dtype=float)
+    exp_keys, exp_idx = np.unique(exp_strs, return_inverse=True)
+    exp_dates = exp_keys.astype("datetime64[D]")
+    order = np.lexsort((strikes, exp_idx))
+    sorted_exp, sorted_strikes = exp_idx[order], strikes[order]
+    seg_start = np.searchsorted(sorted_exp, np.arange(exp_keys.size), side="left")
+    seg_end = np.searchsorted(sorted_exp, np.arange(exp_keys.size), side="right")
+
+    # First listing of each (expiry, strike, type)
+    pairs = {}
+    for c, e in zip(contracts, exp_idx):
+        pairs.setdefault((e, c["strike_price"], c.get("contract_type")), c.get("ticker"))
+
+    # 2. Expiry nearest day + 30 among those after day + 7
+    index = pd.DatetimeIndex(stock_history.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    days = index.values.astype("datetime64[D]")
+    target = days + np.timedelta64(30, "D")
+    lo = np.searchsorted(exp_dates, days + np.timedelta64(7, "D"), side="right")
+    hi = np.searchsorted(exp_dates, target, side="left")
+    n_exp = exp_dates.size
+    has_before = hi - 1 >= lo
+    after = exp_dates[np.minimum(hi, n_exp - 1)]
+    before = exp_dates[np.maximum(hi - 1, 0)]
+    # Ties go to the earlier expiry
+    use_before = has_before & ((hi >= n_exp) | ((target - before) <= (after - target)))
+    chosen = np.where(use_before, hi - 1, hi)
+    valid = lo < n_exp
+
+    # 3. Strike nearest the close, per chosen expiry
+    closes = stock_history['Close'].to_numpy(dtype=float)
+    best_strike = np.full(days.size, np.nan)
+    for e in np.unique(chosen[valid]):
+        rows = np.flatnonzero(valid & (chosen == e))
+        seg = np.unique(sorted_strikes[seg_start[e]:seg_end[e]])
+        j = np.clip(np.searchsorted(seg, closes[rows]), 1, max(seg.size - 1, 1))
+        left, right = seg[j - 1], seg[np.minimum(j, seg.size - 1)]
+        # Ties go to the lower strike
+        best_strike[rows] = np.where(np.abs(closes[rows] - left) <= np.abs(right - closes[rows]), left, right)
+
+    t_days = (exp_dates[np.minimum(chosen, n_exp - 1)] - days).astype(int)
+
+    daily_contracts = {}
+    needed_tickers = {}  # ticker -> expiration date
+    for i in np.flatnonzero(valid & np.isfinite(best_strike)):
+        e, strike = chosen[i], best_strike[i]
+        call = pairs.get((e, strike, "call"))
+        put = pairs.get((e, strike, "put"))
+        if not (call and put):
+            continue
+        current_date = index[i]
+        closest_exp = exp_keys[e]
+        daily_contracts[current_date.strftime("%Y-%m-%d")] = {
+            "call": call,
+            "put": put,
+            "strike": float(strike),
+            "t_days": int(t_days[i]),
+            "date_obj": current_date.to_pydatetime()  # Store obj for return
+        }
+        needed_tickers[call] = str(closest_exp)
+        needed_tickers[put] = str(closest_exp)
+
+    return daily_contracts, needed_tickers
+
+def contract_bar_window(expiration: str, today: date) -> Tuple[str, str]:
+    """
+    Daily bar range for a contract: two years up to its expiry, cut off at today.
+    For expired contracts this depends only on the contract, so the request
+    (and its cache entry) is the same on every run.
+    """
+    exp = date.fromisoformat(expiration)
+    end = min(today, exp)
+    start = min(today - timedelta(days=380), exp - timedelta(days=730))
+    return start.isoformat(), end.isoformat()
+
+def contract_bars_endpoint(ticker: str, expiration: str, today: date) -> str:
+    start, end = contract_bar_window(expiration, today)
+    return f"/v2/aggs/ticker/{ticker}/range/1/day/{start}/{end}"
+
+def bars_to_closes(aggs: Dict[str, Any]) -> Dict[str, float]:
+    """{date string: close} from an aggregates response."""
+    cmap = {}
+    for bar in aggs.get("results", []):
+        dt = datetime.fromtimestamp(bar['t'] / 1000.0).strftime("%Y-%m-%d")
+        cmap[dt] = bar['c']
+    return cmap
+
+def solve_iv_history(daily_contracts: Dict[str, Dict[str, Any]], contract_histories: Dict[str, Dict[str, float]],
+                     stock_history: pd.DataFrame, initial_sigma: float = None) -> List[Dict[str, Any]]:
+    """
+    Daily IV30 from the planned contracts' closes: one batched solve for calls,
+    one for puts. initial_sigma (e.g. the last stored IV30) warm-starts the call solve.
+    Returns [{"date": "YYYY-MM-DD", "iv30": float}].
+    """
+    rows = []
+    for date_str, info in daily_contracts.items():
+        call_ticker = info['call']
+        put_ticker = info['put']
+        strike = info['strike']
+        t_days = info['t_days']
+
+        if date_str not in stock_history.index:
+            try: s_price = stock_history.loc[date_str]['Close']
+            except: continue
+        else: s_price = stock_history.loc[date_str]['Close']
+
+        c_hist = contract_histories.get(call_ticker, {})
+        p_hist = contract_histories.get(put_ticker, {})
+        c_price = c_hist.get(date_str)
+        p_price = p_hist.get(date_str)
+
+        if c_price and p_price and t_days > 0:
+            rows.append((info["date_obj"], c_price, p_price, s_price, strike, t_days / 365.0))
+
+    if not rows: return []
+
+    dates = [row[0] for row in rows]
+    c_prices, p_prices, s_prices, strikes, t_years = (np.array(col, dtype=float) for col in list(zip(*rows))[1:])
+    iv_calls = IVEstimator.impl_vol_batch(c_prices, s_prices, strikes, t_years, is_call=True, initial_sigma=initial_sigma)
+    # Same strike/expiry -> the call IV is a near-exact warm start for the put
+    iv_puts = IVEstimator.impl_vol_batch(p_prices, s_prices, strikes, t_years, is_call=False, initial_sigma=iv_calls)
+    avg_ivs = (iv_calls + iv_puts) / 2
+
+    results = []
+    for date_obj, avg_iv in zip(dates, avg_ivs):
+        # NaN (failed solve) fails both comparisons
+        if 0 < avg_iv < 5.0:
+            results.append({
+                "date": date_obj.strftime("%Y-%m-%d"),
+                "iv30": float(avg_iv)
+            })
+    return results
@@ -0,0 +1,163 @@
+import os
+import numpy as np
+from datetime import date
+from typing import Optional, Tuple
+
+# Log-moneyness nodes (ln(K/S)) the surface is resampled onto
+MONEYNESS_NODES = np.linspace(-0.5, 0.5, 41)
+
+class IVSurface:
+    """
+    Implied volatility surface for one symbol on one day.
+
+    Raw (expiry, strike, iv) quotes are resampled onto a fixed log-moneyness grid
+    per expiry, giving a dense (n_expiries x n_nodes) IV matrix. Lookups
+    interpolate linearly in log-moneyness and linearly in total variance
+    (sigma^2 * T) across expiries, so constant-maturity points like IV30 don't
+    jump when the nearest listed expiry rolls. Outside the listed expiries the
+    nearest expiry's volatility is held flat.
+    """
+
+    def __init__(self, symbol: str, spot: float, as_of: date, days: np.ndarray, grid: np.ndarray,
+                 nodes: np.ndarray = MONEYNESS_NODES, quotes: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None):
+        self.symbol = symbol
+        self.spot = float(spot)
+        self.as_of = as_of
+        self.days = np.asarray(days, dtype=float)        # (n_exp,) days to expiry, ascending
+        self.grid = np.asarray(grid, dtype=float)        # (n_exp, n_nodes) implied vols
+        self.nodes = np.asarray(nodes, dtype=float)      # (n_nodes,) log-moneyness
+        # Raw (days, log-moneyness, iv) quotes behind the grid, kept for smile fitting
+        self.quotes = quotes
+
+    @classmethod
+    def from_quotes(cls, symbol: str, spot: float, as_of: date, days, strikes, ivs,
+                    min_points: int = 2) -> Optional["IVSurface"]:
+        """
+        Build a surface from flat arrays of per-contract quotes.
+        days: days to expiry, strikes: strike prices, ivs: implied vols (NaN = skip).
+        Expiries with fewer than min_points valid quotes are dropped.
+        Returns None if no expiry survives.
+        """
+        days = np.asarray(days, dtype=float)
+        strikes = np.asarray(strikes, dtype=float)
+        ivs = np.asarray(ivs, dtype=float)
+        valid = (days > 0) & (strikes > 0) & np.isfinite(ivs) & (ivs > 0)
+        days, strikes, ivs = days[valid], strikes[valid], ivs[valid]
+        if days.size == 0 or not spot:
+            return None
+
+        moneyness = np.log(strikes / spot)
+        order = np.lexsort((moneyness, days))
+        days, moneyness, ivs = days[order], moneyness[order], ivs[order]
+
+        expiries, starts, counts = np.unique(days, return_index=True, return_counts=True)
+        rows, kept = [], []
+        q_days, q_m, q_iv = [], [], []
+        for exp, start, count in zip(expiries, starts, counts):
+            if count < min_points:
+                continue
+            m = moneyness[start:start + count]
+            v = ivs[start:start + count]
+            # Average duplicate strikes (call and put at the same strike)
+            m_unique, inverse = np.unique(m, return_inverse=True)
+            v_unique = np.bincount(inverse, weights=v) / np.bincount(inverse)
+            rows.append(np.interp(MONEYNESS_NODES, m_unique, v_unique))
+            kept.append(exp)
+            q_days.append(np.full(m_unique.size, exp))
+            q_m.append(m_unique)
+            q_iv.append(v_unique)
+        if not rows:
+            return None
+        quotes = (np.concatenate(q_days), np.concatenate(q_m), np.concatenate(q_iv))
+        return cls(symbol, spot, as_of, np.array(kept), np.vstack(rows), quotes=quotes)
+
+    def with_grid(self, grid: np.ndarray) -> "IVSurface":
+        """Copy of this surface with a replacement IV grid (e.g. fitted smiles)."""
+        return IVSurface(self.symbol, self.spot, self.as_of, self.days, grid, self.nodes, self.quotes)
+
+    def iv(self, days, moneyness=0.0) -> np.ndarray:
+        """
+        Vectorized lookup. days and moneyness (ln(K/S)) broadcast against each other.
+        """
+        days, moneyness = np.broadcast_arrays(np.asarray(days, dtype=float), np.asarray(moneyness, dtype=float))
+        shape = days.shape
+        t = days.ravel()
+        m = np.clip(moneyness.ravel(), self.nodes[0], self.nodes[-1])
+
+        # 1. Interpolate every expiry row at the requested moneyness -> (n_exp, n_query)
+        j = np.clip(np.searchsorted(self.nodes, m) - 1, 0, len(self.nodes) - 2)
+        w = (m - self.nodes[j]) / (self.nodes[j + 1] - self.nodes[j])
+        row_iv = self.grid[:, j] * (1 - w) + self.grid[:, j + 1] * w
+
+        if len(self.days) == 1:
+            return row_iv[0].reshape(shape)
+
+        # 2. Interpolate total variance (iv^2 * T) across expiries
+        i = np.clip(np.searchsorted(self.days, t) - 1, 0, len(self.days) - 2)
+        cols = np.arange(t.size)
+        t0, t1 = self.days[i], self.days[i + 1]
+        v0 = row_iv[i, cols] ** 2 * t0
+        v1 = row_iv[i + 1, cols] ** 2 * t1
+        tc = np.clip(t, t0, t1)
+        var = v0 + (v1 - v0) * (tc - t0) / (t1 - t0)
+        out = np.sqrt(np.maximum(var, 0.0) / tc)
+        # Flat volatility beyond the listed expiries
+        out = np.where(t < self.days[0], row_iv[0, cols], out)
+        out = np.where(t > self.days[-1], row_iv[-1, cols], out)
+        return out.reshape(shape)
+
+    def iv_at_strike(self, days, strike) -> np.ndarray:
+        """
+        Lookup by strike price instead of log-moneyness.
+        """
+        return self.iv(days, np.log(np.asarray(strike, dtype=float) / self.spot))
+
+    def constant_maturity_iv(self, days: float) -> float:
+        """ATM implied volatility at a constant maturity (in calendar days)."""
+        return float(self.iv(days, 0.0))
+
+    @property
+    def iv30(self) -> float:
+        return self.constant_maturity_iv(30)
+
+    @property
+    def iv365(self) -> float:
+        return self.constant_maturity_iv(365)
+
+    @property
+    def term_structure_ratio(self) -> Optional[float]:
+        short = self.iv30
+        return self.iv365 / short if short else None
+
+    def skew(self, days: float = 30, width: float = 0.1) -> float:
+        """
+        Downside minus upside IV at +-width log-moneyness (positive = put skew).
+        """
+        down, up = self.iv(days, np.array([-width, width]))
+        return float(down - up)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename so concurrent readers never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            quotes = self.quotes if self.quotes is not None else (np.empty(0),) * 3
+            np.savez(f, days=self.days, grid=self.grid, nodes=self.nodes,
+                     quote_days=quotes[0], quote_moneyness=quotes[1], quote_ivs=quotes[2],
+                     symbol=np.array(self.symbol), spot=np.array(self.spot), as_of=np.array(self.as_of.isoformat()))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["IVSurface"]:
+        """The saved surface, or None if the file is missing or not in the current (pickle-free) format."""
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            if "symbol" not in data:
+                return None
+            symbol, spot, as_of = data["symbol"], data["spot"], data["as_of"]
+            quotes = None
+            if "quote_days" in data and data["quote_days"].size:
+                quotes = (data["quote_days"], data["quote_moneyness"], data["quote_ivs"])
+            return cls(str(symbol), float(spot), date.fromisoformat(str(as_of)),
+                       data["days"], data["grid"], data["nodes"], quotes)
@@ -5,7 +5,13 @@ import yfinance as yf
 import numpy as np
 from datetime import datetime, timedelta
 import logging
-import concurrent.futures
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_session import get_yf_session
+from price_store import PriceStore, update_store
+from config import PRICE_STORE_DIR
+from ml.features import MACRO_SYMBOLS
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -13,51 +19,36 @@ logger = logging.getLogger(__name__)
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), 'data', 'raw')
 MIN_HISTORY_DAYS = 500  # Approx 2 years
+HISTORY_DAYS = int(365 * 2.5)  # Buffer for 2 years + indicators
 
 class HistoryLoader:
-    def __init__(self):
+    def __init__(self, price_store=None):
+        """price_store: where histories are kept (default: the shared store at PRICE_STORE_DIR)."""
         os.makedirs(DATA_DIR, exist_ok=True)
+        self.store = price_store or PriceStore(PRICE_STORE_DIR)
         
     def fetch_macro_data(self):
-        """Fetch VIX, SPY, and GLD data."""
+        """Bring VIX, SPY, and GLD up to date in the price store."""
         logger.info("Fetching Macro Data (VIX, SPY, GLD)...")
-        tickers = ["^VIX", "SPY", "GLD"]
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=365*3) # get plenty of history
-        
-        data = yf.download(tickers, start=start_date, end=end_date, group_by='ticker', progress=False)
-        
-        # Format: Multi-index columns. We want 3 separate DataFrames or one combined suited for joining.
-        # Let's save them individually for easier lookups
-        
-        for t in tickers:
-            try:
-                df = data[t].copy()
-                if df.empty:
-                    logger.warning(f"Macro data for {t} is empty.")
-                    continue
-                    
-                # Standardize columns
-                df = df.rename(columns={"Close": "close", "Open": "open", "High": "high", "Low": "low", "Volume": "volume", "Adj Close": "adj_close"})
-                df.index.name = "date"
-                df = df.dropna()
-                
-                # Save
-                safe_t = t.replace("^", "")
-                save_path = os.path.join(DATA_DIR, f"macro_{safe_t}.parquet")
-                df.to_parquet(save_path)
-                logger.info(f"Saved macro data for {t} to {save_path}")
-            except Exception as e:
-                logger.error(f"Failed to process macro data {t}: {e}")
+        counts = update_store(self.store, MACRO_SYMBOLS.values())
+        if counts["failed"]:
+            logger.warning(f"Macro data missing for {counts['failed']} of {len(MACRO_SYMBOLS)} series.")
 
     def fetch_ticker_history(self, ticker):
         """Fetch 2y history for a single ticker."""
         try:
             end_date = datetime.now()
-            start_date = end_date - timedelta(days=365*2.5) # Buffer for 2 years + indicators
+            start_date = end_date - timedelta(days=HISTORY_DAYS)
             
-            df = yf.download(ticker, start=start_date, end=end_date, progress=False, actions=True)
+            df = yf.download(ticker, start=start_date, end=end_date, progress=False, actions=True, session=get_yf_session())
+            return self.validate_history(df)
             
+        except Exception as e:
+            return None, str(e)
+
+    def validate_history(self, df):
+        """Quality checks and column standardization for one ticker's daily bars. Returns (df or None, status)."""
+        try:
             if df.empty:
                 return None, "Empty Data"
                 
@@ -113,7 +104,7 @@ class HistoryLoader:
             return None, str(e)
 
     def ingest_history(self, tickers):
-        """Main entry point to fetch data for all tickers."""
+        """Main entry point to fetch data for all tickers. Returns the tickers that pass the quality checks."""
         
         # 1. Macro Data First
         self.fetch_macro_data()
@@ -123,25 +114,26 @@ class HistoryLoader:
         success = 0
         failed = 0
         
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_ticker = {executor.submit(self.fetch_ticker_history, t): t for t in tickers}
-            
-            for future in concurrent.futures.as_completed(future_to_ticker):
-                t = future_to_ticker[future]
-                try:
-                    df, status = future.result()
-                    if df is not None:
-                        save_path = os.path.join(DATA_DIR, f"{t}.parquet")
-                        df.to_parquet(save_path)
-                        success += 1
-                    else:
-                        logger.warning(f"Skipping {t}: {status}")
-                        failed += 1
-                except Exception as e:
-                    logger.error(f"Error processing {t}: {e}")
+        # Appends only the bars missing from the price store, in multi-ticker downloads
+        update_store(self.store, tickers)
+        start_date = datetime.now() - timedelta(days=HISTORY_DAYS)
+        passed = []
+        
+        for t in tickers:
+            try:
+                df, status = self.validate_history(self.store.read(t, start=start_date.date()))
+                if df is not None:
+                    passed.append(t)
+                    success += 1
+                else:
+                    logger.warning(f"Skipping {t}: {status}")
                     failed += 1
-                    
+            except Exception as e:
+                logger.error(f"Error processing {t}: {e}")
+                failed += 1
+                
         logger.info(f"Ingestion Complete. Success: {success}, Failed: {failed}")
+        return passed
 
 if __name__ == "__main__":
     # Test run
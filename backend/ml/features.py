@@ -6,6 +6,15 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Macro series joined onto every ticker: feature prefix -> Yahoo symbol
+MACRO_SYMBOLS = {"VIX": "^VIX", "SPY": "SPY", "GLD": "GLD"}
+
+def bars_to_frame(bars):
+    """Yahoo-style bars (Date index, Open/High/... columns) as the date/open/high/... frame used here."""
+    df = bars.reset_index()
+    df.columns = [str(c).lower().replace(" ", "_") for c in df.columns]
+    return df
+
 class FeatureEngineer:
     def __init__(self):
         pass
@@ -33,18 +42,22 @@ class FeatureEngineer:
         true_range = ranges.max(axis=1)
         return true_range.rolling(period).mean()
 
-    def add_macro_features(self, df, macro_dir):
-        """Join VIX, SPY, GLD data to the ticker dataframe."""
-        if not os.path.exists(macro_dir):
+    def add_macro_features(self, df, macro_dir=None, price_store=None):
+        """Join VIX, SPY, GLD data to the ticker dataframe, from the price store or macro_dir parquet files."""
+        if price_store is None and (not macro_dir or not os.path.exists(macro_dir)):
             return df
             
-        for name in ["VIX", "SPY", "GLD"]:
-            path = os.path.join(macro_dir, f"macro_{name}.parquet")
-            if os.path.exists(path):
-                macro_df = pd.read_parquet(path)
+        for name, symbol in MACRO_SYMBOLS.items():
+            macro_df = None
+            if price_store is not None:
+                macro_df = price_store.read(symbol, columns=["Close"]).rename(columns={"Close": "close"})
+                macro_df.index.name = "date"
+            elif os.path.exists(os.path.join(macro_dir, f"macro_{name}.parquet")):
+                macro_df = pd.read_parquet(os.path.join(macro_dir, f"macro_{name}.parquet"))
                 # Ensure index is datetime
                 # macro_df.index is already date from dataset.py
                 
+            if macro_df is not None and not macro_df.empty:
                 # We only want 'close' basically, maybe 30d trend
                 macro_df[f'{name}_close'] = macro_df['close']
                 macro_df[f'{name}_ret_30d'] = macro_df['close'].pct_change(30)
@@ -63,7 +76,7 @@ class FeatureEngineer:
                      df = df.join(features)
         return df
 
-    def generate_features(self, df, macro_dir=None):
+    def generate_features(self, df, macro_dir=None, price_store=None):
         """
         Main method to take raw OHLCV DataFrame and return features + target.
         Expects df to have: date, open, high, low, close, volume.
@@ -97,8 +110,8 @@ class FeatureEngineer:
             df['iv30'] = 0.0 # Or NaN
         
         # 3. Macro
-        if macro_dir:
-            df = self.add_macro_features(df, macro_dir)
+        if macro_dir or price_store is not None:
+            df = self.add_macro_features(df, macro_dir, price_store)
             
         return df.dropna()
 
@@ -4,7 +4,8 @@ import pickle
 import json
 import pandas as pd
 import logging
-from .features import FeatureEngineer
+from datetime import date, timedelta
+from .features import FeatureEngineer, bars_to_frame
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -14,9 +15,14 @@ BASE_DIR = os.path.dirname(__file__)
 MODEL_PATH = os.path.join(BASE_DIR, 'models', 'xgb_classifier.pkl')
 META_PATH = os.path.join(BASE_DIR, 'models', 'meta.json')
 DATA_RAW = os.path.join(BASE_DIR, 'data', 'raw')
+# Calendar days of bars read for one prediction (the 200-day MA plus warm-up)
+HISTORY_DAYS = 400
+OHLCV = ["Open", "High", "Low", "Close", "Volume"]
 
 class Predictor:
-    def __init__(self):
+    def __init__(self, price_store=None):
+        """price_store: price_store.PriceStore to read ticker and macro history from."""
+        self.price_store = price_store
         self.model = None
         self.features = []
         self.engineer = FeatureEngineer()
@@ -38,15 +44,21 @@ class Predictor:
             logger.error(f"Failed to load ML model: {e}")
             self.model = None
 
-    def predict_one(self, ticker, price_history_df):
+    def predict_one(self, ticker, price_history_df=None):
         """
         Run inference for a single stock.
-        price_history_df: DataFrame with OHLCV data (daily).
+        price_history_df: DataFrame with OHLCV data (daily). Read from the price store if omitted.
         """
-        if self.model is None or price_history_df.empty:
+        if self.model is None or (price_history_df is None and self.price_store is None):
             return None, 0.0
             
         try:
+            if price_history_df is None:
+                bars = self.price_store.read(ticker, columns=OHLCV, start=date.today() - timedelta(days=HISTORY_DAYS))
+                price_history_df = bars_to_frame(bars)
+            if price_history_df.empty:
+                return None, 0.0
+                
             # Prepare Data (Engineer features)
             # We assume price_history_df is already standard columns (open, high, low, close, volume, date)
             # Just verify lowercase
@@ -55,7 +67,7 @@ class Predictor:
             
             # Feature Gen
             # We point to local raw dir for macro if available
-            df = self.engineer.generate_features(df, macro_dir=DATA_RAW)
+            df = self.engineer.generate_features(df, macro_dir=DATA_RAW, price_store=self.price_store)
             
             if df.empty: return None, 0.0
             
@@ -1,23 +1,22 @@
 
 import os
-import glob
 import pandas as pd
 import numpy as np
 import xgboost as xgb
 import pickle
 import json
 from sklearn.metrics import classification_report, precision_score, accuracy_score
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
 
-from features import FeatureEngineer
+from features import FeatureEngineer, MACRO_SYMBOLS
+from dataset import HistoryLoader, HISTORY_DAYS
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 BASE_DIR = os.path.dirname(__file__)
-DATA_RAW = os.path.join(BASE_DIR, 'data', 'raw')
 MODEL_DIR = os.path.join(BASE_DIR, 'models')
 
 os.makedirs(MODEL_DIR, exist_ok=True)
@@ -25,36 +24,38 @@ os.makedirs(MODEL_DIR, exist_ok=True)
 class Trainer:
     def __init__(self):
         self.engineer = FeatureEngineer()
+        self.loader = HistoryLoader()
         
     def load_and_prep_data(self):
-        logger.info("Loading Parquet files...")
-        files = glob.glob(os.path.join(DATA_RAW, "*.parquet"))
+        logger.info("Loading price store histories...")
+        store = self.loader.store
+        macro = set(MACRO_SYMBOLS.values())
+        symbols = [s for s in store.symbols() if s not in macro]
+        start_date = (datetime.now() - timedelta(days=HISTORY_DAYS)).date()
         all_data = []
         
-        # Exclude macro files
-        files = [f for f in files if "macro_" not in f]
-        
         count = 0
-        for f in files:
+        for symbol in symbols:
             try:
-                df = pd.read_parquet(f)
-                if len(df) < 200: continue
+                # Same quality checks as HistoryLoader.ingest_history
+                df, status = self.loader.validate_history(store.read(symbol, start=start_date))
+                if df is None or len(df) < 200: continue
                 
                 # Feature Eng
-                df = self.engineer.generate_features(df, macro_dir=DATA_RAW)
+                df = self.engineer.generate_features(df, price_store=store)
                 df = self.engineer.generate_labels(df)
                 
                 if not df.empty:
                     # Add symbol for tracking if needed, or just append
-                    # df['symbol'] = os.path.basename(f).replace('.parquet', '')
+                    # df['symbol'] = symbol
                     all_data.append(df)
                     count += 1
                     
                 if count % 100 == 0:
-                    logger.info(f"Processed {count} files...")
+                    logger.info(f"Processed {count} symbols...")
                     
             except Exception as e:
-                logger.error(f"Error prep file {f}: {e}")
+                logger.error(f"Error prep symbol {symbol}: {e}")
                 
         if not all_data:
             raise ValueError("No valid training data found!")
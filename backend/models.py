@@ -12,6 +12,8 @@ class Stock(Base):
     sector = Column(String, nullable=True)
     industry = Column(String, nullable=True)
     last_updated = Column(DateTime(timezone=True), onupdate=func.now())
+    # Day of the last full IV history backfill (see iv_refresh)
+    iv_backfilled_on = Column(Date, nullable=True)
 
     results = relationship("ScreenResult", back_populates="stock")
     sentiment = relationship("StockSentiment", back_populates="stock", uselist=False)
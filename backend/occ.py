@@ -0,0 +1,114 @@
+"""
+OCC option symbols (as used by Polygon: O:AAPL250117C00150000) and a per-underlying
+model of which expiries and strikes get listed, learned from past chains.
+"""
+import re
+from collections import Counter, namedtuple
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+OCCContract = namedtuple("OCCContract", ["underlying", "expiration", "contract_type", "strike"])
+
+_OCC_RE = re.compile(r"^(?:O:)?([A-Z0-9.]+?)(\d{6})([CP])(\d{8})$")
+
+def build_occ_ticker(underlying: str, expiration: Union[date, str], contract_type: str, strike: float) -> str:
+    """
+    Polygon options ticker: O: + root + YYMMDD + C/P + strike * 1000 as 8 digits.
+    contract_type is "call"/"put" (or "C"/"P").
+    """
+    if isinstance(expiration, str):
+        expiration = date.fromisoformat(expiration)
+    cp = contract_type[0].upper()
+    if cp not in ("C", "P"):
+        raise ValueError(f"Unknown contract type: {contract_type}")
+    root = underlying.replace(".", "").upper()
+    return f"O:{root}{expiration:%y%m%d}{cp}{int(round(strike * 1000)):08d}"
+
+def parse_occ_ticker(ticker: str) -> OCCContract:
+    match = _OCC_RE.match(ticker)
+    if not match:
+        raise ValueError(f"Not an OCC option ticker: {ticker}")
+    root, ymd, cp, strike = match.groups()
+    return OCCContract(root, datetime.strptime(ymd, "%y%m%d").date(),
+                       "call" if cp == "C" else "put", int(strike) / 1000.0)
+
+def third_friday(year: int, month: int) -> date:
+    first = date(year, month, 1)
+    return first + timedelta(days=(4 - first.weekday()) % 7 + 14)
+
+class ChainModel:
+    """
+    Listing habits of one underlying: expiry weekday, whether weeklies are
+    listed, and the strike spacing at each price level. Used to guess which
+    contracts exist without listing the chain.
+    """
+
+    def __init__(self, underlying: str, weekday: int, weeklies: bool, strikes: np.ndarray):
+        self.underlying = underlying
+        self.weekday = weekday          # 0=Mon .. 4=Fri
+        self.weeklies = weeklies
+        self.strikes = strikes          # sorted unique strikes seen on recent chains
+
+    @classmethod
+    def from_contracts(cls, underlying: str, contracts: Iterable[Dict[str, Any]]) -> Optional["ChainModel"]:
+        """Learn from reference-data dicts (expiration_date, strike_price). None if too little data."""
+        expirations, strikes = set(), set()
+        for c in contracts:
+            if c.get("expiration_date") and c.get("strike_price"):
+                expirations.add(date.fromisoformat(c["expiration_date"]))
+                strikes.add(float(c["strike_price"]))
+        if len(expirations) < 2 or len(strikes) < 2:
+            return None
+        exps = sorted(expirations)
+        weekday = Counter(e.weekday() for e in exps).most_common(1)[0][0]
+        gaps = np.diff([e.toordinal() for e in exps])
+        weeklies = bool(np.median(gaps) <= 7)
+        return cls(underlying, weekday, weeklies, np.array(sorted(strikes)))
+
+    def expirations_between(self, start: date, end: date) -> List[date]:
+        """Expiries the model expects in [start, end]: every week if weeklies, else monthly third Fridays."""
+        if self.weeklies:
+            first = start + timedelta(days=(self.weekday - start.weekday()) % 7)
+            out, d = [], first
+            while d <= end:
+                out.append(d)
+                d += timedelta(days=7)
+            return out
+        out = []
+        year, month = start.year, start.month
+        while date(year, month, 1) <= end:
+            d = third_friday(year, month)
+            if start <= d <= end:
+                out.append(d)
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return out
+
+    def strike_step(self, price: float) -> float:
+        """Typical strike spacing within 20% of price."""
+        near = self.strikes[(self.strikes >= price * 0.8) & (self.strikes <= price * 1.2)]
+        if near.size < 2:
+            near = self.strikes
+        return float(np.median(np.diff(near)))
+
+    def strikes_near(self, price: float, n: int = 3) -> List[float]:
+        """The n ladder strikes closest to price, nearest first."""
+        step = self.strike_step(price)
+        base = round(price / step) * step
+        ladder = base + step * np.arange(-n, n + 1)
+        ladder = ladder[ladder > 0]
+        ladder = ladder[np.argsort(np.abs(ladder - price), kind="stable")][:n]
+        # Snap to strikes actually seen when one is within half a step
+        snapped = []
+        for k in ladder:
+            j = np.argmin(np.abs(self.strikes - k))
+            snapped.append(float(self.strikes[j]) if abs(self.strikes[j] - k) < step / 2 else float(round(k, 2)))
+        return list(dict.fromkeys(snapped))
+
+    def atm_candidates(self, price: float, target: date, earliest: date, latest: date,
+                       n_strikes: int = 2) -> List[Tuple[date, float]]:
+        """(expiration, strike) guesses ordered like the listing-based pick: expiry nearest target first, then strike nearest price."""
+        exps = sorted(self.expirations_between(earliest, latest), key=lambda e: abs((e - target).days))
+        strikes = self.strikes_near(price, n_strikes)
+        return [(e, k) for e in exps for k in strikes]
@@ -0,0 +1,169 @@
+"""
+One underlying's option chain as parallel NumPy arrays, parsed from a single
+(paged) Polygon chain snapshot (/v3/snapshot/options/{symbol}). IV30, the IV
+surface and LEAPs candidates are all computed from the same payload.
+"""
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from greeks import GreeksEngine
+from iv_surface import IVSurface
+from options_lib import IVEstimator, BinomialPricingModel
+
+def _num(value) -> float:
+    return float(value) if value not in (None, "") else np.nan
+
+class OptionChain:
+    """
+    Contracts of one symbol on one day, one array entry per contract:
+    ticker, days to expiry, strike, call/put, bid, ask, last, open interest,
+    volume and Polygon's implied volatility (NaN where not provided).
+    """
+
+    def __init__(self, symbol: str, spot: float, as_of: date, tickers: np.ndarray, expirations: np.ndarray,
+                 days: np.ndarray, strikes: np.ndarray, is_call: np.ndarray, bid: np.ndarray, ask: np.ndarray,
+                 last: np.ndarray, open_interest: np.ndarray, volume: np.ndarray, iv: np.ndarray):
+        self.symbol = symbol
+        self.spot = float(spot)
+        self.as_of = as_of
+        self.tickers = tickers              # (n,) str
+        self.expirations = expirations      # (n,) ISO date str
+        self.days = days                    # (n,) calendar days to expiry
+        self.strikes = strikes
+        self.is_call = is_call              # (n,) bool
+        self.bid = bid
+        self.ask = ask
+        self.last = last
+        self.open_interest = open_interest
+        self.volume = volume
+        self.iv = iv
+        self._ivs = None
+
+    @classmethod
+    def from_snapshots(cls, symbol: str, snapshots: Iterable[Dict[str, Any]], as_of: date,
+                       spot: float = None) -> Optional["OptionChain"]:
+        """
+        Parse chain snapshot results. spot defaults to the snapshot's underlying
+        price. Returns None if there are no usable contracts or no spot.
+        """
+        rows = []
+        for snap in snapshots:
+            d = snap.get("details", {})
+            if not d.get("expiration_date") or not d.get("strike_price"):
+                continue
+            quote = snap.get("last_quote", {})
+            bid, ask = _num(quote.get("bid")), _num(quote.get("ask"))
+            mid = _num(quote.get("midpoint"))
+            if np.isfinite(mid) and not (np.isfinite(bid) and np.isfinite(ask)):
+                # Only the midpoint quoted: treat as a zero-width market
+                bid = ask = mid
+            last = _num(snap.get("last_trade", {}).get("price") or snap.get("day", {}).get("close"))
+            rows.append((d.get("ticker", ""), d["expiration_date"], float(d["strike_price"]),
+                         d.get("contract_type") == "call", bid, ask, last,
+                         _num(snap.get("open_interest")), _num(snap.get("day", {}).get("volume")),
+                         _num(snap.get("implied_volatility") or None)))
+            if spot is None:
+                spot = snap.get("underlying_asset", {}).get("price")
+        if not rows or not spot:
+            return None
+
+        tickers, expirations, strikes, is_call, bid, ask, last, oi, volume, iv = zip(*rows)
+        expirations = np.array(expirations)
+        days = (expirations.astype("datetime64[D]") - np.datetime64(as_of, "D")).astype(float)
+        return cls(symbol, spot, as_of, np.array(tickers), expirations, days, np.array(strikes),
+                   np.array(is_call), np.array(bid), np.array(ask), np.array(last),
+                   np.array(oi), np.array(volume), np.array(iv))
+
+    def __len__(self) -> int:
+        return self.strikes.size
+
+    @property
+    def mid(self) -> np.ndarray:
+        """Quote midpoint where there is a two-sided market, else the last trade."""
+        quoted = (self.bid > 0) & (self.ask >= self.bid)
+        return np.where(quoted, (self.bid + self.ask) / 2, self.last)
+
+    def implied_vols(self) -> np.ndarray:
+        """Polygon's IV where given, else solved from the midpoint in one batch. NaN where unsolvable."""
+        if self._ivs is None:
+            ivs = self.iv.copy()
+            prices = self.mid
+            missing = ~np.isfinite(ivs) & np.isfinite(prices) & (prices > 0) & (self.days > 0)
+            if missing.any():
+                ivs[missing] = IVEstimator.impl_vol_batch(prices[missing], self.spot, self.strikes[missing],
+                                                          self.days[missing] / 365.0, is_call=self.is_call[missing])
+            self._ivs = ivs
+        return self._ivs
+
+    def atm_iv(self, target_days: float = 30, min_days: float = 7) -> Optional[float]:
+        """
+        Average call/put IV at the strike nearest spot, on the expiry nearest
+        target_days that has both sides priced (same pick as get_current_iv).
+        """
+        ivs = self.implied_vols()
+        usable = np.isfinite(ivs) & (self.days >= min_days)
+        expiries = np.unique(self.days[usable])
+        for exp_days in expiries[np.argsort(np.abs(expiries - target_days), kind="stable")]:
+            at_exp = usable & (self.days == exp_days)
+            calls, puts = at_exp & self.is_call, at_exp & ~self.is_call
+            common = np.intersect1d(self.strikes[calls], self.strikes[puts])
+            if common.size == 0:
+                continue
+            strike = common[np.argmin(np.abs(common - self.spot))]
+            c_iv = ivs[calls & (self.strikes == strike)][0]
+            p_iv = ivs[puts & (self.strikes == strike)][0]
+            return float((c_iv + p_iv) / 2)
+        return None
+
+    def surface(self) -> Optional[IVSurface]:
+        """IV surface from the out-of-the-money contracts (more liquid, no early-exercise premium)."""
+        ivs = self.implied_vols()
+        otm = np.where(self.is_call, self.strikes >= self.spot, self.strikes <= self.spot)
+        return IVSurface.from_quotes(self.symbol, self.spot, self.as_of, self.days[otm], self.strikes[otm], ivs[otm])
+
+    def leaps_candidates(self, band: str = "stock_replacement", min_days: float = 365, contract_type: str = "call",
+                         min_open_interest: float = 0, r: float = 0.05) -> List[Dict[str, Any]]:
+        """
+        Long-dated contracts whose delta falls in a greeks.LEAPS_DELTA_BANDS band,
+        best match first. Puts are priced off their American (binomial) IV,
+        since early exercise matters over LEAPs horizons.
+        """
+        is_call = contract_type == "call"
+        prices = self.mid
+        sel = np.flatnonzero((self.days >= min_days) & (self.is_call == is_call) & np.isfinite(prices)
+                             & (prices > 0) & ~(self.open_interest < min_open_interest))
+        if sel.size == 0:
+            return []
+
+        t_years = self.days[sel] / 365.0
+        sigma = self.implied_vols()[sel]
+        if not is_call:
+            american = BinomialPricingModel.impl_vol_batch(prices[sel], self.spot, self.strikes[sel], t_years,
+                                                           r=r, is_call=False)
+            sigma = np.where(np.isfinite(american), american, sigma)
+        ok = np.isfinite(sigma)
+        sel, t_years, sigma = sel[ok], t_years[ok], sigma[ok]
+
+        greeks = GreeksEngine.compute(self.spot, self.strikes[sel], t_years, r, sigma, is_call)
+        out = []
+        for j in GreeksEngine.select_by_delta(greeks["delta"], band):
+            i = sel[j]
+            out.append({
+                "ticker": str(self.tickers[i]),
+                "expiration_date": str(self.expirations[i]),
+                "days": int(self.days[i]),
+                "strike": float(self.strikes[i]),
+                "contract_type": contract_type,
+                "bid": float(self.bid[i]) if np.isfinite(self.bid[i]) else None,
+                "ask": float(self.ask[i]) if np.isfinite(self.ask[i]) else None,
+                "mid": float(prices[i]),
+                "open_interest": int(self.open_interest[i]) if np.isfinite(self.open_interest[i]) else None,
+                "iv": float(sigma[j]),
+                "delta": float(greeks["delta"][j]),
+                "gamma": float(greeks["gamma"][j]),
+                "theta": float(greeks["theta"][j]),
+                "vega": float(greeks["vega"][j]),
+            })
+        return out
@@ -1,4 +1,6 @@
 import math
+import numpy as np
+from scipy.special import ndtr
 from scipy.stats import norm
 
 class OptionPricingModel:
@@ -35,29 +37,126 @@ class OptionPricingModel:
         put_price = K * math.exp(-r * T) * norm.cdf(-d2) - S * norm.cdf(-d1)
         return put_price
 
+    @staticmethod
+    def _d1_d2(S, K, T, r, sigma):
+        """
+        Vectorized d1/d2. Inputs must already be broadcast float arrays with T > 0.
+        """
+        sqrt_t = np.sqrt(T)
+        sig_sqrt_t = sigma * sqrt_t
+        d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / sig_sqrt_t
+        d2 = d1 - sig_sqrt_t
+        return d1, d2
+
+    @staticmethod
+    def black_scholes_batch(S, K, T, r, sigma, is_call=True):
+        """
+        Price many European options in one NumPy pass.
+        All arguments accept scalars or arrays and are broadcast against each other.
+        is_call: bool or boolean array (True = call, False = put).
+        Contracts with T <= 0 are priced at intrinsic value, matching the scalar API.
+        Returns a float ndarray with the broadcast shape.
+        """
+        S, K, T, r, sigma, is_call = np.broadcast_arrays(
+            np.asarray(S, dtype=float), np.asarray(K, dtype=float),
+            np.asarray(T, dtype=float), np.asarray(r, dtype=float),
+            np.asarray(sigma, dtype=float), np.asarray(is_call, dtype=bool)
+        )
+        intrinsic = np.where(is_call, np.maximum(S - K, 0.0), np.maximum(K - S, 0.0))
+        live = T > 0
+        if not live.any():
+            return intrinsic
+
+        s, k, t, rr, sig = S[live], K[live], T[live], r[live], sigma[live]
+        call = is_call[live]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            d1, d2 = OptionPricingModel._d1_d2(s, k, t, rr, sig)
+        disc_k = k * np.exp(-rr * t)
+        # Put via the sign flip: P = K e^{-rT} N(-d2) - S N(-d1)
+        sign = np.where(call, 1.0, -1.0)
+        prices = sign * (s * ndtr(sign * d1) - disc_k * ndtr(sign * d2))
+
+        out = intrinsic.copy()
+        out[live] = prices
+        return out
+
+    @staticmethod
+    def black_scholes_call_batch(S, K, T, r, sigma):
+        """
+        Vectorized Black-Scholes call price. See black_scholes_batch.
+        """
+        return OptionPricingModel.black_scholes_batch(S, K, T, r, sigma, is_call=True)
+
+    @staticmethod
+    def black_scholes_put_batch(S, K, T, r, sigma):
+        """
+        Vectorized Black-Scholes put price. See black_scholes_batch.
+        """
+        return OptionPricingModel.black_scholes_batch(S, K, T, r, sigma, is_call=False)
+
 class IVEstimator:
     @staticmethod
-    def impl_vol_call(market_price, S, K, T, r=0.05):
+    def impl_vol_call(market_price, S, K, T, r=0.05, initial_sigma=None, return_iterations=False):
         """
         Calculate Implied Volatility for a call option using Newton-Raphson.
+        initial_sigma: optional warm start (e.g. yesterday's IV). Defaults to a
+                       Corrado-Miller closed-form approximation.
+        return_iterations: if True, return (sigma, iterations).
         """
-        return IVEstimator._impl_vol_generic(market_price, S, K, T, r, is_call=True)
+        return IVEstimator._impl_vol_generic(market_price, S, K, T, r, is_call=True,
+                                             initial_sigma=initial_sigma, return_iterations=return_iterations)
 
     @staticmethod
-    def impl_vol_put(market_price, S, K, T, r=0.05):
+    def impl_vol_put(market_price, S, K, T, r=0.05, initial_sigma=None, return_iterations=False):
         """
         Calculate Implied Volatility for a put option using Newton-Raphson.
+        See impl_vol_call for initial_sigma / return_iterations.
+        """
+        return IVEstimator._impl_vol_generic(market_price, S, K, T, r, is_call=False,
+                                             initial_sigma=initial_sigma, return_iterations=return_iterations)
+
+    @staticmethod
+    def initial_guess(market_price, S, K, T, r=0.05, is_call=True):
+        """
+        Closed-form starting point for the IV solvers (vectorized).
+        Uses the Corrado-Miller (1996) approximation, which reduces to
+        Brenner-Subrahmanyam (sigma ~ sqrt(2*pi/T) * C / S) at the money.
+        Puts are converted to calls through put-call parity. Where the
+        approximation has no real solution (far from the money) we fall back to
+        the Manaster-Koehler inflection point sqrt(2|ln(S/K) + rT| / T), from
+        which Newton-Raphson converges monotonically.
         """
-        return IVEstimator._impl_vol_generic(market_price, S, K, T, r, is_call=False)
+        price, S, K, T, r, is_call = np.broadcast_arrays(
+            np.asarray(market_price, dtype=float), np.asarray(S, dtype=float),
+            np.asarray(K, dtype=float), np.asarray(T, dtype=float),
+            np.asarray(r, dtype=float), np.asarray(is_call, dtype=bool)
+        )
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            disc_k = K * np.exp(-r * T)
+            call_price = np.where(is_call, price, price + S - disc_k)
+            half_gap = call_price - (S - disc_k) / 2.0
+            radicand = half_gap ** 2 - (S - disc_k) ** 2 / math.pi
+            cm = np.sqrt(2.0 * math.pi / T) / (S + disc_k) * (half_gap + np.sqrt(radicand))
+            mk = np.sqrt(2.0 * np.abs(np.log(S / K) + r * T) / T)
+            guess = np.where(np.isfinite(cm) & (cm > 0), cm, mk)
+            guess = np.where(np.isfinite(guess) & (guess > 0), guess, 0.5)
+        return np.clip(guess, 0.01, 5.0)
 
     @staticmethod
-    def _impl_vol_generic(market_price, S, K, T, r, is_call):
-        sigma = 0.5 # Initial guess
+    def _impl_vol_generic(market_price, S, K, T, r, is_call, initial_sigma=None, return_iterations=False):
         max_iterations = 100
         precision = 1.0e-5
 
+        def finish(sigma, iterations):
+            return (sigma, iterations) if return_iterations else sigma
+
         if T <= 0:
-            return None
+            return finish(None, 0)
+
+        if initial_sigma is not None and initial_sigma > 0:
+            sigma = float(initial_sigma)
+        else:
+            sigma = float(IVEstimator.initial_guess(market_price, S, K, T, r, is_call))
 
         for i in range(max_iterations):
             if is_call:
@@ -68,7 +167,7 @@ class IVEstimator:
             diff = market_price - price
             
             if abs(diff) < precision:
-                return sigma
+                return finish(sigma, i + 1)
                 
             # Calculate Vega (same for Call and Put)
             try:
@@ -76,10 +175,10 @@ class IVEstimator:
                 vega = S * norm.pdf(d1) * math.sqrt(T)
             except ValueError:
                 # Math domain error or overflow
-                return None
+                return finish(None, i + 1)
             
             if vega < 1.0e-8:
-                return None # Avoid division by zero or overflow
+                return finish(None, i + 1) # Avoid division by zero or overflow
                 
                 
             sigma = sigma + diff / vega
@@ -90,4 +189,277 @@ class IVEstimator:
             elif sigma > 20: # Cap at 2000% volatility
                 sigma = 20
             
-        return sigma
+        return finish(sigma, max_iterations)
+
+    @staticmethod
+    def impl_vol_batch(market_price, S, K, T, r=0.05, is_call=True, initial_sigma=None, return_iterations=False):
+        """
+        Calculate Implied Volatility for many options at once.
+        All arguments accept scalars or arrays and are broadcast against each other.
+        Runs Newton-Raphson on every contract in parallel, dropping contracts from the
+        active set as they converge. Contracts whose vega collapses (deep ITM/OTM) or
+        that fail to converge are finished with a vectorized bisection.
+        initial_sigma: optional warm start (scalar or array). Non-finite or non-positive
+                       entries fall back to IVEstimator.initial_guess.
+        return_iterations: if True, return (sigma, iterations) where iterations is an
+                           int array of Newton + bisection steps per contract.
+        Returns a float ndarray; contracts with no solution (T <= 0, price outside
+        no-arbitrage bounds, no convergence) are NaN.
+        """
+        max_iterations = 100
+        precision = 1.0e-5
+        sigma_min, sigma_max = 0.001, 20.0
+
+        price, S, K, T, r, is_call, seed = np.broadcast_arrays(
+            np.asarray(market_price, dtype=float), np.asarray(S, dtype=float),
+            np.asarray(K, dtype=float), np.asarray(T, dtype=float),
+            np.asarray(r, dtype=float), np.asarray(is_call, dtype=bool),
+            np.asarray(np.nan if initial_sigma is None else initial_sigma, dtype=float)
+        )
+        result = np.full(price.shape, np.nan)
+        iterations = np.zeros(price.shape, dtype=int)
+
+        def finish():
+            return (result, iterations) if return_iterations else result
+
+        # No-arbitrage bounds: intrinsic (discounted strike) <= price < upper bound
+        with np.errstate(invalid="ignore", over="ignore"):
+            disc_k = K * np.exp(-r * np.where(T > 0, T, 0.0))
+            lower = np.where(is_call, np.maximum(S - disc_k, 0.0), np.maximum(disc_k - S, 0.0))
+            upper = np.where(is_call, S, disc_k)
+            solvable = (T > 0) & np.isfinite(price) & (price > lower) & (price < upper) & (S > 0) & (K > 0)
+
+        idx = np.flatnonzero(solvable)
+        if idx.size == 0:
+            return finish()
+
+        p, s, k, t, rr, call, warm = (a.ravel()[idx] for a in (price, S, K, T, r, is_call, seed))
+        sigma = IVEstimator.initial_guess(p, s, k, t, rr, call)
+        use_warm = np.isfinite(warm) & (warm > 0)
+        sigma[use_warm] = np.clip(warm[use_warm], sigma_min, sigma_max)
+        steps = np.zeros(idx.size, dtype=int)
+        done = np.zeros(idx.size, dtype=bool)
+
+        # 1. Newton-Raphson on the active (unconverged, well-conditioned) set
+        active = np.arange(idx.size)
+        for _ in range(max_iterations):
+            if active.size == 0:
+                break
+            steps[active] += 1
+            sa, ka, ta, ra, siga = s[active], k[active], t[active], rr[active], sigma[active]
+            with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+                model = OptionPricingModel.black_scholes_batch(sa, ka, ta, ra, siga, is_call=call[active])
+                d1, _ = OptionPricingModel._d1_d2(sa, ka, ta, ra, siga)
+                vega = sa * norm.pdf(d1) * np.sqrt(ta)
+            diff = p[active] - model
+
+            converged = np.abs(diff) < precision
+            done[active[converged]] = True
+
+            flat = ~converged & ~(vega >= 1.0e-8)  # also catches NaN vega
+            step = ~converged & ~flat
+            stepping = active[step]
+            sigma[stepping] = np.clip(siga[step] + diff[step] / vega[step], sigma_min, sigma_max)
+            active = stepping
+
+        # 2. Bisection for tiny-vega and non-converged contracts (price is monotonic in sigma)
+        fallback = np.flatnonzero(~done)
+        if fallback.size:
+            lo = np.full(fallback.size, sigma_min)
+            hi = np.full(fallback.size, sigma_max)
+            pf, sf, kf, tf, rf, cf = (a[fallback] for a in (p, s, k, t, rr, call))
+            for _ in range(max_iterations):
+                steps[fallback] += 1
+                mid = 0.5 * (lo + hi)
+                with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+                    model = OptionPricingModel.black_scholes_batch(sf, kf, tf, rf, mid, is_call=cf)
+                too_low = model < pf
+                lo = np.where(too_low, mid, lo)
+                hi = np.where(too_low, hi, mid)
+                if np.all(hi - lo < precision):
+                    break
+            mid = 0.5 * (lo + hi)
+            # Pinned at either end of the bracket means no volatility reproduces the price
+            ok = (hi - lo < precision) & (lo > sigma_min) & (hi < sigma_max)
+            sigma[fallback] = mid
+            done[fallback] = ok
+
+        flat_result = result.ravel()
+        flat_result[idx[done]] = sigma[done]
+        iterations.ravel()[idx] = steps
+        return finish()
+
+class BinomialPricingModel:
+    """
+    Vectorized American option pricing on recombining binomial trees.
+    Every contract in a batch gets its own tree; backward induction runs over
+    all of them at once as (contracts x nodes) arrays. Dividends are modelled
+    as a continuous yield q, which is what makes early exercise of calls matter.
+    """
+    DEFAULT_STEPS = 101
+    CHUNK_SIZE = 4096  # contracts per tree batch, bounds memory at CHUNK_SIZE x (steps + 1)
+
+    @staticmethod
+    def _peizer_pratt(z, n):
+        """Peizer-Pratt method 2 inversion used by Leisen-Reimer (n must be odd)."""
+        z = np.asarray(z, dtype=float)
+        term = z / (n + 1.0 / 3.0 + 0.1 / (n + 1.0))
+        return 0.5 + np.sign(z) * 0.5 * np.sqrt(1.0 - np.exp(-(term ** 2) * (n + 1.0 / 6.0)))
+
+    @staticmethod
+    def _tree_params(S, K, T, r, sigma, q, steps, method):
+        dt = T / steps
+        growth = np.exp((r - q) * dt)
+        if method == "crr":
+            u = np.exp(sigma * np.sqrt(dt))
+            d = 1.0 / u
+            p = (growth - d) / (u - d)
+        elif method == "lr":
+            d1, d2 = OptionPricingModel._d1_d2(S, K, T, r - q, sigma)
+            p = BinomialPricingModel._peizer_pratt(d2, steps)
+            p_prime = BinomialPricingModel._peizer_pratt(d1, steps)
+            u = growth * p_prime / p
+            d = (growth - p * u) / (1.0 - p)
+        else:
+            raise ValueError(f"Unknown binomial method: {method}")
+        return u, d, p, np.exp(-r * dt)
+
+    @staticmethod
+    def _price_chunk(S, K, T, r, sigma, q, is_call, steps, method, american):
+        u, d, p, disc = BinomialPricingModel._tree_params(S, K, T, r, sigma, q, steps, method)
+        sign = np.where(is_call, 1.0, -1.0)[:, None]
+        u, d, p, disc, S, K = (a[:, None] for a in (u, d, p, disc, S, K))
+        log_ud = np.log(u / d)
+
+        # Terminal layer: node j has j up-moves
+        j = np.arange(steps + 1)[None, :]
+        spot = S * d ** steps * np.exp(j * log_ud)
+        values = np.maximum(sign * (spot - K), 0.0)
+        delta = None
+        q_down = 1.0 - p
+        for i in range(steps - 1, -1, -1):
+            values = disc * (p * values[:, 1:i + 2] + q_down * values[:, :i + 1])
+            if american:
+                # Node (i, j) sits one down-move below node (i + 1, j)
+                spot = spot[:, :i + 1] / d
+                np.maximum(values, sign * (spot - K), out=values)
+            if i == 1:
+                delta = (values[:, 1] - values[:, 0]) / (S[:, 0] * (u[:, 0] - d[:, 0]))
+        if delta is None:  # steps == 1
+            delta = np.full(S.shape[0], np.nan)
+        return values[:, 0], delta
+
+    @staticmethod
+    def price_batch(S, K, T, r, sigma, q=0.0, is_call=True, steps=None, method="lr",
+                    american=True, return_delta=False):
+        """
+        Price many options on binomial trees.
+        S, K, T, r, sigma, q (continuous dividend yield), is_call: scalars or arrays, broadcast.
+        steps: tree depth (Leisen-Reimer rounds up to an odd number).
+        method: "lr" (Leisen-Reimer, accurate at low step counts) or "crr" (Cox-Ross-Rubinstein).
+        american: allow early exercise; False gives the European tree price.
+        Contracts with T <= 0 are priced at intrinsic value.
+        Returns a float ndarray (and the tree delta if return_delta=True).
+        """
+        steps = int(steps or BinomialPricingModel.DEFAULT_STEPS)
+        if method == "lr" and steps % 2 == 0:
+            steps += 1
+
+        S, K, T, r, sigma, q, is_call = np.broadcast_arrays(
+            np.asarray(S, dtype=float), np.asarray(K, dtype=float),
+            np.asarray(T, dtype=float), np.asarray(r, dtype=float),
+            np.asarray(sigma, dtype=float), np.asarray(q, dtype=float),
+            np.asarray(is_call, dtype=bool)
+        )
+        shape = S.shape
+        S, K, T, r, sigma, q, is_call = (a.ravel() for a in (S, K, T, r, sigma, q, is_call))
+
+        prices = np.where(is_call, np.maximum(S - K, 0.0), np.maximum(K - S, 0.0))
+        deltas = np.where(is_call, (S > K) * 1.0, (S < K) * -1.0)
+        live = np.flatnonzero(T > 0)
+        chunk = BinomialPricingModel.CHUNK_SIZE
+        for start in range(0, live.size, chunk):
+            idx = live[start:start + chunk]
+            with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+                prices[idx], deltas[idx] = BinomialPricingModel._price_chunk(
+                    S[idx], K[idx], T[idx], r[idx], sigma[idx], q[idx], is_call[idx], steps, method, american
+                )
+
+        if return_delta:
+            return prices.reshape(shape), deltas.reshape(shape)
+        return prices.reshape(shape)
+
+    @staticmethod
+    def impl_vol_batch(market_price, S, K, T, r=0.05, q=0.0, is_call=True, steps=None, method="lr"):
+        """
+        American implied volatility for many contracts at once.
+        Starts from the European Black-Scholes IV (IVEstimator.impl_vol_batch) and
+        refines with Newton steps on the tree price, using the Black-Scholes vega as
+        the slope. Contracts that don't converge are finished by bisection.
+        Returns a float ndarray with NaN where no volatility reproduces the price.
+        """
+        max_newton = 20
+        max_bisect = 60
+        precision = 1.0e-4
+        sigma_min, sigma_max = 0.001, 5.0
+
+        price, S, K, T, r, q, is_call = np.broadcast_arrays(
+            np.asarray(market_price, dtype=float), np.asarray(S, dtype=float),
+            np.asarray(K, dtype=float), np.asarray(T, dtype=float),
+            np.asarray(r, dtype=float), np.asarray(q, dtype=float),
+            np.asarray(is_call, dtype=bool)
+        )
+        shape = price.shape
+        price, S, K, T, r, q, is_call = (a.ravel() for a in (price, S, K, T, r, q, is_call))
+        result = np.full(price.size, np.nan)
+
+        intrinsic = np.where(is_call, np.maximum(S - K, 0.0), np.maximum(K - S, 0.0))
+        upper = np.where(is_call, S, K)
+        # A price at (or within noise of) intrinsic value means immediate exercise: IV is undefined
+        idx = np.flatnonzero((T > 0) & np.isfinite(price) & (price > intrinsic + 1.0e-6) & (price < upper))
+        if idx.size == 0:
+            return result.reshape(shape)
+
+        p, s, k, t, rr, qq, call = (a[idx] for a in (price, S, K, T, r, q, is_call))
+
+        def tree(sig, sel):
+            return BinomialPricingModel.price_batch(s[sel], k[sel], t[sel], rr[sel], sig, qq[sel],
+                                                    call[sel], steps=steps, method=method)
+
+        # European seed: strip the dividend by working on the forward-adjusted spot
+        seed = IVEstimator.impl_vol_batch(p, s * np.exp(-qq * t), k, t, rr, is_call=call)
+        sigma = np.where(np.isfinite(seed), seed, 0.3)
+        done = np.zeros(idx.size, dtype=bool)
+
+        active = np.arange(idx.size)
+        for _ in range(max_newton):
+            if active.size == 0:
+                break
+            sig = sigma[active]
+            diff = p[active] - tree(sig, active)
+            converged = np.abs(diff) < precision
+            done[active[converged]] = True
+            with np.errstate(divide="ignore", invalid="ignore"):
+                d1, _ = OptionPricingModel._d1_d2(s[active], k[active], t[active], rr[active] - qq[active], sig)
+                vega = s[active] * np.exp(-qq[active] * t[active]) * norm.pdf(d1) * np.sqrt(t[active])
+            step = ~converged & (vega >= 1.0e-8)
+            stepping = active[step]
+            sigma[stepping] = np.clip(sig[step] + diff[step] / vega[step], sigma_min, sigma_max)
+            active = stepping
+
+        fallback = np.flatnonzero(~done)
+        if fallback.size:
+            lo = np.full(fallback.size, sigma_min)
+            hi = np.full(fallback.size, sigma_max)
+            for _ in range(max_bisect):
+                mid = 0.5 * (lo + hi)
+                too_low = tree(mid, fallback) < p[fallback]
+                lo = np.where(too_low, mid, lo)
+                hi = np.where(too_low, hi, mid)
+                if np.all(hi - lo < 1.0e-5):
+                    break
+            sigma[fallback] = 0.5 * (lo + hi)
+            done[fallback] = (hi - lo < 1.0e-5) & (lo > sigma_min) & (hi < sigma_max)
+
+        result[idx[done]] = sigma[done]
+        return result.reshape(shape)
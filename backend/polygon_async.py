@@ -0,0 +1,271 @@
+import time
+import asyncio
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Dict, List, Optional, TypeVar
+
+import aiohttp
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+from config import POLYGON_API_KEY, POLYGON_MAX_IN_FLIGHT, ENABLE_HTTP_CACHE, HTTP_CACHE_PATH, HTTP_CACHE_MAX_MB
+from http_cache import ResponseCache, cache_key, ttl_for
+from http_session import parse_json
+from utils import RetryPolicy, RETRY_BUDGET, get_circuit_breaker
+from rate_limiter import get_rate_limiter, polygon_bucket
+from replay import current_tape, taping
+import iv_selection
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Shared by the sync PolygonProvider and the async client: one retry budget,
+# one breaker for everything that talks to Polygon in this process
+POLYGON_RETRY = RetryPolicy("polygon", retries=6, backoff_in_seconds=1, max_backoff=30,
+                            budget=RETRY_BUDGET, breaker=get_circuit_breaker("polygon"))
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """
+    Run a coroutine to completion from synchronous code. If this thread already
+    has a running event loop (e.g. called from inside an async handler), the
+    coroutine runs on a fresh loop in a helper thread instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    result = {}
+    def runner():
+        try:
+            result["value"] = asyncio.run(coro)
+        except BaseException as e:
+            result["error"] = e
+    thread = threading.Thread(target=runner)
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+def _status_error(url: str, status: int) -> aiohttp.ClientResponseError:
+    """The error aiohttp's raise_for_status gives for a replayed error status."""
+    info = aiohttp.RequestInfo(URL(url), "GET", CIMultiDictProxy(CIMultiDict()), URL(url))
+    return aiohttp.ClientResponseError(info, (), status=status, message=f"HTTP {status}")
+
+class AsyncPolygonClient:
+    """
+    asyncio Polygon client.
+
+    Every request goes through one semaphore, so POLYGON_MAX_IN_FLIGHT bounds the
+    requests in flight across all coroutines using this client, however many
+    are gathered at once. Responses go through the same disk cache as
+    PolygonProvider. Use as an async context manager, or call the *_sync
+    wrappers from synchronous code.
+    """
+    BASE_URL = "https://api.polygon.io"
+
+    def __init__(self, api_key: str = POLYGON_API_KEY, max_in_flight: int = POLYGON_MAX_IN_FLIGHT,
+                 http_cache: Optional[ResponseCache] = None):
+        self.api_key = api_key
+        self.max_in_flight = max_in_flight
+        if http_cache is None and ENABLE_HTTP_CACHE and not taping():
+            http_cache = ResponseCache(HTTP_CACHE_PATH, HTTP_CACHE_MAX_MB * 1024 * 1024)
+        self.http_cache = http_cache
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> "AsyncPolygonClient":
+        await self._open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _open(self):
+        if self._session is None:
+            # Semaphore and session belong to the running loop
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+            connector = aiohttp.TCPConnector(limit=self.max_in_flight, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=30),
+                headers={"Accept-Encoding": "gzip, deflate"},
+            )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+            self._semaphore = None
+
+    async def _get_json(self, endpoint: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
+        params = dict(params or {})
+        cache = self.http_cache
+        if cache is None:
+            return (await self._fetch_json(endpoint, params))[0]
+
+        # The cache is SQLite: keep its reads and writes off the event loop
+        key = cache_key(endpoint, params)
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            return cached
+        data, content = await self._fetch_json(endpoint, params)
+        await asyncio.to_thread(cache.put, key, content, ttl_for(endpoint, params))
+        return data
+
+    @POLYGON_RETRY
+    async def _fetch_json(self, endpoint: str, params: Dict[str, Any]):
+        """Network fetch (or the replay tape's). Returns (parsed json, raw body)."""
+        url = f"{self.BASE_URL}{endpoint}"
+        tape = current_tape()
+        if tape is not None and tape.replaying:
+            record = await tape.replay_async("GET", url, params)
+            if record.status >= 400:
+                raise _status_error(url, record.status)
+            return parse_json(record.body), record.body
+
+        await self._open()
+        limiter = get_rate_limiter()
+        if limiter:
+            await limiter.acquire_async(polygon_bucket(endpoint))
+        # Hold the slot only for the request itself, not for retry sleeps
+        async with self._semaphore:
+            start = time.perf_counter()
+            try:
+                async with self._session.get(url, params={**params, "apiKey": self.api_key}) as resp:
+                    content = await resp.read()
+            except Exception as e:
+                if tape is not None:
+                    await asyncio.to_thread(tape.record, "GET", url, params, error=e, latency=time.perf_counter() - start)
+                raise
+        if tape is not None:
+            await asyncio.to_thread(tape.record, "GET", url, params, resp.status, content, latency=time.perf_counter() - start)
+        resp.raise_for_status()
+        return parse_json(content), content
+
+    async def _get_paged(self, endpoint: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Follow next_url cursors and return all results."""
+        results = []
+        while True:
+            res = await self._get_json(endpoint, params)
+            results.extend(res.get("results", []))
+            next_url = res.get("next_url")
+            if not next_url or not next_url.startswith(self.BASE_URL):
+                break
+            endpoint = next_url[len(self.BASE_URL):]
+            params = {}
+        return results
+
+    # --- Reference data and snapshots ---
+
+    async def list_contracts(self, symbol: str, expired: bool = False, **filters) -> List[Dict[str, Any]]:
+        """
+        Options contracts for an underlying. filters are passed through as query
+        params, with "__" for "." (expiration_date__gte="2024-01-01").
+        """
+        params = {
+            "underlying_ticker": symbol,
+            "expired": "true" if expired else "false",
+            "limit": 1000,
+            "sort": "expiration_date",
+            "order": "asc",
+        }
+        params.update({k.replace("__", "."): v for k, v in filters.items() if v is not None})
+        return await self._get_paged("/v3/reference/options/contracts", params)
+
+    async def get_all_contracts(self, symbol: str, min_strike: float = None, max_strike: float = None) -> List[Dict[str, Any]]:
+        """Expired and active contracts from 400 days ago on, both listings fetched concurrently."""
+        start_date = (datetime.now() - timedelta(days=400)).strftime("%Y-%m-%d")
+        filters = {"expiration_date__gte": start_date, "strike_price__gte": min_strike or None,
+                   "strike_price__lte": max_strike or None}
+        expired, active = await asyncio.gather(
+            self.list_contracts(symbol, expired=True, **filters),
+            self.list_contracts(symbol, expired=False, **filters),
+        )
+        return expired + active
+
+    async def get_option_snapshot(self, option_ticker: str) -> Dict[str, Any]:
+        return await self._get_json(f"/v2/snapshot/locale/us/markets/options/tickers/{option_ticker}")
+
+    async def get_chain_snapshot(self, symbol: str, params: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Every contract snapshot of an underlying (paged /v3/snapshot/options)."""
+        return await self._get_paged(f"/v3/snapshot/options/{symbol}", params or {"limit": 250})
+
+    async def get_stock_price(self, symbol: str) -> Optional[float]:
+        snapshot = await self._get_json(f"/v2/snapshot/locale/us/markets/stocks/tickers/{symbol}")
+        return snapshot.get("ticker", {}).get("day", {}).get("c")
+
+    # --- IV ---
+
+    async def get_current_iv(self, symbol: str, current_price: float = None) -> Optional[float]:
+        """IV30 for today from the ATM call/put nearest 30 days (see PolygonProvider.get_current_iv)."""
+        if current_price is None:
+            current_price = await self.get_stock_price(symbol)
+            if not current_price: return None
+
+        now = datetime.now()
+        contracts = await self._get_paged("/v3/reference/options/contracts", iv_selection.current_iv_params(symbol, now))
+        pair = iv_selection.pick_atm_pair(contracts, current_price, now + timedelta(days=30))
+        if pair is None: return None
+        best_exp, best_strike, call, put = pair
+
+        c_snap, p_snap = await asyncio.gather(self.get_option_snapshot(call["ticker"]),
+                                              self.get_option_snapshot(put["ticker"]))
+        return iv_selection.atm_iv(iv_selection.snapshot_price(c_snap), iv_selection.snapshot_price(p_snap),
+                                   current_price, best_strike, best_exp, now)
+
+    async def fetch_contract_closes(self, expirations: Dict[str, str]) -> Dict[str, Dict[str, float]]:
+        """
+        Daily closes for many contracts at once. expirations maps contract
+        ticker -> expiration date. All requests are issued together and
+        throttled only by the in-flight limit.
+        """
+        today = datetime.now().date()
+        tickers = list(expirations)
+
+        async def fetch(ticker):
+            aggs = await self._get_json(iv_selection.contract_bars_endpoint(ticker, expirations[ticker], today),
+                                        {"limit": 5000})
+            return iv_selection.bars_to_closes(aggs)
+
+        closes = await asyncio.gather(*(fetch(t) for t in tickers))
+        return dict(zip(tickers, closes))
+
+    async def get_iv_history(self, symbol: str, stock_history: Any, initial_sigma: float = None) -> List[Dict[str, Any]]:
+        """Daily IV30 for the days in stock_history (see PolygonProvider.get_iv_history)."""
+        if stock_history.empty: return []
+        min_strike, max_strike = iv_selection.strike_bounds(stock_history)
+        all_contracts = await self.get_all_contracts(symbol, min_strike=min_strike, max_strike=max_strike)
+        if not all_contracts: return []
+
+        daily_contracts, needed_tickers = iv_selection.plan_iv_history(all_contracts, stock_history)
+        contract_histories = await self.fetch_contract_closes(needed_tickers)
+        return iv_selection.solve_iv_history(daily_contracts, contract_histories, stock_history, initial_sigma)
+
+    # --- Sync wrappers ---
+
+    def _run(self, method, *args, **kwargs):
+        async def call():
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                await self.close()
+        return run_sync(call())
+
+    def get_current_iv_sync(self, symbol: str, current_price: float = None) -> Optional[float]:
+        return self._run(self.get_current_iv, symbol, current_price)
+
+    def get_iv_history_sync(self, symbol: str, stock_history: Any, initial_sigma: float = None) -> List[Dict[str, Any]]:
+        return self._run(self.get_iv_history, symbol, stock_history, initial_sigma)
+
+    def fetch_contract_closes_sync(self, expirations: Dict[str, str]) -> Dict[str, Dict[str, float]]:
+        return self._run(self.fetch_contract_closes, expirations)
+
+    def list_contracts_sync(self, symbol: str, expired: bool = False, **filters) -> List[Dict[str, Any]]:
+        return self._run(self.list_contracts, symbol, expired, **filters)
+
+    def get_chain_snapshot_sync(self, symbol: str, params: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        return self._run(self.get_chain_snapshot, symbol, params)
@@ -0,0 +1,219 @@
+"""
+Local daily OHLCV store, one directory of parquet parts per symbol.
+
+update_store keeps it current with bulk_history downloads, through the last
+session whose daily bar is final: today's once the market has closed (a
+post-close ingest sees the session that just ended), else the previous day's.
+A symbol not yet
+stored gets PRICE_STORE_HISTORY_DAYS of bars; a stored one is fetched from
+its last stored day and only the bars after it are appended, as a new part.
+Yahoo's bars are split- and dividend-adjusted, so a split or dividend
+rewrites the whole back history: when the re-fetched last stored bar no
+longer matches, or the new bars carry a split or dividend, the symbol is
+reloaded in full. Reads are column-projected and date-filtered by pyarrow.
+
+The screener's price history (HV, IV history), the ML loader, FeatureEngineer's
+macro series and Predictor all read from here.
+"""
+import os
+import re
+import glob
+import json
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+from bulk_history import download_history
+from config import PRICE_STORE_HISTORY_DAYS
+
+# Stored as Yahoo names them, so frames read back look like Ticker.history output
+COLUMNS = ["Open", "High", "Low", "Close", "Volume", "Dividends", "Stock Splits"]
+# Parts per symbol before they are merged back into one file
+COMPACT_AFTER = 30
+# Today's daily bar is stored from this New York time on (the 16:00 close, plus time for Yahoo to settle it)
+MARKET_TZ = ZoneInfo("America/New_York")
+BAR_FINAL_AT = time(16, 30)
+
+def last_closed_session(now: datetime = None) -> date:
+    """Latest day whose daily bar is final: today (New York) after the close, else yesterday."""
+    now = datetime.now(MARKET_TZ) if now is None else now.astimezone(MARKET_TZ)
+    return now.date() if now.time() >= BAR_FINAL_AT else now.date() - timedelta(days=1)
+
+def period_start(period: str, today: date) -> Optional[date]:
+    """First day of a Yahoo period string ("1y", "6mo") ending today; None for other forms."""
+    match = re.fullmatch(r"(\d+)(y|mo)", period)
+    if not match:
+        return None
+    n = int(match.group(1))
+    offset = pd.DateOffset(years=n) if match.group(2) == "y" else pd.DateOffset(months=n)
+    return (pd.Timestamp(today) - offset).date()
+
+def _to_parts(bars: pd.DataFrame) -> pd.DataFrame:
+    """Bars (Date index) as a stored frame: every column in COLUMNS as float, naive ns Date column."""
+    df = bars.reindex(columns=COLUMNS).astype(float)
+    df[["Dividends", "Stock Splits"]] = df[["Dividends", "Stock Splits"]].fillna(0.0)
+    index = pd.DatetimeIndex(bars.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    df.index = index.astype("datetime64[ns]").rename("Date")
+    return df.reset_index()
+
+class PriceStore:
+    """
+    Daily bars per symbol under root/<symbol>/part-YYYYMMDD.parquet, plus a
+    manifest of each symbol's last stored day and the session it was last synced through.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.manifest_path = os.path.join(root, "manifest.json")
+        os.makedirs(root, exist_ok=True)
+
+    def _dir(self, symbol: str) -> str:
+        return os.path.join(self.root, symbol.replace("^", "_").replace("/", "_"))
+
+    def _parts(self, symbol: str) -> List[str]:
+        return sorted(glob.glob(os.path.join(self._dir(symbol), "part-*.parquet")))
+
+    def _manifest(self) -> Dict[str, Dict[str, str]]:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def symbols(self) -> List[str]:
+        return sorted(self._manifest())
+
+    def last_date(self, symbol: str) -> Optional[str]:
+        return self._manifest().get(symbol, {}).get("last")
+
+    def is_fresh(self, symbol: str, through: date = None) -> bool:
+        """Synced through the last closed session (or through), i.e. holds every final bar up to it."""
+        through = through or last_closed_session()
+        return self._manifest().get(symbol, {}).get("through") == through.isoformat()
+
+    def mark_synced(self, last_dates: Dict[str, str], through: date):
+        if not last_dates:
+            return
+        manifest = self._manifest()
+        for symbol, last in last_dates.items():
+            manifest[symbol] = {"last": last, "through": through.isoformat()}
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def read(self, symbol: str, columns: List[str] = None, start=None, end=None) -> pd.DataFrame:
+        """Bars indexed by Date, start/end inclusive. Empty if the symbol is not stored."""
+        columns = list(columns or COLUMNS)
+        if not self._parts(symbol):
+            return pd.DataFrame(columns=columns, index=pd.DatetimeIndex([], name="Date"))
+        filters = []
+        if start is not None:
+            filters.append(("Date", ">=", pd.Timestamp(start)))
+        if end is not None:
+            filters.append(("Date", "<=", pd.Timestamp(end)))
+        df = pd.read_parquet(self._dir(symbol), columns=["Date"] + columns, filters=filters or None)
+        return df.set_index("Date").sort_index()
+
+    def _write_part(self, symbol: str, bars: pd.DataFrame):
+        path = self._dir(symbol)
+        os.makedirs(path, exist_ok=True)
+        df = _to_parts(bars)
+        name = f"part-{df['Date'].iloc[0]:%Y%m%d}.parquet"
+        # Dot-prefixed temp files are skipped by readers listing the directory
+        tmp_path = os.path.join(path, f".{name}.{os.getpid()}.tmp")
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, os.path.join(path, name))
+
+    def replace(self, symbol: str, bars: pd.DataFrame):
+        """Store bars as the symbol's whole history."""
+        for part in self._parts(symbol):
+            os.remove(part)
+        self._write_part(symbol, bars)
+
+    def append(self, symbol: str, bars: pd.DataFrame):
+        """Add bars dated after the symbol's last stored day."""
+        self._write_part(symbol, bars)
+        if len(self._parts(symbol)) > COMPACT_AFTER:
+            self.replace(symbol, self.read(symbol))
+
+def _history_changed(stored: pd.DataFrame, fetched: pd.DataFrame, last: pd.Timestamp) -> bool:
+    """True if Yahoo re-adjusted the symbol's history since its last stored bar."""
+    overlap = fetched["Close"].reindex(stored.index)
+    if overlap.isna().any() or not np.allclose(overlap, stored["Close"], rtol=1e-6):
+        return True
+    after = fetched[fetched.index > last]
+    actions = [c for c in ("Dividends", "Stock Splits") if c in after.columns]
+    return bool((after[actions].fillna(0) != 0).any().any()) if actions else False
+
+def _naive(frame: pd.DataFrame) -> pd.DataFrame:
+    if getattr(frame.index, "tz", None) is not None:
+        frame = frame.tz_localize(None)
+    return frame
+
+def update_store(store: PriceStore, symbols: Iterable[str], through: date = None,
+                 history_days: int = None) -> Dict[str, int]:
+    """
+    Bring symbols up to date through the given day (default: the last closed
+    session). Stored symbols are fetched in one bulk download per last-stored
+    day (after the first load, normally one download with one new bar per symbol).
+    Returns counts: loaded, appended, refetched (split/dividend), current, failed.
+    """
+    through = through or last_closed_session()
+    end = (through + timedelta(days=1)).isoformat()  # downloads end before this day
+    history_days = history_days or PRICE_STORE_HISTORY_DAYS
+    counts = Counter()
+    synced: Dict[str, str] = {}
+
+    manifest = store._manifest()
+    missing, by_last = [], {}
+    for symbol in dict.fromkeys(symbols):
+        entry = manifest.get(symbol)
+        if entry is None:
+            missing.append(symbol)
+        elif entry.get("through") == through.isoformat():
+            counts["current"] += 1
+        else:
+            by_last.setdefault(entry["last"], []).append(symbol)
+
+    refetch = []
+    for last, group in sorted(by_last.items()):
+        # From the last stored bar (inclusive) to check it against Yahoo's current adjustment
+        bulk = download_history(group, start=last, end=end, actions=True)
+        last_ts = pd.Timestamp(last)
+        for symbol in group:
+            fetched = _naive(bulk.frame(symbol))
+            if fetched.empty:
+                counts["failed"] += 1
+                continue
+            if _history_changed(store.read(symbol, columns=["Close"], start=last), fetched, last_ts):
+                refetch.append(symbol)
+                continue
+            new_bars = fetched[fetched.index > last_ts]
+            if new_bars.empty:
+                counts["current"] += 1
+                synced[symbol] = last
+            else:
+                store.append(symbol, new_bars)
+                counts["appended"] += 1
+                synced[symbol] = f"{new_bars.index[-1]:%Y-%m-%d}"
+
+    if missing or refetch:
+        start = (through - timedelta(days=history_days)).isoformat()
+        bulk = download_history(missing + refetch, start=start, end=end, actions=True)
+        for symbol in missing + refetch:
+            bars = _naive(bulk.frame(symbol))
+            if bars.empty:
+                counts["failed"] += 1
+                continue
+            store.replace(symbol, bars)
+            counts["refetched" if symbol in refetch else "loaded"] += 1
+            synced[symbol] = f"{bars.index[-1]:%Y-%m-%d}"
+
+    store.mark_synced(synced, through)
+    return {k: counts[k] for k in ("loaded", "appended", "refetched", "current", "failed")}
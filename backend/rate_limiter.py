@@ -0,0 +1,122 @@
+import os
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from config import ENABLE_RATE_LIMITER, RATE_LIMITER_PATH, RATE_LIMITS
+from replay import replaying
+
+logger = logging.getLogger(__name__)
+
+def polygon_bucket(endpoint: str) -> str:
+    """Budget a Polygon endpoint draws from."""
+    path = endpoint.split("?", 1)[0]
+    if path.startswith("/v2/aggs/"):
+        return "polygon.aggs"
+    if "/snapshot/" in path:
+        return "polygon.snapshot"
+    return "polygon.reference"
+
+class TokenBucketLimiter:
+    """
+    Token buckets shared by every process that opens the same SQLite file.
+
+    acquire() takes a token even when the bucket is empty, letting the balance
+    go negative, and returns how long the caller must wait for its slot. Each
+    claim is one BEGIN IMMEDIATE transaction, so concurrent callers queue up
+    in order instead of all firing at once and all getting a 429.
+    Cumulative waits per bucket are kept in the same file for reporting.
+    """
+
+    def __init__(self, path: str, limits: Dict[str, Tuple[float, float]]):
+        self.path = path
+        self.limits = limits  # bucket -> (tokens per second, burst capacity)
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL,"
+            " acquired INTEGER NOT NULL DEFAULT 0, waited REAL NOT NULL DEFAULT 0)"
+        )
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; transactions are opened explicitly with BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def reserve(self, bucket: str, tokens: float = 1.0) -> float:
+        """Claim tokens and return the seconds to wait before using them (0 = go now)."""
+        limit = self.limits.get(bucket)
+        if limit is None:
+            return 0.0
+        rate, capacity = limit
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Read the clock holding the write lock: a time read before waiting
+            # for the lock can be older than the last writer's and over-refill the bucket
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (bucket,)).fetchone()
+            available = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+            available -= tokens
+            wait = max(0.0, -available / rate)
+            conn.execute(
+                "INSERT INTO buckets (name, tokens, updated, acquired, waited) VALUES (?, ?, ?, 1, ?) "
+                "ON CONFLICT(name) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated, "
+                "acquired = acquired + 1, waited = waited + excluded.waited",
+                (bucket, available, now, wait),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def acquire(self, bucket: str, tokens: float = 1.0) -> float:
+        """Block until a token is available. Returns seconds waited."""
+        try:
+            wait = self.reserve(bucket, tokens)
+        except sqlite3.Error as e:
+            logger.warning(f"Rate limiter unavailable for {bucket}, not pacing: {e}")
+            return 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, bucket: str, tokens: float = 1.0) -> float:
+        """acquire() for coroutines: reserves off the event loop (a SQLite write), waits with asyncio.sleep."""
+        try:
+            wait = await asyncio.to_thread(self.reserve, bucket, tokens)
+        except sqlite3.Error as e:
+            logger.warning(f"Rate limiter unavailable for {bucket}, not pacing: {e}")
+            return 0.0
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """{bucket: {"acquired": n, "waited_s": seconds}} accumulated across all processes."""
+        rows = self._conn().execute("SELECT name, acquired, waited FROM buckets").fetchall()
+        return {name: {"acquired": acquired, "waited_s": waited} for name, acquired, waited in rows}
+
+_limiter = None
+_limiter_pid = None
+
+def get_rate_limiter() -> Optional[TokenBucketLimiter]:
+    """Process-wide limiter, or None when ENABLE_RATE_LIMITER is off or recorded responses are replayed."""
+    global _limiter, _limiter_pid
+    if not ENABLE_RATE_LIMITER or replaying():
+        return None
+    if _limiter is None or _limiter_pid != os.getpid():
+        _limiter, _limiter_pid = TokenBucketLimiter(RATE_LIMITER_PATH, RATE_LIMITS), os.getpid()
+    return _limiter
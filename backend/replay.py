@@ -0,0 +1,300 @@
+"""
+Record and replay upstream HTTP traffic for offline ingest runs.
+
+With a RecordingTape installed, the transports (PolygonProvider._fetch_json,
+AsyncPolygonClient._fetch_json and the yfinance session) save every response
+(status and raw body, or the error the request failed with) and how long it
+took to a ResponseArchive. With a ReplayTape installed they serve the archive
+instead of the network, optionally sleeping for the recorded latency. The
+real provider code (contract listing, IV solving, SVI fits, Yahoo parsing),
+the screener, DB writes and rank calculation then run on the same bytes on
+any machine, so runs of different versions can be compared.
+
+Requests are matched on method, URL and parameters, leaving out credentials
+and Yahoo's crumb. A request that was not recorded raises ReplayMiss; nothing
+is answered with a near match. Requests carrying today's date (chain snapshot
+windows, IV history ranges) therefore only match on the day they were recorded.
+
+While a tape is installed the local stores that answer in place of upstream
+(HTTP cache, contract index, option bar store, price store, IV surface files,
+yfinance's tz and cookie caches) are bypassed: a recording then holds every
+response the run needs, and a replay reads nothing but the archive.
+
+Tiingo news is recorded per batch by RecordingNewsFetcher and served per
+ticker by ReplayNewsFetcher, since which tickers need a refresh depends on the DB.
+
+    DATA_PROVIDER=record python backend/ingest.py --limit 200    # live run, saved to REPLAY_ARCHIVE
+    DATA_PROVIDER=replay python backend/ingest.py                 # the recorded symbols, offline
+"""
+import os
+import json
+import time
+import zlib
+import sqlite3
+import asyncio
+import logging
+import threading
+from collections import Counter, namedtuple
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+from urllib.parse import urlsplit
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+NEWS_KIND = "tiingo.news"
+UNIVERSE_KIND = "universe"
+# Left out of request keys: credentials, and Yahoo's per-session crumb
+VOLATILE_PARAMS = {"apiKey", "apikey", "token", "crumb"}
+
+# status 0: the request failed without a response, body is the error message
+Recorded = namedtuple("Recorded", ["status", "body", "latency"])
+
+class ReplayMiss(ConnectionError):
+    """The request was not recorded."""
+
+class ReplayedError(ConnectionError):
+    """A transport error recorded in the original run, raised again on replay."""
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def request_key(method: str, url: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """Canonical key of one HTTP request."""
+    params = {k: v for k, v in (params or {}).items() if k not in VOLATILE_PARAMS}
+    return json.dumps([method.upper(), url, sorted(params.items())], default=str)
+
+def host_of(url: str) -> str:
+    return urlsplit(url).hostname or ""
+
+class ResponseArchive:
+    """
+    SQLite file of recorded responses: status and zlib-compressed body keyed
+    by (kind, request key), with the latency and recording time. The kind is
+    the upstream host for HTTP traffic. Worker processes of one run can record
+    into the same file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " kind TEXT NOT NULL, key TEXT NOT NULL, status INTEGER NOT NULL, body BLOB NOT NULL,"
+                " latency REAL NOT NULL, recorded REAL NOT NULL, PRIMARY KEY (kind, key))"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        # Per thread, and never a connection inherited from a forked parent
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def put(self, kind: str, key: str, status: int, body: bytes, latency: float = 0.0):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (kind, key, status, body, latency, recorded) VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, key, status, zlib.compress(body), latency, time.time()),
+            )
+
+    def get(self, kind: str, key: str) -> Optional[Recorded]:
+        row = self._conn().execute("SELECT status, body, latency FROM responses WHERE kind = ? AND key = ?",
+                                   (kind, key)).fetchone()
+        return Recorded(row[0], zlib.decompress(row[1]), row[2]) if row else None
+
+    def put_json(self, kind: str, key: str, value: Any, latency: float = 0.0):
+        self.put(kind, key, 200, json.dumps(value, default=_jsonable).encode(), latency)
+
+    def values(self, kind: str) -> List[tuple]:
+        """(decoded JSON body, latency) of every successful response of this kind."""
+        rows = self._conn().execute("SELECT body, latency FROM responses WHERE kind = ? AND status = 200",
+                                    (kind,)).fetchall()
+        return [(json.loads(zlib.decompress(body)), latency) for body, latency in rows]
+
+    def put_symbols(self, symbols: List[str]):
+        """The recorded run's ticker universe."""
+        self.put_json(UNIVERSE_KIND, "symbols", list(symbols))
+
+    def symbols(self) -> List[str]:
+        record = self.get(UNIVERSE_KIND, "symbols")
+        return json.loads(record.body) if record else []
+
+    def recorded_on(self) -> Optional[date]:
+        """Day the first response was recorded."""
+        first = self._conn().execute("SELECT MIN(recorded) FROM responses").fetchone()[0]
+        return datetime.fromtimestamp(first).date() if first is not None else None
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """{kind: {"calls", "latency_s", "bytes"}} over the archive."""
+        rows = self._conn().execute("SELECT kind, COUNT(*), SUM(latency), SUM(LENGTH(body)) FROM responses"
+                                    " GROUP BY kind ORDER BY kind").fetchall()
+        return {kind: {"calls": n, "latency_s": latency or 0.0, "bytes": size or 0} for kind, n, latency, size in rows}
+
+class RecordingTape:
+    """Saves each response the transports receive, passing it on unchanged."""
+    replaying = False
+
+    def __init__(self, archive: ResponseArchive):
+        self.archive = archive
+
+    def record(self, method: str, url: str, params: Optional[Dict[str, Any]], status: int = 0,
+               body: bytes = b"", error: Exception = None, latency: float = 0.0):
+        if error is not None:
+            status, body = 0, f"{type(error).__name__}: {error}".encode()
+        self.archive.put(host_of(url), request_key(method, url, params), status, body or b"", latency)
+
+class ReplayTape:
+    """
+    Serves recorded responses. Recorded transport errors are raised again as
+    ReplayedError, requests never recorded raise ReplayMiss. latency_scale=1
+    sleeps for each request's recorded latency, 0 returns at once.
+    """
+    replaying = True
+
+    def __init__(self, archive: ResponseArchive, latency_scale: float = 0.0):
+        self.archive = archive
+        self.latency_scale = latency_scale
+        self.stats = Counter()  # hit / miss
+
+    def _lookup(self, method: str, url: str, params: Optional[Dict[str, Any]]) -> Recorded:
+        record = self.archive.get(host_of(url), request_key(method, url, params))
+        if record is None:
+            self.stats["miss"] += 1
+            logger.warning(f"Replay miss: {method.upper()} {url} {params or ''}")
+            raise ReplayMiss(f"{method.upper()} {url} was not recorded")
+        self.stats["hit"] += 1
+        return record
+
+    @staticmethod
+    def _result(record: Recorded) -> Recorded:
+        if record.status == 0:
+            raise ReplayedError(record.body.decode(errors="replace"))
+        return record
+
+    def replay(self, method: str, url: str, params: Optional[Dict[str, Any]] = None) -> Recorded:
+        record = self._lookup(method, url, params)
+        if self.latency_scale:
+            time.sleep(record.latency * self.latency_scale)
+        return self._result(record)
+
+    async def replay_async(self, method: str, url: str, params: Optional[Dict[str, Any]] = None) -> Recorded:
+        record = await asyncio.to_thread(self._lookup, method, url, params)
+        if self.latency_scale:
+            await asyncio.sleep(record.latency * self.latency_scale)
+        return self._result(record)
+
+_tape = None
+
+def install(tape) -> None:
+    """Route this process's upstream requests through tape (a RecordingTape or ReplayTape)."""
+    global _tape
+    _tape = tape
+    _disable_yf_caches()
+
+def uninstall():
+    global _tape
+    _tape = None
+
+def current_tape():
+    return _tape
+
+def replaying() -> bool:
+    return _tape is not None and _tape.replaying
+
+def taping() -> bool:
+    """True while requests are recorded or replayed: local stores standing in for upstream are bypassed."""
+    return _tape is not None
+
+def through_tape(method: str, url: str, params: Optional[Dict[str, Any]], send: Callable[[], T],
+                 build: Callable[[Recorded, str], T]) -> T:
+    """
+    One synchronous request through the installed tape. send() makes the real
+    request and returns a response with .status_code and .content; build turns
+    a replayed Recorded into the transport's own response type.
+    """
+    tape = _tape
+    if tape is None:
+        return send()
+    if tape.replaying:
+        return build(tape.replay(method, url, params), url)
+    start = time.perf_counter()
+    try:
+        resp = send()
+    except Exception as e:
+        tape.record(method, url, params, error=e, latency=time.perf_counter() - start)
+        raise
+    tape.record(method, url, params, resp.status_code, resp.content, latency=time.perf_counter() - start)
+    return resp
+
+def _disable_yf_caches():
+    # yfinance keeps each symbol's timezone and its Yahoo cookie on disk; a run
+    # that found them there would neither record nor be able to replay the
+    # requests that fetch them. Its dummy caches are the "cache disabled" mode.
+    try:
+        from yfinance import cache as yf_cache
+        yf_cache._TzCacheManager._tz_cache = yf_cache._TzCacheDummy()
+        yf_cache._CookieCacheManager._Cookie_cache = yf_cache._CookieCacheDummy()
+    except (ImportError, AttributeError) as e:
+        logger.warning(f"Could not disable yfinance caches, some Yahoo requests may not be taped: {e}")
+
+class RecordingNewsFetcher:
+    """Wraps sentiment.TiingoNewsFetcher, recording each batch's articles."""
+
+    def __init__(self, inner, archive: ResponseArchive):
+        self.inner = inner
+        self.archive = archive
+
+    async def fetch_news_batch(self, session, tickers: List[str]) -> List[Dict]:
+        start = time.perf_counter()
+        articles = await self.inner.fetch_news_batch(session, tickers)
+        await asyncio.to_thread(self.archive.put_json, NEWS_KIND, ",".join(tickers), articles,
+                                time.perf_counter() - start)
+        return articles
+
+class ReplayNewsFetcher:
+    """
+    Recorded Tiingo articles, looked up per ticker so batches don't have to
+    match the recorded run's.
+    """
+
+    def __init__(self, archive: ResponseArchive, latency_scale: float = 0.0):
+        self.archive = archive
+        self.latency_scale = latency_scale
+        self._articles: Optional[Dict[str, Dict[Any, Dict]]] = None
+        self._latency = 0.0
+
+    def _index(self) -> Dict[str, Dict[Any, Dict]]:
+        if self._articles is None:
+            self._articles, latencies = {}, []
+            for value, latency in self.archive.values(NEWS_KIND):
+                latencies.append(latency)
+                for article in value or []:
+                    article_id = article.get("id") or article.get("url") or article.get("title")
+                    for tag in article.get("tickers", []):
+                        self._articles.setdefault(tag.upper(), {})[article_id] = article
+            self._latency = float(np.mean(latencies)) if latencies else 0.0
+        return self._articles
+
+    async def fetch_news_batch(self, session, tickers: List[str]) -> List[Dict]:
+        index = self._index()
+        found = {}
+        for t in tickers:
+            found.update(index.get(t.upper(), {}))
+        if self.latency_scale:
+            await asyncio.sleep(self._latency * self.latency_scale)
+        return list(found.values())
@@ -0,0 +1,85 @@
+"""
+Run-scoped memo for upstream data requests.
+
+While one ticker is processed the same symbol's info, price history and
+option chains get asked for from several code paths (the screener, the hybrid
+provider, the Yahoo provider). Provider methods decorated with
+@memoized(kind) share one result per (kind, symbol, arguments) while a run
+is active, and count the upstream calls that were avoided. Ingestion opens a
+run per ticker task, so results are dropped once the ticker is done. Outside
+a run (API server, tests) the decorator is a pass-through.
+"""
+import copy
+import functools
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+class RunMemo:
+    def __init__(self):
+        self._values: Dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+        self.calls = Counter()      # upstream calls made, per kind
+        self.avoided = Counter()    # duplicate calls answered from the memo, per kind
+
+    def call(self, kind: str, key: tuple, fn: Callable[[], Any]) -> Any:
+        """Result of fn() for (kind, key), calling it at most once per run. Errors are not memoized."""
+        full_key = (kind,) + key
+        with self._lock:
+            if full_key in self._values:
+                self.avoided[kind] += 1
+                return _fresh(self._values[full_key])
+        value = fn()
+        with self._lock:
+            self.calls[kind] += 1
+            self._values.setdefault(full_key, value)
+        return _fresh(value)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {kind: {"calls": self.calls[kind], "avoided": self.avoided[kind]}
+                for kind in sorted(set(self.calls) | set(self.avoided))}
+
+def _fresh(value: Any) -> Any:
+    # Callers add keys to detail dicts; keep the memoized one clean.
+    # DataFrames and chains are shared as-is and must be treated as read-only.
+    return copy.copy(value) if isinstance(value, (dict, list)) else value
+
+_active: Optional[RunMemo] = None
+
+def start_run() -> RunMemo:
+    """Begin a run in this process (replacing any active one)."""
+    global _active
+    _active = RunMemo()
+    return _active
+
+def end_run():
+    global _active
+    _active = None
+
+def current_run() -> Optional[RunMemo]:
+    return _active
+
+@contextmanager
+def run_scope():
+    memo = start_run()
+    try:
+        yield memo
+    finally:
+        end_run()
+
+def memoized(kind: str):
+    """
+    Decorator for provider methods taking (self, symbol, ...). The provider
+    instance is not part of the key, so separate providers share results.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(self, symbol, *args, **kwargs):
+            memo = _active
+            if memo is None:
+                return fn(self, symbol, *args, **kwargs)
+            key = (symbol, args, tuple(sorted(kwargs.items())))
+            return memo.call(kind, key, lambda: fn(self, symbol, *args, **kwargs))
+        return wrapper
+    return decorator
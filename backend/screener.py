@@ -1,4 +1,5 @@
 from typing import List, Dict, Any, Optional
+from datetime import date
 from data_provider import DataProvider, HybridProvider
 from options_lib import IVEstimator
 from config import MIN_MARKET_CAP, MAX_P_FCF, MAX_PEG, MIN_ROE, ENABLE_IV_RANK
@@ -165,8 +166,12 @@ class Screener:
         
         return details
 
-    def process_ticker(self, ticker: str, fetch_mode: str = "full", sentiment_score: float = 0.0) -> Optional[Dict[str, Any]]:
-        """Process a single ticker. Helper for threading/ingestion."""
+    def process_ticker(self, ticker: str, fetch_mode: str = "full", sentiment_score: float = 0.0,
+                       history_since: date = None, last_iv: float = None) -> Optional[Dict[str, Any]]:
+        """
+        Process a single ticker. Helper for threading/ingestion.
+        fetch_mode/history_since/last_iv select how much IV history to fetch (see iv_refresh).
+        """
         try:
             details = self.data_provider.get_ticker_details(ticker)
             
@@ -182,7 +187,8 @@ class Screener:
 
             # --- Fetch Advanced Metrics (Only for filtered stocks) ---
             try:
-                advanced = self.data_provider.get_advanced_metrics(ticker, include_iv_rank=ENABLE_IV_RANK, fetch_mode=fetch_mode)
+                advanced = self.data_provider.get_advanced_metrics(ticker, include_iv_rank=ENABLE_IV_RANK, fetch_mode=fetch_mode,
+                                                                   history_since=history_since, last_iv=last_iv)
                 if advanced:
                     details.update(advanced)
             except Exception as adv_err:
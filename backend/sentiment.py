@@ -106,10 +106,11 @@ class SentimentAnalyzer:
         return scores
 
 class SentimentService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, fetcher=None):
+        """fetcher: anything with TiingoNewsFetcher's fetch_news_batch (default: a live TiingoNewsFetcher)."""
         self.db = db
         self.api_key = os.getenv("TIINGO_API_KEY")
-        self.fetcher = TiingoNewsFetcher(self.api_key)
+        self.fetcher = fetcher or TiingoNewsFetcher(self.api_key)
         # Lazy load analyzer to save startup time if not needed immediately? 
         # For ingest script, we want it immediately.
         self.analyzer = SentimentAnalyzer()
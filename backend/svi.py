@@ -0,0 +1,149 @@
+import os
+import json
+import logging
+import numpy as np
+from datetime import timedelta
+from scipy.optimize import least_squares
+from scipy.sparse import lil_matrix
+from typing import Dict, List, Tuple
+
+from iv_surface import IVSurface
+
+logger = logging.getLogger(__name__)
+
+# Raw SVI parameters, in order: w(k) = a + b * (rho * (k - m) + sqrt((k - m)^2 + sigma^2))
+PARAM_NAMES = ("a", "b", "rho", "m", "sigma")
+LOWER = np.array([-1.0, 1e-6, -0.999, -1.0, 1e-4])
+UPPER = np.array([4.0, 10.0, 0.999, 1.0, 2.0])
+MIN_QUOTES_PER_SLICE = 5
+
+def svi_total_variance(params: np.ndarray, k: np.ndarray) -> np.ndarray:
+    """
+    Raw SVI total variance. params is (..., 5) and broadcasts against k.
+    """
+    params = np.asarray(params, dtype=float)
+    a, b, rho, m, sigma = (params[..., i] for i in range(5))
+    x = k - m
+    return a + b * (rho * x + np.sqrt(x * x + sigma * sigma))
+
+def default_params(k: np.ndarray, w: np.ndarray) -> np.ndarray:
+    """Cold-start guess: gentle put skew centered at the money, level from the ATM quote."""
+    w_atm = float(np.interp(0.0, k, w))
+    b, rho, sigma = 0.1, -0.3, 0.1
+    return np.array([max(w_atm - b * sigma, 1e-6), b, rho, 0.0, sigma])
+
+class SVICalibrator:
+    """
+    Fits a raw SVI curve to every expiry of an IVSurface.
+
+    All expiries are fitted in one least-squares problem: the residual vector is
+    every quote of every slice, computed in a single NumPy pass, and the Jacobian
+    sparsity is block-diagonal so the solver treats the slices independently.
+    Fitted parameters are persisted per symbol (keyed by expiration date) and used
+    as the starting point for the next day's fit, so a steady-state calibration
+    converges in a handful of function evaluations.
+    """
+
+    def __init__(self, params_dir: str):
+        self.params_dir = params_dir
+
+    def _params_path(self, symbol: str) -> str:
+        return os.path.join(self.params_dir, f"{symbol}.json")
+
+    def load_params(self, symbol: str) -> Dict[str, List[float]]:
+        path = self._params_path(symbol)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, "r") as f:
+                return json.load(f).get("slices", {})
+        except (ValueError, OSError) as e:
+            logger.warning(f"Ignoring unreadable SVI params for {symbol}: {e}")
+            return {}
+
+    def save_params(self, symbol: str, as_of, slices: Dict[str, List[float]]):
+        os.makedirs(self.params_dir, exist_ok=True)
+        path = self._params_path(symbol)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"as_of": as_of.isoformat(), "slices": slices}, f)
+        os.replace(tmp_path, path)
+
+    def fit(self, surface: IVSurface, warm_start: bool = True) -> Tuple[Dict[float, np.ndarray], int]:
+        """
+        Fit every expiry with enough quotes.
+        Returns ({days_to_expiry: params}, function evaluations used).
+        """
+        if surface.quotes is None:
+            return {}, 0
+        q_days, q_k, q_iv = surface.quotes
+        in_range = (q_k >= surface.nodes[0]) & (q_k <= surface.nodes[-1])
+        q_days, q_k, q_iv = q_days[in_range], q_k[in_range], q_iv[in_range]
+
+        slices = [d for d in surface.days if np.count_nonzero(q_days == d) >= MIN_QUOTES_PER_SLICE]
+        if not slices:
+            return {}, 0
+
+        stored = self.load_params(surface.symbol) if warm_start else {}
+        slice_of = {d: i for i, d in enumerate(slices)}
+        keep = np.isin(q_days, slices)
+        q_days, q_k, q_iv = q_days[keep], q_k[keep], q_iv[keep]
+        owner = np.array([slice_of[d] for d in q_days])
+        t_years = q_days / 365.0
+        w_obs = q_iv ** 2 * t_years
+
+        x0 = np.empty((len(slices), 5))
+        for i, d in enumerate(slices):
+            prev = stored.get(self._expiry_key(surface, d))
+            if prev is not None:
+                x0[i] = np.clip(prev, LOWER, UPPER)
+            else:
+                mask = owner == i
+                x0[i] = np.clip(default_params(q_k[mask], w_obs[mask]), LOWER, UPPER)
+
+        # Relative error in total variance, so short and long expiries weigh alike
+        scale = np.maximum(w_obs, 1e-6)
+
+        def residuals(x):
+            params = x.reshape(-1, 5)[owner]
+            return (svi_total_variance(params, q_k) - w_obs) / scale
+
+        sparsity = lil_matrix((q_k.size, 5 * len(slices)), dtype=int)
+        for j in range(5):
+            sparsity[np.arange(q_k.size), owner * 5 + j] = 1
+
+        res = least_squares(
+            residuals, x0.ravel(),
+            bounds=(np.tile(LOWER, len(slices)), np.tile(UPPER, len(slices))),
+            jac_sparsity=sparsity, method="trf", xtol=1e-10, ftol=1e-10,
+        )
+        fitted = res.x.reshape(-1, 5)
+        return {d: fitted[i] for i, d in enumerate(slices)}, int(res.nfev)
+
+    def smooth(self, surface: IVSurface, warm_start: bool = True) -> IVSurface:
+        """
+        Replace each fitted expiry's grid row with its SVI curve and persist the
+        parameters for tomorrow's warm start. Expiries too thin to fit keep their
+        raw interpolated smile.
+        """
+        fits, nfev = self.fit(surface, warm_start=warm_start)
+        if not fits:
+            return surface
+
+        grid = surface.grid.copy()
+        for row, d in enumerate(surface.days):
+            params = fits.get(d)
+            if params is None:
+                continue
+            w = svi_total_variance(params, surface.nodes)
+            grid[row] = np.sqrt(np.maximum(w, 1e-12) / (d / 365.0))
+
+        self.save_params(surface.symbol, surface.as_of,
+                         {self._expiry_key(surface, d): [float(v) for v in p] for d, p in fits.items()})
+        logger.debug(f"SVI fit for {surface.symbol}: {len(fits)} expiries, {nfev} evaluations")
+        return surface.with_grid(grid)
+
+    @staticmethod
+    def _expiry_key(surface: IVSurface, days: float) -> str:
+        # Expiration date, stable from one day to the next (days-to-expiry is not)
+        return (surface.as_of + timedelta(days=int(days))).isoformat()
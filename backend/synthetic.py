@@ -0,0 +1,461 @@
+"""
+Synthetic market for load-testing ingestion, the DB layer and /screen at any
+universe size, offline.
+
+SyntheticMarket invents any number of fake companies. Each symbol's
+fundamentals, daily bars, option chain and news depend only on (seed,
+symbol), so every worker process generates the same data for a ticker.
+- Prices are a one-factor GBM: a market path shared by the universe plus
+  each symbol's own noise, scaled by its beta.
+- Fundamentals are drawn once per company; the price-dependent ratios
+  (P/E, P/B, market cap) follow the path.
+- IV30 tracks the path's realized volatility.
+- Chains price every strike off a raw SVI smile anchored at that IV.
+- Headline tone follows the week's return.
+
+SyntheticProvider serves the market through the DataProvider interface, and
+SyntheticNewsFetcher serves it like TiingoNewsFetcher. Both can add latency
+and inject errors.
+
+    DATA_PROVIDER=synthetic SYNTHETIC_SYMBOLS=10000 python backend/ingest.py
+"""
+import time
+import zlib
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from data_provider import DataProvider
+from iv_surface import IVSurface
+from occ import build_occ_ticker
+from option_chain import OptionChain
+from options_lib import OptionPricingModel
+from price_store import COLUMNS, period_start
+from svi import svi_total_variance
+
+logger = logging.getLogger(__name__)
+
+# Every path starts here, so a symbol's history is the same whatever day it is generated
+EPOCH = date(2018, 1, 2)
+RISK_FREE = 0.05
+MARKET_VOL, MARKET_DRIFT = 0.16, 0.07
+# SVI wing width and how many ATM standard deviations of strikes each expiry lists
+SVI_SIGMA = 0.1
+STRIKE_SDS = 2.5
+# Random streams per symbol
+PROFILE, PATH, BAR_NOISE, NEWS, OPTIONS = range(5)
+MARKET = 0x4D4B54
+
+SYLLABLES = ["Ar", "Bel", "Cor", "Dax", "Ev", "Fen", "Gal", "Hal", "Ion", "Jor", "Kel", "Lum", "Mer",
+             "Nov", "Or", "Pax", "Quil", "Ros", "Syn", "Tor", "Ul", "Ver", "Wex", "Xan", "Yor", "Zen"]
+SUFFIXES = ["Corp", "Inc", "Holdings", "Systems", "Group", "Industries", "Labs", "Partners"]
+SECTORS = {
+    "Technology": ["Software", "Semiconductors", "IT Services"],
+    "Healthcare": ["Biotechnology", "Medical Devices", "Health Care Plans"],
+    "Financial Services": ["Banks - Regional", "Asset Management", "Insurance"],
+    "Industrials": ["Aerospace & Defense", "Machinery", "Trucking"],
+    "Consumer Cyclical": ["Specialty Retail", "Restaurants", "Auto Parts"],
+    "Energy": ["Oil & Gas E&P", "Oil & Gas Midstream"],
+    "Utilities": ["Utilities - Regulated Electric"],
+    "Real Estate": ["REIT - Industrial", "REIT - Residential"],
+}
+HEADLINES = {
+    "up": ["{name} shares climb after strong {sector} demand", "{name} raises full-year guidance",
+           "Analysts upgrade {name} on margin expansion", "{name} wins multi-year contract",
+           "{name} beats quarterly estimates"],
+    "down": ["{name} shares slide as {sector} outlook dims", "{name} cuts guidance on weaker orders",
+             "Analyst downgrades {name} citing rising costs", "{name} misses quarterly estimates",
+             "{name} faces regulatory probe"],
+    "flat": ["{name} to present at {sector} investor conference", "{name} announces quarterly dividend",
+             "{name} names new chief financial officer", "What to watch as {name} reports next week"],
+}
+
+class SyntheticError(ConnectionError):
+    """An injected upstream failure."""
+
+def synthetic_symbols(n: int, seed: int = 0) -> List[str]:
+    """n distinct fake tickers ("SY" + 4 letters), the same list for the same n and seed."""
+    space = 26 ** 4
+    if n > space:
+        raise ValueError(f"At most {space} synthetic symbols")
+    out = []
+    for i in range(n):
+        # 7919 is coprime with 26^4, so this permutes the code space
+        code, letters = (i * 7919 + seed * 104729) % space, ""
+        for _ in range(4):
+            code, r = divmod(code, 26)
+            letters = chr(65 + r) + letters
+        out.append("SY" + letters)
+    return out
+
+def third_friday(year: int, month: int) -> date:
+    first = date(year, month, 1)
+    return first + timedelta(days=(4 - first.weekday()) % 7 + 14)
+
+def listed_expirations(as_of: date) -> List[date]:
+    """Monthly expiries for the next nine months plus the next two January LEAPs, 7 to 800 days out."""
+    out = set()
+    for i in range(10):
+        year, month = divmod(as_of.month - 1 + i, 12)
+        out.add(third_friday(as_of.year + year, month + 1))
+    for year in (as_of.year + 1, as_of.year + 2):
+        out.add(third_friday(year, 1))
+    return sorted(d for d in out if 7 <= (d - as_of).days <= 800)
+
+def strike_step(spot: float) -> float:
+    for below, step in ((5, 0.1), (25, 0.5), (50, 1.0), (100, 2.5), (500, 5.0)):
+        if spot < below:
+            return step
+    return 10.0
+
+class SyntheticMarket:
+    """Fake universe keyed by seed. Bars cover EPOCH to the last session before as_of."""
+
+    def __init__(self, seed: int = 0):
+        self.seed = seed
+        self._profiles: Dict[str, Dict[str, Any]] = {}
+        self._bars: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+        self._market: Optional[np.ndarray] = None
+        self._sessions: Dict[date, pd.DatetimeIndex] = {}
+
+    def _rng(self, symbol: str, stream: int, *extra: int) -> np.random.Generator:
+        return np.random.default_rng([self.seed, zlib.crc32(symbol.encode()), stream, *extra])
+
+    def symbols(self, n: int) -> List[str]:
+        return synthetic_symbols(n, self.seed)
+
+    def profile(self, symbol: str) -> Dict[str, Any]:
+        """The company's fixed traits, as of EPOCH."""
+        p = self._profiles.get(symbol)
+        if p is not None:
+            return p
+        rng = self._rng(symbol, PROFILE)
+        sector = str(rng.choice(list(SECTORS)))
+        market_cap = float(np.clip(np.exp(rng.normal(np.log(3e9), 1.5)), 5e7, 2e12))
+        price = float(np.exp(rng.uniform(np.log(5), np.log(400))))
+        revenue = market_cap / np.exp(rng.normal(np.log(2.5), 0.7))
+        margin = float(np.clip(rng.normal(0.12, 0.12), -0.5, 0.6))
+        net_income = revenue * (0.75 * margin - 0.01)
+        equity = market_cap / np.exp(rng.normal(np.log(3.0), 0.6))
+        beta = float(np.clip(rng.normal(1.0, 0.35), 0.2, 2.5))
+        idio_vol = float(rng.uniform(0.1, 0.6))
+        p = {
+            "name": f"{''.join(rng.choice(SYLLABLES, 2, replace=False))} {rng.choice(SUFFIXES)}",
+            "sector": sector,
+            "industry": str(rng.choice(SECTORS[sector])),
+            "shares": market_cap / price,
+            "price": price,
+            "revenue": revenue,
+            "operating_margin": margin,
+            "ebitda": revenue * (margin + rng.uniform(0.02, 0.08)),
+            "net_income": net_income,
+            "free_cash_flow": net_income * rng.uniform(0.6, 1.3),
+            "equity": equity,
+            "debt": equity * rng.uniform(0.0, 2.5),
+            "growth": float(rng.normal(0.08, 0.1)),
+            "upside": float(rng.normal(0.08, 0.15)),
+            "insider_net_shares": float(np.round(rng.normal(0, 1e-4) * market_cap / price)),
+            "beta": beta,
+            "idio_vol": idio_vol,
+            "alpha": float(rng.normal(0.0, 0.05)),
+            "vol": float(np.hypot(beta * MARKET_VOL, idio_vol)),
+            # Implied over realized premium and smile skew
+            "vrp": float(rng.uniform(0.05, 0.2)),
+            "rho": float(rng.uniform(-0.7, -0.2)),
+            "news_rate": float(np.clip(np.log10(market_cap / 1e8), 0.5, 6.0)),
+        }
+        self._profiles[symbol] = p
+        return p
+
+    def _market_returns(self, n: int) -> np.ndarray:
+        if self._market is None or self._market.size < n:
+            rng = np.random.default_rng([self.seed, MARKET])
+            self._market = rng.standard_normal(n) * MARKET_VOL / np.sqrt(252) + MARKET_DRIFT / 252
+        return self._market[:n]
+
+    def history(self, symbol: str, as_of: date = None) -> pd.DataFrame:
+        """
+        Daily bars like Ticker.history (naive Date index, COLUMNS) from EPOCH to
+        the last session before as_of. Shared between calls: treat as read-only.
+        """
+        as_of = as_of or date.today()
+        key = (symbol, as_of)
+        if key in self._bars:
+            self._bars.move_to_end(key)
+            return self._bars[key]
+        p = self.profile(symbol)
+        index = self._sessions.get(as_of)
+        if index is None:
+            index = self._sessions[as_of] = pd.bdate_range(EPOCH, as_of - timedelta(days=1), name="Date")
+        n = len(index)
+        daily_vol = p["idio_vol"] / np.sqrt(252)
+        # Draws are sequential, so every day's bar is the same whatever as_of is
+        log_ret = (p["beta"] * self._market_returns(n) + self._rng(symbol, PATH).standard_normal(n) * daily_vol
+                   + (p["alpha"] - 0.5 * p["vol"] ** 2) / 252)
+        close = p["price"] * np.exp(np.cumsum(log_ret))
+        noise = self._rng(symbol, BAR_NOISE).standard_normal((n, 3))
+        day_vol = p["vol"] / np.sqrt(252)
+        open_ = np.concatenate([[p["price"]], close[:-1]]) * np.exp(noise[:, 0] * day_vol * 0.3)
+        high = np.maximum(open_, close) * np.exp(np.abs(noise[:, 1]) * day_vol * 0.5)
+        low = np.minimum(open_, close) * np.exp(-np.abs(noise[:, 2]) * day_vol * 0.5)
+        # Turnover around 0.5% of shares a day, heavier on big moves
+        volume = np.round(p["shares"] * 0.005 * (1 + np.abs(log_ret) / day_vol) * np.exp(noise[:, 0] * 0.3))
+        bars = pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume,
+                             "Dividends": 0.0, "Stock Splits": 0.0}, index=index, columns=COLUMNS)
+        self._bars[key] = bars
+        if len(self._bars) > 16:
+            self._bars.popitem(last=False)
+        return bars
+
+    def iv30(self, symbol: str, bars: pd.DataFrame) -> pd.Series:
+        """Daily IV30 over bars: the long-run and trailing 21-day realized variance blended, plus a premium."""
+        p = self.profile(symbol)
+        log_ret = np.log(bars["Close"]).diff()
+        rv = log_ret.rolling(21, min_periods=5).std().fillna(p["vol"] / np.sqrt(252)) * np.sqrt(252)
+        return (1 + p["vrp"]) * np.sqrt(0.6 * p["vol"] ** 2 + 0.4 * rv ** 2)
+
+    def atm_vol(self, symbol: str, days: np.ndarray, iv30: float) -> np.ndarray:
+        """ATM term structure: today's IV30 decaying toward the long-run level with maturity."""
+        long_run = (1 + self.profile(symbol)["vrp"]) * self.profile(symbol)["vol"]
+        return long_run + (iv30 - long_run) * np.exp(-(np.asarray(days, dtype=float) - 30) / 120)
+
+    def smile(self, symbol: str, days: np.ndarray, moneyness: np.ndarray, iv30: float) -> np.ndarray:
+        """Implied vols from a raw SVI slice per expiry, anchored at the ATM term structure."""
+        t = np.asarray(days, dtype=float) / 365.0
+        w_atm = self.atm_vol(symbol, days, iv30) ** 2 * t
+        rho = self.profile(symbol)["rho"]
+        # Skew flattens with maturity; capped so the slice's minimum variance stays positive
+        b = np.minimum(0.2 * np.sqrt(t), 0.9 * w_atm / (SVI_SIGMA * (1 - np.sqrt(1 - rho ** 2))))
+        params = np.stack([w_atm - b * SVI_SIGMA, b, np.full_like(t, rho), np.zeros_like(t),
+                           np.full_like(t, SVI_SIGMA)], axis=-1)
+        return np.sqrt(svi_total_variance(params, moneyness) / t)
+
+    def chain(self, symbol: str, as_of: date = None) -> OptionChain:
+        """The day's listed calls and puts, quoted around their SVI price."""
+        as_of = as_of or date.today()
+        bars = self.history(symbol, as_of)
+        spot, iv30 = float(bars["Close"].iloc[-1]), float(self.iv30(symbol, bars).iloc[-1])
+        step = strike_step(spot)
+        expirations, strikes = [], []
+        for exp in listed_expirations(as_of):
+            width = min(STRIKE_SDS * float(self.atm_vol(symbol, (exp - as_of).days, iv30))
+                        * np.sqrt((exp - as_of).days / 365.0), 0.6)
+            k = np.arange(np.floor(spot * np.exp(-width) / step), np.ceil(spot * np.exp(width) / step) + 1) * step
+            k = k[k > 0]
+            expirations.extend([exp] * k.size)
+            strikes.append(k)
+        strikes = np.tile(np.concatenate(strikes), 2)
+        expirations = np.array([e.isoformat() for e in expirations] * 2)
+        is_call = np.repeat([True, False], strikes.size // 2)
+        days = (expirations.astype("datetime64[D]") - np.datetime64(as_of, "D")).astype(float)
+        moneyness = np.log(strikes / spot)
+
+        iv = self.smile(symbol, days, moneyness, iv30)
+        fair = OptionPricingModel.black_scholes_batch(spot, strikes, days / 365.0, RISK_FREE, iv, is_call=is_call)
+        half_spread = np.maximum(0.01, 0.02 * fair + 0.01)
+        bid = np.round(np.maximum(fair - half_spread, 0.0), 2)
+        ask = np.round(fair + half_spread, 2)
+        rng = self._rng(symbol, OPTIONS, as_of.toordinal())
+        # Open interest concentrated near the money
+        open_interest = np.round(np.exp(rng.normal(7, 1, strikes.size) - 4 * np.abs(moneyness)))
+        volume = np.round(open_interest * rng.uniform(0, 0.2, strikes.size))
+        tickers = np.array([build_occ_ticker(symbol, e, "call" if c else "put", k)
+                            for e, c, k in zip(expirations, is_call, strikes)])
+        return OptionChain(symbol, spot, as_of, tickers, expirations, days, strikes, is_call, bid, ask,
+                           np.round(fair, 2), open_interest, volume, iv)
+
+    def fundamentals(self, symbol: str, as_of: date = None) -> Dict[str, Any]:
+        """get_ticker_details' fields (Yahoo's conventions: debt/equity in percent), at the last close."""
+        p = self.profile(symbol)
+        close = self.history(symbol, as_of)["Close"]
+        price = float(close.iloc[-1])
+        eps = p["net_income"] / p["shares"]
+        pe = price / eps if eps > 0 else None
+        target = price * (1 + p["upside"])
+        market_cap = p["shares"] * price
+        return {
+            "symbol": symbol,
+            "shortName": p["name"],
+            "sector": p["sector"],
+            "industry": p["industry"],
+            "current_price": price,
+            "market_cap": market_cap,
+            "pe_ratio": pe,
+            "peg_ratio": pe / (p["growth"] * 100) if pe and p["growth"] > 0 else None,
+            "price_to_book": market_cap / p["equity"],
+            "fifty_day_average": float(close.iloc[-50:].mean()),
+            "two_hundred_day_average": float(close.iloc[-200:].mean()),
+            "beta": p["beta"],
+            "target_mean": target,
+            "target_high": target * 1.25,
+            "target_low": target * 0.75,
+            "trailing_eps": eps,
+            "forward_eps": eps * (1 + p["growth"]),
+            "debt_to_equity": 100 * p["debt"] / p["equity"],
+            "return_on_equity": p["net_income"] / p["equity"],
+            "free_cash_flow": p["free_cash_flow"],
+            "operating_margins": p["operating_margin"],
+            "ebitda": p["ebitda"],
+            "total_revenue": p["revenue"],
+        }
+
+    def news(self, symbol: str, as_of: date = None, days: int = 7) -> List[Dict[str, Any]]:
+        """
+        Tiingo-shaped articles from the last days before as_of. Each day's
+        articles are fixed, and their tone leans with the symbol's return over
+        the five sessions before that day.
+        """
+        as_of = as_of or date.today()
+        p = self.profile(symbol)
+        close = self.history(symbol, as_of)["Close"]
+        articles = []
+        for d in pd.date_range(as_of - timedelta(days=days), as_of - timedelta(days=1)):
+            day = d.date()
+            rng = self._rng(symbol, NEWS, day.toordinal())
+            count = rng.poisson(p["news_rate"] / 5)
+            if not count:
+                continue
+            recent = close[close.index < d].iloc[-6:]
+            z = np.log(recent.iloc[-1] / recent.iloc[0]) / (p["vol"] * np.sqrt(5 / 252)) if len(recent) > 1 else 0.0
+            p_up = 1 / (1 + np.exp(-z))
+            for j in range(count):
+                tone = rng.choice(["up", "down", "flat"], p=[0.7 * p_up, 0.7 * (1 - p_up), 0.3])
+                title = str(rng.choice(HEADLINES[tone])).format(name=p["name"], sector=p["sector"].lower())
+                article_id = zlib.crc32(f"{self.seed}:{symbol}:{day}:{j}".encode())
+                published = datetime.combine(day, dt_time(13)) + timedelta(minutes=int(rng.integers(0, 600)))
+                articles.append({
+                    "id": article_id,
+                    "title": title,
+                    "description": f"{title}. {p['name']} ({symbol}) operates in {p['industry'].lower()}.",
+                    "url": f"https://news.example.com/{symbol.lower()}/{article_id}",
+                    "publishedDate": published.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "source": "synthetic",
+                    "tickers": [symbol.lower()],
+                    "tags": [p["sector"]],
+                })
+        return articles
+
+class _Upstream:
+    """Latency (exponential, mean latency seconds) and error injection, per call."""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        # Unseeded: which calls fail differs run to run, the data does not
+        self._noise = np.random.default_rng()
+
+    def _upstream(self, what: str, symbol: str):
+        if self.latency:
+            time.sleep(self._noise.exponential(self.latency))
+        if self.error_rate and self._noise.random() < self.error_rate:
+            raise SyntheticError(f"Injected {what} failure for {symbol}")
+
+class SyntheticProvider(_Upstream, DataProvider):
+    """
+    DataProvider over a SyntheticMarket, with HybridProvider's methods and
+    result shapes. Every method call is one upstream request for the latency
+    and error injection. symbols() is the universe of universe_size fake tickers.
+    """
+
+    def __init__(self, market: SyntheticMarket = None, universe_size: int = 3000,
+                 latency: float = 0.0, error_rate: float = 0.0):
+        super().__init__(latency, error_rate)
+        self.market = market or SyntheticMarket()
+        self.universe_size = universe_size
+
+    def symbols(self) -> List[str]:
+        return self.market.symbols(self.universe_size)
+
+    def get_ticker_details(self, symbol: str) -> Dict[str, Any]:
+        self._upstream("details", symbol)
+        return self.market.fundamentals(symbol)
+
+    def get_options_chain(self, symbol: str) -> Dict[str, Any]:
+        self._upstream("expirations", symbol)
+        return {"symbol": symbol, "expirations": [d.isoformat() for d in listed_expirations(date.today())]}
+
+    def get_history(self, symbol: str, period: str = "1y") -> pd.DataFrame:
+        self._upstream("history", symbol)
+        bars = self.market.history(symbol)
+        start = period_start(period, date.today())
+        return bars[bars.index >= pd.Timestamp(start)] if start is not None else bars
+
+    def get_history_range(self, symbol: str, start: date, end: date) -> pd.DataFrame:
+        """Daily bars for start <= day < end."""
+        self._upstream("history", symbol)
+        bars = self.market.history(symbol)
+        return bars[(bars.index >= pd.Timestamp(start)) & (bars.index < pd.Timestamp(end))]
+
+    def prefetch_history(self, symbol: str, hist: Any, period: str = "1y"):
+        pass
+
+    def get_option_chain(self, symbol: str, current_price: float = None) -> OptionChain:
+        self._upstream("chain", symbol)
+        return self.market.chain(symbol)
+
+    def get_iv_surface(self, symbol: str, current_price: float = None) -> Optional[IVSurface]:
+        return self.get_option_chain(symbol).surface()
+
+    def get_leaps_candidates(self, symbol: str, band: str = "stock_replacement", current_price: float = None,
+                             **kwargs) -> List[Dict[str, Any]]:
+        return self.get_option_chain(symbol).leaps_candidates(band, **kwargs)
+
+    def get_advanced_metrics(self, symbol: str, include_iv_rank: bool = True, fetch_mode: str = "full",
+                             history_since: date = None, last_iv: float = None) -> Dict[str, Any]:
+        """Same keys as HybridProvider.get_advanced_metrics for each fetch_mode."""
+        self._upstream("metrics", symbol)
+        bars = self.market.history(symbol)
+        year = bars[bars.index >= pd.Timestamp(period_start("1y", date.today()))]
+        log_ret = np.log(year["Close"] / year["Close"].shift(1))
+        metrics = {
+            "insider_net_shares": self.market.profile(symbol)["insider_net_shares"],
+            "historical_volatility": float(log_ret.std() * np.sqrt(252)),
+            "iv_short": None,
+            "iv_long": None,
+            "iv_term_structure_ratio": None,
+        }
+        surface = self.market.chain(symbol).surface()
+        if surface is not None:
+            metrics.update(iv_short=surface.iv30, iv_long=surface.iv365,
+                           iv_term_structure_ratio=surface.term_structure_ratio, iv_skew=surface.skew())
+        if not include_iv_rank:
+            return metrics
+
+        # Today's iv30 from the same series as the history rows, as HybridProvider does
+        series = self.market.iv30(symbol, bars)
+        if fetch_mode in ("current", "gap") and not series.empty:
+            metrics["iv30_current"] = float(series.iloc[-1])
+        if fetch_mode == "gap" and history_since:
+            span = bars[bars.index >= pd.Timestamp(history_since)]
+        elif fetch_mode == "full":
+            span = year
+        else:
+            return metrics
+        iv = series.reindex(span.index)
+        if not iv.empty:
+            metrics["iv_history"] = [{"date": f"{d:%Y-%m-%d}", "iv30": float(v)} for d, v in iv.items()]
+            if fetch_mode == "full" and iv.max() > iv.min():
+                metrics["iv_rank"] = float((iv.iloc[-1] - iv.min()) / (iv.max() - iv.min()))
+        return metrics
+
+class SyntheticNewsFetcher(_Upstream):
+    """TiingoNewsFetcher over a SyntheticMarket. An injected error logs and returns no articles, like Tiingo's."""
+
+    def __init__(self, market: SyntheticMarket = None, latency: float = 0.0, error_rate: float = 0.0):
+        super().__init__(latency, error_rate)
+        self.market = market or SyntheticMarket()
+
+    async def fetch_news_batch(self, session, tickers: List[str]) -> List[Dict]:
+        if not tickers:
+            return []
+        if self.latency:
+            await asyncio.sleep(self._noise.exponential(self.latency))
+        if self.error_rate and self._noise.random() < self.error_rate:
+            logger.error(f"Failed to fetch news for {tickers}: injected error")
+            return []
+        return [a for t in tickers for a in self.market.news(t.upper())]
@@ -0,0 +1,41 @@
+import pytest
+from benchmarks import bench
+
+class TestBenchmarks:
+    def test_compare_flags_regressions(self):
+        baseline = {"results": {
+            "iv.impl_vol_batch[1000]": {"median_s": 0.010},
+            "pricing.black_scholes_batch[1000]": {"median_s": 0.010},
+            "screener.calculate_score[500]": {"median_s": 0.010},
+        }}
+        current = {"results": {
+            "iv.impl_vol_batch[1000]": {"median_s": 0.020},          # 2x slower
+            "pricing.black_scholes_batch[1000]": {"median_s": 0.011}, # noise
+            "screener.calculate_score[500]": {"median_s": 0.005},     # 2x faster
+            "features.generate_features[1]": {"median_s": 0.010},     # not in baseline
+        }}
+        rows = {r["name"]: r["status"] for r in bench.compare(current, baseline, threshold=1.25)}
+        assert rows == {
+            "iv.impl_vol_batch[1000]": "regression",
+            "pricing.black_scholes_batch[1000]": "ok",
+            "screener.calculate_score[500]": "improved",
+        }
+
+    def test_main_writes_results_and_flags_regression(self, tmp_path, monkeypatch):
+        import json
+        monkeypatch.setattr(bench, "CONTRACT_SIZES", [1, 10])
+        output = tmp_path / "results.json"
+        baseline = tmp_path / "baseline.json"
+
+        assert bench.main(["--quick", "--filter", "pricing.black_scholes_batch", "--repeat", "1",
+                           "--output", str(output), "--baseline", str(baseline), "--update-baseline"]) == 0
+        stored = json.loads(baseline.read_text())
+        assert set(stored["results"]) == {"pricing.black_scholes_batch[1]", "pricing.black_scholes_batch[10]"}
+        assert stored["results"]["pricing.black_scholes_batch[10]"]["size"] == 10
+
+        # Pretend the baseline was 1000x faster -> regression -> non-zero exit
+        for stats in stored["results"].values():
+            stats["median_s"] /= 1000
+        baseline.write_text(json.dumps(stored))
+        assert bench.main(["--quick", "--filter", "pricing.black_scholes_batch", "--repeat", "1",
+                           "--output", str(output), "--baseline", str(baseline)]) == 1
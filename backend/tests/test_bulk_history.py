@@ -0,0 +1,84 @@
+import pytest
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+from bulk_history import BulkHistory, download_history
+from data_provider import YFinanceProvider
+
+FIELDS = ["Close", "High", "Low", "Open", "Volume"]
+INDEX = pd.date_range("2024-01-02", periods=30, freq="B", name="Date")
+
+def bars(seed, index=INDEX):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index))))
+    return pd.DataFrame({"Close": close, "High": close * 1.01, "Low": close * 0.99, "Open": close,
+                         "Volume": rng.integers(1_000, 5_000, len(index)).astype(float)}, index=index)
+
+class FakeDownload:
+    """yf.download stand-in: (Price, Ticker) columns, all-NaN for unknown symbols."""
+
+    def __init__(self, histories, fail_on=()):
+        self.histories = histories
+        self.fail_on = set(fail_on)
+        self.calls = []
+
+    def __call__(self, symbols, **kwargs):
+        self.calls.append(list(symbols))
+        if self.fail_on & set(symbols):
+            raise ConnectionError("throttled")
+        frames = {s: self.histories.get(s, pd.DataFrame(np.nan, index=INDEX, columns=FIELDS)) for s in symbols}
+        wide = pd.concat(frames, axis=1, sort=True).swaplevel(axis=1).sort_index(axis=1)
+        wide.columns.names = ["Price", "Ticker"]
+        return wide
+
+@pytest.fixture
+def histories():
+    late = bars(3, INDEX[10:])                    # listed mid-window
+    holed = bars(4).drop(INDEX[[5, 6]])            # two missing days
+    return {"AAA": bars(1), "BBB": bars(2), "CCC": late, "DDD": holed, "EEE": bars(5)}
+
+class TestDownloadHistory:
+    def test_chunks_and_views(self, histories):
+        fake = FakeDownload(histories)
+        with patch("bulk_history.yf.download", fake):
+            bulk = download_history(list(histories) + ["ZZZ"], chunk_size=2, period="1y")
+
+        assert fake.calls == [["AAA", "BBB"], ["CCC", "DDD"], ["EEE", "ZZZ"]]
+        assert len(bulk) == 6 and "AAA" in bulk
+        for symbol, expected in histories.items():
+            got = bulk.frame(symbol)
+            pd.testing.assert_frame_equal(got[FIELDS], expected[FIELDS], check_freq=False)
+
+        # Whole-span symbols are views into the one block, not copies
+        assert np.shares_memory(bulk.frame("AAA").to_numpy(), bulk.values)
+        assert np.shares_memory(bulk.frame("CCC")["Close"].to_numpy(), bulk.values)
+        assert np.shares_memory(bulk.array("BBB", "Volume"), bulk.values)
+        # Unknown and all-NaN symbols come back empty
+        assert bulk.frame("ZZZ").empty
+        assert bulk.frame("NOPE").empty
+
+    def test_failed_chunk_is_skipped(self, histories, capsys):
+        fake = FakeDownload(histories, fail_on={"CCC"})
+        with patch("bulk_history.yf.download", fake):
+            bulk = download_history(list(histories), chunk_size=2, period="1y")
+        assert "Bulk history download failed for CCC..DDD" in capsys.readouterr().out
+        assert bulk.frame("CCC").empty and bulk.frame("DDD").empty
+        assert len(bulk.frame("EEE")) == len(INDEX)
+
+    def test_flat_columns(self, histories):
+        with patch("bulk_history.yf.download", lambda symbols, **kw: histories["AAA"]):
+            bulk = download_history(["AAA"], period="1y")
+        assert bulk.symbols == ["AAA"]
+        pd.testing.assert_frame_equal(bulk.frame("AAA"), histories["AAA"], check_freq=False)
+
+class TestPrefetchedHistory:
+    def test_get_history_serves_prefetch_once(self, histories):
+        provider = YFinanceProvider()
+        provider.prefetch_history("AAA", histories["AAA"])
+        with patch("data_provider._yf_ticker") as ticker:
+            ticker.return_value.history.return_value = histories["BBB"]
+            assert provider.get_history("AAA", period="1y") is histories["AAA"]
+            ticker.assert_not_called()
+            # Consumed: the next call (outside a run memo) goes upstream
+            assert provider.get_history("AAA", period="1y") is histories["BBB"]
+            ticker.assert_called_once_with("AAA")
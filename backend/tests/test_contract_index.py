@@ -0,0 +1,107 @@
+import pytest
+import math
+from datetime import date, datetime, timedelta
+from unittest.mock import patch
+from contract_index import ContractIndex, expiration_windows
+from data_provider import PolygonProvider
+from options_lib import OptionPricingModel
+
+DAY1 = date(2024, 6, 3)
+
+def contract(ticker, exp, strike, kind):
+    return {"ticker": ticker, "underlying_ticker": "TST", "expiration_date": exp, "strike_price": strike,
+            "contract_type": kind, "exercise_style": "american", "shares_per_contract": 100}
+
+class FakeListing:
+    """Stand-in for a paged contracts listing that records every query."""
+    def __init__(self, expired, active):
+        self.expired, self.active, self.calls = expired, active, []
+
+    def __call__(self, params):
+        self.calls.append(params)
+        if params["expired"] == "true":
+            return [c for c in self.expired
+                    if params["expiration_date.gte"] <= c["expiration_date"] <= params["expiration_date.lte"]]
+        return list(self.active)
+
+class TestContractIndex:
+    def test_incremental_sync(self, tmp_path):
+        index = ContractIndex(str(tmp_path / "contracts.sqlite"))
+        listing = FakeListing(
+            expired=[contract("O:TST240517C00100000", "2024-05-17", 100.0, "call")],
+            active=[contract("O:TST240621C00100000", "2024-06-21", 100.0, "call"),
+                    contract("O:TST240621P00100000", "2024-06-21", 100.0, "put")],
+        )
+        assert index.sync("TST", listing, today=DAY1) == 3
+        assert listing.calls[0]["expiration_date.gte"] == (DAY1 - timedelta(days=400)).isoformat()
+        assert listing.calls[0]["expiration_date.lte"] == "2024-06-02"
+        # The active chain only out to the LEAPs horizon
+        assert listing.calls[1]["expiration_date.gte"] == "2024-06-03"
+        assert listing.calls[1]["expiration_date.lte"] == (DAY1 + timedelta(days=index.horizon_days)).isoformat()
+
+        # Same day: nothing fetched
+        assert index.sync("TST", listing, today=DAY1) == 0
+        assert len(listing.calls) == 2
+
+        # Next week: a weekly listed and expired in between, plus a new active listing
+        listing.expired.append(contract("O:TST240607C00100000", "2024-06-07", 100.0, "call"))
+        listing.active.append(contract("O:TST240719C00110000", "2024-07-19", 110.0, "call"))
+        assert index.sync("TST", listing, today=date(2024, 6, 10)) == 2
+        # Only the gap since the last sync is asked for
+        assert listing.calls[2]["expiration_date.gte"] == "2024-06-02"
+
+        assert len(index.contracts("TST")) == 5
+        june = index.contracts("TST", exp_from="2024-06-01", exp_to="2024-06-30")
+        assert [c["ticker"] for c in june] == ["O:TST240607C00100000", "O:TST240621C00100000", "O:TST240621P00100000"]
+        assert [c["ticker"] for c in index.contracts("TST", min_strike=105)] == ["O:TST240719C00110000"]
+        assert index.contracts("TST", contract_type="put")[0]["strike_price"] == 100.0
+        assert index.contracts("OTHER") == []
+
+class TestExpirationWindows:
+    def test_bounded_range(self):
+        windows = expiration_windows(date(2024, 1, 1), date(2024, 1, 31), 10)
+        assert windows == [(date(2024, 1, 1), date(2024, 1, 10)), (date(2024, 1, 11), date(2024, 1, 20)),
+                           (date(2024, 1, 21), date(2024, 1, 30)), (date(2024, 1, 31), date(2024, 1, 31))]
+        # Widened to stay under the window cap
+        assert len(expiration_windows(date(2023, 1, 1), date(2024, 1, 1), 1, max_windows=8)) <= 8
+
+    def test_open_range_doubles(self):
+        windows = expiration_windows(date(2024, 1, 1), None, 7)
+        sizes = [(hi - lo).days + 1 for lo, hi in windows[:-1]]
+        assert sizes[:3] == [7, 14, 28]
+        assert windows[-1][1] is None
+        # Contiguous, no overlap
+        assert all(b[0] == a[1] + timedelta(days=1) for a, b in zip(windows, windows[1:]))
+
+    def test_bounded_active_range_doubles(self):
+        end = date(2026, 9, 27)
+        windows = expiration_windows(date(2024, 1, 1), end, 7, doubling=True)
+        sizes = [(hi - lo).days + 1 for lo, hi in windows]
+        assert sizes[:3] == [7, 14, 28]
+        assert windows[-1][1] == end
+        assert all(b[0] == a[1] + timedelta(days=1) for a, b in zip(windows, windows[1:]))
+
+class TestPolygonContractIndex:
+    def test_current_iv_uses_local_index(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("data_provider.CONTRACT_INDEX_PATH", str(tmp_path / "contracts.sqlite"))
+        monkeypatch.setattr("data_provider.ENABLE_CONTRACT_INDEX", True)
+        exp = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+        chain = [contract(f"O:TST{k}{t[0].upper()}", exp, float(k), t) for k in (95, 100, 105) for t in ("call", "put")]
+        t_years = (datetime.strptime(exp, "%Y-%m-%d") - datetime.now()).days / 365.0
+
+        def fake_listing(params):
+            return chain if params["expired"] == "false" else []
+
+        def fake_get_json(endpoint, params=None):
+            c = next(c for c in chain if endpoint.endswith(c["ticker"]))
+            price = OptionPricingModel.black_scholes_batch(100.0, c["strike_price"], t_years, 0.05, 0.3,
+                                                            is_call=c["contract_type"] == "call")
+            return {"results": {"day": {"c": float(price)}}}
+
+        with patch.object(PolygonProvider, "_list_contracts", side_effect=fake_listing) as mock_listing, \
+             patch.object(PolygonProvider, "_get_json", side_effect=fake_get_json):
+            iv = PolygonProvider().get_current_iv("TST", current_price=100.0)
+            assert math.isclose(iv, 0.3, rel_tol=1e-3)
+            # A second run the same day lists nothing
+            PolygonProvider().get_current_iv("TST", current_price=100.0)
+            assert mock_listing.call_count == 2
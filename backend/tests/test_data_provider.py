@@ -1,6 +1,16 @@
 import pytest
 from unittest.mock import MagicMock, patch, call
 from data_provider import YFinanceProvider, PolygonProvider
+from http_session import get_yf_session
+
+@pytest.fixture(autouse=True)
+def local_stores(tmp_path, monkeypatch):
+    """Keep the provider's SQLite stores and the shared limiter out of backend/data."""
+    monkeypatch.setattr("data_provider.HTTP_CACHE_PATH", str(tmp_path / "http_cache.sqlite"))
+    monkeypatch.setattr("data_provider.CONTRACT_INDEX_PATH", str(tmp_path / "contracts.sqlite"))
+    monkeypatch.setattr("data_provider.PRICE_STORE_DIR", str(tmp_path / "prices"))
+    monkeypatch.setattr("rate_limiter.RATE_LIMITER_PATH", str(tmp_path / "rate_limiter.sqlite"))
+    monkeypatch.setattr("rate_limiter._limiter", None)
 
 class TestYFinanceProvider:
     @pytest.fixture
@@ -52,7 +62,7 @@ class TestYFinanceProvider:
         assert details["trailing_eps"] == 6.45
         assert details["return_on_equity"] == 0.15
         
-        mock_yf_ticker.assert_called_with("TEST")
+        mock_yf_ticker.assert_called_with("TEST", session=get_yf_session())
 
     def test_get_ticker_details_missing_fields(self, mock_yf_ticker):
         # Mock mostly empty info
@@ -93,7 +103,7 @@ class TestYFinanceProvider:
 
         assert chain["symbol"] == "OPT"
         assert chain["expirations"] == ("2023-01-01", "2023-02-01")
-        mock_yf_ticker.assert_called_with("OPT")
+        mock_yf_ticker.assert_called_with("OPT", session=get_yf_session())
 
 class TestPolygonProvider:
     @patch("data_provider.PolygonProvider._get_json")
@@ -103,11 +113,11 @@ class TestPolygonProvider:
         symbol = "TEST"
         
         # Mock responses
-        # Call 1: Expired loop (returns 1 contract, no next_url)
-        # Call 2: Active loop (returns 1 contract, no next_url)
+        # Call 1: Expired listing (returns 1 contract, no next_url: a single page, no windows)
+        # Call 2: Active listing (returns 1 contract, no next_url)
         mock_get_json.side_effect = [
-            {"results": [{"ticker": "EXP"}], "next_url": None}, 
-            {"results": [{"ticker": "ACT"}], "next_url": None}
+            {"results": [{"ticker": "EXP", "expiration_date": "2024-01-19"}], "next_url": None},
+            {"results": [{"ticker": "ACT", "expiration_date": "2025-01-17"}], "next_url": None}
         ]
         
         contracts = provider._get_all_contracts(symbol)
@@ -126,10 +136,53 @@ class TestPolygonProvider:
         # Check second call had expired=false
         call2_kwargs = mock_get_json.call_args_list[1][0][1] # params
         assert call2_kwargs.get("expired") == "false"
+        # One single-page listing each for the expired and the active chain
+        assert provider.listing_pages == {(symbol, True): [(call1_kwargs["expiration_date.gte"], None, 1)],
+                                          (symbol, False): [(call2_kwargs["expiration_date.gte"], None, 1)]}
+
+    def test_get_all_contracts_deep_chain_windows(self):
+        # A chain far past the old 10,000 cap, served 1000 per page like Polygon
+        import threading
+        from datetime import date, timedelta
+        today = date.today()
+        expired = [{"ticker": f"O:DEEP{i}", "expiration_date": (today - timedelta(days=390 - i // 40)).isoformat()}
+                   for i in range(15_000)]
+        active = [{"ticker": f"O:LIVE{i}", "expiration_date": (today + timedelta(days=1 + i // 10)).isoformat()}
+                  for i in range(2_500)]
+        cursors, lock = {}, threading.Lock()
+
+        def fake_get_json(endpoint, params=None):
+            with lock:
+                if "cursor=" in endpoint:
+                    rows, offset = cursors[endpoint.rsplit("=", 1)[1]]
+                else:
+                    pool = expired if params["expired"] == "true" else active
+                    rows = [c for c in pool if c["expiration_date"] >= params.get("expiration_date.gte", "")
+                            and c["expiration_date"] <= params.get("expiration_date.lte", "9999")]
+                    offset = 0
+                page = {"results": rows[offset:offset + 1000]}
+                if offset + 1000 < len(rows):
+                    cursor = str(len(cursors))
+                    cursors[cursor] = (rows, offset + 1000)
+                    page["next_url"] = f"{PolygonProvider.BASE_URL}/v3/reference/options/contracts?cursor={cursor}"
+                return page
+
+        provider = PolygonProvider()
+        with patch.object(PolygonProvider, "_get_json", side_effect=fake_get_json):
+            contracts = provider._get_all_contracts("DEEP")
 
-    @patch("data_provider.PolygonProvider._get_all_contracts")
+        tickers = [c["ticker"] for c in contracts]
+        # Everything, once each: no truncation, and window overlaps are deduplicated
+        assert len(tickers) == len(set(tickers)) == 17_500
+        expired_pages, active_pages = provider.listing_pages[("DEEP", True)], provider.listing_pages[("DEEP", False)]
+        # Both listings are kept: 15,000 expired contracts at 1000 per page, split over windows
+        assert len(expired_pages) > 1 and sum(n for _, _, n in expired_pages) >= 15
+        assert len(active_pages) > 1 and all(n <= 2 for _, _, n in active_pages)
+        assert active_pages[-1][1] is None  # the active chain's last window is open-ended
+
+    @patch("data_provider.PolygonProvider._get_contracts")
     def test_get_iv_history_optimization(self, mock_get_all_contracts):
-        # verify that get_iv_history calculates correct bounds and passes them to _get_all_contracts
+        # verify that get_iv_history calculates correct bounds and passes them to the contract lookup
         import pandas as pd
         provider = PolygonProvider()
         symbol = "OPT"
@@ -156,3 +209,130 @@ class TestPolygonProvider:
         
         assert kwargs["min_strike"] == 50.0
         assert kwargs["max_strike"] == 300.0
+
+    @patch("polygon_async.AsyncPolygonClient._get_json")
+    @patch("data_provider.PolygonProvider._get_contracts")
+    def test_get_iv_history_batched_solve(self, mock_get_all_contracts, mock_get_json):
+        # Contract closes are priced at sigma=0.3 so each day should back out ~0.3
+        import pandas as pd
+        from datetime import datetime
+        from options_lib import OptionPricingModel
+
+        provider = PolygonProvider()
+        dates = pd.to_datetime(["2023-01-03", "2023-01-04", "2023-01-05"])
+        closes = [100.0, 101.0, 99.0]
+        df = pd.DataFrame({"Close": closes}, index=dates)
+
+        mock_get_all_contracts.return_value = [
+            {"ticker": "O:OPT230203C00100000", "expiration_date": "2023-02-03", "strike_price": 100.0, "contract_type": "call"},
+            {"ticker": "O:OPT230203P00100000", "expiration_date": "2023-02-03", "strike_price": 100.0, "contract_type": "put"},
+        ]
+
+        async def fake_get_json(endpoint, params=None):
+            is_call = "C00100000" in endpoint
+            bars = []
+            for d, s in zip(dates, closes):
+                t_years = (datetime(2023, 2, 3) - d.to_pydatetime()).days / 365.0
+                price = OptionPricingModel.black_scholes_batch(s, 100.0, t_years, 0.05, 0.3, is_call=is_call)
+                bars.append({"t": int(d.replace(hour=12).timestamp() * 1000), "c": float(price)})
+            return {"results": bars}
+        mock_get_json.side_effect = fake_get_json
+
+        history = provider.get_iv_history("OPT", df)
+
+        assert [h["date"] for h in history] == ["2023-01-03", "2023-01-04", "2023-01-05"]
+        for h in history:
+            assert abs(h["iv30"] - 0.3) < 1e-3
+
+    @patch("data_provider.PolygonProvider._get_json")
+    def test_get_iv_surface_single_fetch_and_cache(self, mock_get_json, tmp_path, monkeypatch):
+        from datetime import date, timedelta
+        monkeypatch.setattr("data_provider.IV_SURFACE_CACHE_DIR", str(tmp_path))
+        monkeypatch.setattr("data_provider.SVI_PARAMS_DIR", str(tmp_path / "svi"))
+        today = date.today()
+
+        def contract(days, strike, ctype, iv=None, mid=None):
+            snap = {
+                "details": {
+                    "expiration_date": (today + timedelta(days=days)).strftime("%Y-%m-%d"),
+                    "strike_price": strike,
+                    "contract_type": ctype,
+                },
+                "last_quote": {"midpoint": mid} if mid else {},
+            }
+            if iv: snap["implied_volatility"] = iv
+            return snap
+
+        from options_lib import OptionPricingModel
+        solved_mid = float(OptionPricingModel.black_scholes_call(100, 110, 30 / 365.0, 0.05, 0.3))
+        page1 = [contract(30, 90, "put", iv=0.3), contract(30, 100, "call", iv=0.3), contract(30, 100, "put", iv=0.3)]
+        page2 = [contract(30, 110, "call", mid=solved_mid),
+                 contract(400, 90, "put", iv=0.2), contract(400, 110, "call", iv=0.2),
+                 contract(400, 80, "call", iv=0.9)]  # ITM call: ignored
+        mock_get_json.side_effect = [
+            {"results": page1, "next_url": "https://api.polygon.io/v3/snapshot/options/OPT?cursor=abc"},
+            {"results": page2},
+        ]
+
+        provider = PolygonProvider()
+        surface = provider.get_iv_surface("OPT", current_price=100.0)
+
+        assert mock_get_json.call_count == 2
+        assert mock_get_json.call_args_list[0][0][0] == "/v3/snapshot/options/OPT"
+        assert mock_get_json.call_args_list[1][0][0] == "/v3/snapshot/options/OPT?cursor=abc"
+        assert abs(surface.iv30 - 0.3) < 1e-3
+        assert abs(surface.constant_maturity_iv(400) - 0.2) < 1e-9
+        # Missing IV was solved from the quote midpoint
+        assert abs(float(surface.iv_at_strike(30, 110.0)) - 0.3) < 1e-3
+
+        # Same provider: memory cache. New provider: disk cache. No more requests either way.
+        assert provider.get_iv_surface("OPT", current_price=100.0) is surface
+        assert PolygonProvider().get_iv_surface("OPT", current_price=100.0).iv30 == surface.iv30
+        assert mock_get_json.call_count == 2
+
+class TestHybridProvider:
+    def test_term_structure_reads_from_surface(self):
+        from data_provider import HybridProvider
+        provider = HybridProvider()
+        provider.yf = MagicMock()
+        provider.poly = MagicMock()
+        provider.yf.get_advanced_metrics.return_value = {"historical_volatility": 0.3}
+        provider.yf.get_ticker_details.return_value = {"current_price": 100.0}
+        surface = MagicMock(iv30=0.4, iv365=0.3, term_structure_ratio=0.75)
+        provider.poly.get_iv_surface.return_value = surface
+        provider.poly.get_current_iv.return_value = 0.41
+
+        metrics = provider.get_advanced_metrics("OPT", include_iv_rank=True, fetch_mode="current")
+
+        assert metrics["iv_short"] == 0.4
+        assert metrics["iv_long"] == 0.3
+        assert metrics["iv_term_structure_ratio"] == 0.75
+        # The stored iv30 is the ATM call/put IV, the same method as the history rows
+        assert metrics["iv30_current"] == 0.41
+        provider.poly.get_current_iv.assert_called_once_with("OPT", 100.0)
+        provider.yf.get_term_structure.assert_not_called()
+        _, kwargs = provider.yf.get_advanced_metrics.call_args
+        assert kwargs["include_term_structure"] is False
+
+    def test_gap_mode_fetches_only_missing_days(self):
+        import pandas as pd
+        from datetime import date
+        from data_provider import HybridProvider
+        provider = HybridProvider()
+        provider.yf = MagicMock()
+        provider.poly = MagicMock()
+        provider.yf.get_advanced_metrics.return_value = {}
+        provider.yf.get_ticker_details.return_value = {"current_price": 100.0}
+        provider.poly.get_iv_surface.return_value = MagicMock(iv30=0.4, iv365=0.3, term_structure_ratio=0.75)
+        provider.poly.get_iv_history.return_value = [{"date": "2024-06-10", "iv30": 0.38}]
+        provider.poly.get_current_iv.return_value = 0.39
+        gap = pd.DataFrame({"Close": [100.0, 101.0]}, index=pd.to_datetime(["2024-06-10", "2024-06-11"]))
+        provider.yf.get_history_range.return_value = gap
+
+        metrics = provider.get_advanced_metrics("OPT", include_iv_rank=True, fetch_mode="gap",
+                                                history_since=date(2024, 6, 10), last_iv=0.37)
+
+        provider.yf.get_history_range.assert_called_once_with("OPT", date(2024, 6, 10), date.today())
+        provider.poly.get_iv_history.assert_called_once_with("OPT", gap, initial_sigma=0.37)
+        assert metrics["iv_history"] == [{"date": "2024-06-10", "iv30": 0.38}]
+        assert metrics["iv30_current"] == 0.39
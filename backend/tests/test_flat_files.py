@@ -0,0 +1,110 @@
+import pytest
+import gzip
+from unittest.mock import patch
+from data_provider import PolygonProvider
+from flat_files import OptionBarStore, load_flat_files, flat_file_dates
+from polygon_async import AsyncPolygonClient
+
+CALL = "O:TST240119C00100000"
+PUT = "O:TST240119P00100000"
+OTHER = "O:TSTX240119C00100000"  # different root sharing a prefix
+LIVE = "O:TST250117C00100000"
+
+@pytest.fixture(autouse=True)
+def local_stores(tmp_path, monkeypatch):
+    """Keep the provider's SQLite stores and the shared limiter out of backend/data."""
+    monkeypatch.setattr("data_provider.HTTP_CACHE_PATH", str(tmp_path / "http_cache.sqlite"))
+    monkeypatch.setattr("data_provider.CONTRACT_INDEX_PATH", str(tmp_path / "contracts.sqlite"))
+    monkeypatch.setattr("data_provider.PRICE_STORE_DIR", str(tmp_path / "prices"))
+    monkeypatch.setattr("rate_limiter.RATE_LIMITER_PATH", str(tmp_path / "rate_limiter.sqlite"))
+    monkeypatch.setattr("rate_limiter._limiter", None)
+
+def write_day(csv_dir, day, rows):
+    year, month = day[:4], day[5:7]
+    folder = csv_dir / year / month
+    folder.mkdir(parents=True, exist_ok=True)
+    with gzip.open(folder / f"{day}.csv.gz", "wt") as f:
+        f.write("ticker,volume,open,close,high,low,window_start,transactions\n")
+        for ticker, close in rows:
+            f.write(f"{ticker},10,{close},{close},{close},{close},0,3\n")
+
+@pytest.fixture
+def flat_files(tmp_path):
+    csv_dir = tmp_path / "day_aggs_v1"
+    days = ["2023-11-01", "2023-12-15", "2024-01-18", "2024-01-19"]
+    for i, day in enumerate(days):
+        write_day(csv_dir, day, [(CALL, 5.0 + i), (PUT, 4.0 - i), (OTHER, 1.0), (LIVE, 9.0), ("O:ZZZ240119C00010000", 2.0)])
+    return csv_dir
+
+class TestFlatFiles:
+    def test_load_selected_contracts(self, flat_files, tmp_path):
+        assert sorted(flat_file_dates(str(flat_files))) == ["2023-11-01", "2023-12-15", "2024-01-18", "2024-01-19"]
+        store = OptionBarStore(str(tmp_path / "store"))
+        result = load_flat_files(str(flat_files), store, tickers={CALL, PUT}, end="2024-01-18")
+        assert result == {"files": 3, "rows": 6}
+
+        closes = store.closes([CALL, PUT, OTHER])
+        assert closes[CALL] == {"2023-11-01": 5.0, "2023-12-15": 6.0, "2024-01-18": 7.0}
+        assert OTHER not in closes
+
+        # Already-loaded days are skipped; the new day is merged in
+        assert load_flat_files(str(flat_files), store, tickers={CALL, PUT}) == {"files": 1, "rows": 2}
+        assert store.closes([PUT])[PUT]["2024-01-19"] == 1.0
+        assert store.ticker_span(CALL) == ["2023-11-01", "2024-01-19"]
+        # Only the listed contracts were kept: the root is not marked loaded
+        assert store.root_span("TST") is None
+
+    def test_selected_loads_track_contracts(self, flat_files, tmp_path):
+        store = OptionBarStore(str(tmp_path / "store"))
+        load_flat_files(str(flat_files), store, tickers={CALL})
+        # Same root, another contract: every day is read again
+        assert load_flat_files(str(flat_files), store, tickers={PUT}) == {"files": 4, "rows": 4}
+        assert store.covered({CALL: "2024-01-19", PUT: "2024-01-19"}) == {CALL, PUT}
+
+        other = OptionBarStore(str(tmp_path / "other"))
+        load_flat_files(str(flat_files), other, tickers={CALL}, end="2023-11-01")
+        load_flat_files(str(flat_files), other, tickers={CALL}, start="2024-01-19")
+        # Two runs with unread days between them keep only the later span
+        assert other.ticker_span(CALL) == ["2024-01-19", "2024-01-19"]
+        assert other.covered({CALL: "2024-01-19", PUT: "2024-01-19"}) == set()
+
+    def test_load_whole_root(self, flat_files, tmp_path):
+        store = OptionBarStore(str(tmp_path / "store"))
+        load_flat_files(str(flat_files), store, roots={"TST"})
+        assert set(store.closes([CALL, PUT, LIVE, OTHER])) == {CALL, PUT, LIVE}
+
+    def test_coverage(self, flat_files, tmp_path):
+        store = OptionBarStore(str(tmp_path / "store"))
+        load_flat_files(str(flat_files), store, roots={"TST"})
+        # Expired within the loaded range: covered. Still trading after the last file: not.
+        assert store.covered({CALL: "2024-01-19", LIVE: "2025-01-17", OTHER: "2024-01-19"}) == {CALL}
+
+    def test_root_loads_with_a_gap(self, flat_files, tmp_path):
+        store = OptionBarStore(str(tmp_path / "store"))
+        load_flat_files(str(flat_files), store, roots={"TST"}, end="2023-11-01")
+        load_flat_files(str(flat_files), store, roots={"TST"}, start="2024-01-19")
+        # 2023-12-15 and 2024-01-18 were never read: not covered, so the API fills them in
+        assert store.root_span("TST") == ["2024-01-19", "2024-01-19"]
+        assert store.covered({CALL: "2024-01-19"}) == set()
+
+        # Reading the gap joins the two runs
+        assert load_flat_files(str(flat_files), store, roots={"TST"}, end="2024-01-18")["files"] == 3
+        assert store.root_span("TST") == ["2023-11-01", "2024-01-19"]
+        assert store.covered({CALL: "2024-01-19"}) == {CALL}
+
+class TestPolygonFlatFileStore:
+    def test_iv_history_reads_store_first(self, flat_files, tmp_path, monkeypatch):
+        store_dir = tmp_path / "store"
+        load_flat_files(str(flat_files), OptionBarStore(str(store_dir)), tickers={CALL})
+        monkeypatch.setattr("data_provider.OPTION_BARS_STORE_DIR", str(store_dir))
+        monkeypatch.setattr("data_provider.ENABLE_OPTION_BARS_STORE", True)
+
+        with patch.object(AsyncPolygonClient, "fetch_contract_closes_sync",
+                          return_value={PUT: {"2024-01-18": 3.0}, LIVE: {"2024-01-18": 9.0}}) as mock_fetch:
+            closes = PolygonProvider()._fetch_contract_closes({CALL: "2024-01-19", PUT: "2024-01-19",
+                                                               LIVE: "2025-01-17"})
+
+        # CALL from the store; PUT (not loaded) and LIVE (not expired) from the API
+        mock_fetch.assert_called_once_with({PUT: "2024-01-19", LIVE: "2025-01-17"})
+        assert closes[CALL]["2024-01-18"] == 7.0
+        assert closes[PUT] == {"2024-01-18": 3.0}
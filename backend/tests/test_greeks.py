@@ -0,0 +1,54 @@
+import pytest
+import math
+import numpy as np
+from greeks import GreeksEngine, LEAPS_DELTA_BANDS
+from options_lib import OptionPricingModel
+
+S = np.array([100.0, 120.0, 80.0, 100.0])
+K = np.array([100.0, 100.0, 100.0, 150.0])
+T = np.array([1.0, 2.0, 0.5, 1.5])
+SIGMA = np.array([0.2, 0.3, 0.45, 0.35])
+R = 0.05
+
+class TestGreeksEngine:
+    @pytest.mark.parametrize("is_call", [True, False])
+    def test_matches_finite_differences(self, is_call):
+        g = GreeksEngine.compute(S, K, T, R, SIGMA, is_call=is_call)
+
+        def price(s=S, t=T, r=R, sig=SIGMA):
+            return OptionPricingModel.black_scholes_batch(s, K, t, r, sig, is_call=is_call)
+
+        h = 1e-4
+        np.testing.assert_allclose(g["price"], price(), rtol=1e-10)
+        np.testing.assert_allclose(g["delta"], (price(s=S + h) - price(s=S - h)) / (2 * h), rtol=1e-5)
+        np.testing.assert_allclose(g["gamma"], (price(s=S + 0.01) - 2 * price() + price(s=S - 0.01)) / 0.01 ** 2, rtol=1e-3)
+        np.testing.assert_allclose(g["vega"], (price(sig=SIGMA + h) - price(sig=SIGMA - h)) / (2 * h), rtol=1e-5)
+        np.testing.assert_allclose(g["rho"], (price(r=R + h) - price(r=R - h)) / (2 * h), rtol=1e-5)
+        # Theta is the derivative with respect to calendar time passing (T shrinking)
+        np.testing.assert_allclose(g["theta"], -(price(t=T + h) - price(t=T - h)) / (2 * h), rtol=1e-4)
+
+    def test_put_call_delta_parity(self):
+        calls = GreeksEngine.compute(S, K, T, R, SIGMA, is_call=True)
+        puts = GreeksEngine.compute(S, K, T, R, SIGMA, is_call=False)
+        np.testing.assert_allclose(calls["delta"] - puts["delta"], 1.0)
+        np.testing.assert_allclose(calls["gamma"], puts["gamma"])
+        np.testing.assert_allclose(calls["vega"], puts["vega"])
+
+    def test_expired_contracts(self):
+        g = GreeksEngine.compute([110.0, 90.0], 100.0, 0.0, R, 0.2, is_call=[True, False])
+        assert list(g["price"]) == [10.0, 10.0]
+        assert list(g["delta"]) == [1.0, -1.0]
+        assert list(g["gamma"]) == [0.0, 0.0]
+
+    def test_select_by_delta(self):
+        delta = np.array([0.95, 0.85, 0.5, 0.4, 0.82, -0.45])
+        assert list(GreeksEngine.select_by_delta(delta, "stock_replacement")) == [1, 4]
+        # Puts match on |delta|, closest to the band midpoint first
+        assert list(GreeksEngine.select_by_delta(delta, "aggressive")) == [3, 5, 2]
+        assert set(LEAPS_DELTA_BANDS) == {"stock_replacement", "aggressive"}
+
+    def test_deep_itm_leap_delta(self):
+        # 12+ month deep ITM call lands in the stock replacement band
+        delta = GreeksEngine.delta(100.0, 80.0, 1.5, R, 0.25)
+        low, high = LEAPS_DELTA_BANDS["stock_replacement"]
+        assert low <= float(delta) <= high
@@ -0,0 +1,103 @@
+import pytest
+import json
+import time
+from datetime import date
+from unittest.mock import MagicMock, patch
+from http_cache import ResponseCache, cache_key, ttl_for, FOREVER, TTL_SNAPSHOT, TTL_OPEN_BARS, TTL_REFERENCE
+from data_provider import PolygonProvider
+
+TODAY = date(2024, 6, 14)
+
+class TestTTLPolicy:
+    def test_endpoint_classes(self):
+        closed = "/v2/aggs/ticker/O:AAPL240119C00150000/range/1/day/2022-01-19/2024-01-19"
+        open_ = "/v2/aggs/ticker/O:AAPL250117C00150000/range/1/day/2023-06-01/2024-06-14"
+        assert ttl_for(closed, {"limit": 5000}, TODAY) is FOREVER
+        assert ttl_for(open_, {"limit": 5000}, TODAY) == TTL_OPEN_BARS
+        assert ttl_for("/v3/snapshot/options/AAPL", {}, TODAY) == TTL_SNAPSHOT
+        assert ttl_for("/v3/snapshot/options/AAPL?cursor=abc", {}, TODAY) == TTL_SNAPSHOT
+        assert ttl_for("/v3/reference/options/contracts", {"expired": "false"}, TODAY) == TTL_REFERENCE
+        assert ttl_for("/v3/reference/options/contracts",
+                       {"expired": "true", "expiration_date.lte": "2024-05-01"}, TODAY) is FOREVER
+
+    def test_key_ignores_api_key_and_param_order(self):
+        a = cache_key("/v3/x", {"limit": 10, "sort": "asc", "apiKey": "secret"})
+        b = cache_key("/v3/x", {"sort": "asc", "limit": 10})
+        assert a == b
+        assert "secret" not in a
+
+class TestResponseCache:
+    def test_hit_miss_and_expiry(self, tmp_path):
+        cache = ResponseCache(str(tmp_path / "c.sqlite"), max_bytes=10_000_000)
+        assert cache.get("k") is None
+        cache.put("k", b'{"results": [1, 2]}', ttl=FOREVER)
+        cache.put("stale", b'{"results": []}', ttl=-1)
+        assert cache.get("k") == {"results": [1, 2]}
+        assert cache.get("stale") is None
+
+        # Counted in memory until flushed (stats() flushes this instance's counts first)
+        other = ResponseCache(cache.path, max_bytes=10_000_000)
+        assert other.stats()["hits"] == 0
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 2)
+        # Flushed counters are persisted, visible to another process/instance
+        assert other.stats()["hits"] == 1
+
+    def test_hits_do_not_write(self, tmp_path):
+        cache = ResponseCache(str(tmp_path / "c.sqlite"), max_bytes=10_000_000)
+        cache.put("k", b'{"results": []}', ttl=FOREVER)
+        touched = lambda: cache._conn().execute("SELECT last_access FROM responses").fetchone()[0]
+        before = touched()
+        with patch("http_cache.time.time", return_value=before + 60):
+            cache.get("k")
+        assert touched() == before
+        # Older than TOUCH_AFTER: the LRU timestamp is refreshed
+        with patch("http_cache.time.time", return_value=before + cache.TOUCH_AFTER + 1):
+            cache.get("k")
+        assert touched() == before + cache.TOUCH_AFTER + 1
+
+    def test_lru_eviction(self, tmp_path):
+        cache = ResponseCache(str(tmp_path / "c.sqlite"), max_bytes=10_000_000)
+        cache.TOUCH_AFTER = 0
+        payload = json.dumps({"results": list(range(2000))}).encode()
+        for i in range(5):
+            cache.put(f"k{i}", payload, ttl=FOREVER)
+            time.sleep(0.01)
+        cache.get("k0")  # touch the oldest entry
+        size = cache.stats()["bytes"] // 5
+
+        cache.max_bytes = size * 3
+        cache.evict()
+        kept = {k for k in ["k0", "k1", "k2", "k3", "k4"] if cache.get(k) is not None}
+        assert "k0" in kept
+        assert "k1" not in kept and "k2" not in kept
+        assert cache.stats()["bytes"] <= cache.max_bytes
+
+class TestPolygonHTTPCache:
+    def test_second_request_served_from_disk(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("data_provider.HTTP_CACHE_PATH", str(tmp_path / "http.sqlite"))
+        monkeypatch.setattr("data_provider.ENABLE_HTTP_CACHE", True)
+        monkeypatch.setattr("data_provider.get_rate_limiter", lambda: None)
+        resp = MagicMock()
+        resp.content = b'{"results": [{"c": 1.5}]}'
+        endpoint = "/v2/aggs/ticker/O:OPT230203C00100000/range/1/day/2021-02-03/2023-02-03"
+
+        session = MagicMock()
+        session.get.return_value = resp
+        mock_get = session.get
+        with patch("data_provider.get_session", return_value=session):
+            first = PolygonProvider()._get_json(endpoint, {"limit": 5000})
+            # A fresh provider (e.g. the next ingest run) hits the disk cache
+            second = PolygonProvider()._get_json(endpoint, {"limit": 5000})
+
+        assert first == second == {"results": [{"c": 1.5}]}
+        assert mock_get.call_count == 1
+        # Caller's params are not mutated with the API key
+        assert "apiKey" in mock_get.call_args[1]["params"]
+
+    def test_contract_bar_window_is_stable_after_expiry(self):
+        window = PolygonProvider._contract_bar_window("2023-02-03", date(2024, 6, 14))
+        assert window == PolygonProvider._contract_bar_window("2023-02-03", date(2024, 6, 15))
+        assert window == ("2021-02-03", "2023-02-03")
+        # Active contracts end today
+        assert PolygonProvider._contract_bar_window("2025-01-17", TODAY)[1] == "2024-06-14"
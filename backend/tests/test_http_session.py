@@ -0,0 +1,26 @@
+import pytest
+from unittest.mock import patch
+import http_session
+from http_session import get_session, get_yf_session, parse_json
+from config import HTTP_POOL_SIZE
+
+class TestHTTPSession:
+    def test_session_shared_within_process(self):
+        session = get_session()
+        assert get_session() is session
+        adapter = session.get_adapter("https://api.polygon.io")
+        assert adapter._pool_maxsize == HTTP_POOL_SIZE
+        assert "gzip" in session.headers["Accept-Encoding"]
+
+    def test_new_session_after_fork(self, monkeypatch):
+        session = get_session()
+        # A forked worker sees a different pid and must not reuse the parent's sockets
+        monkeypatch.setattr(http_session.os, "getpid", lambda: -1)
+        assert get_session() is not session
+
+    def test_yf_session_optional(self, monkeypatch):
+        monkeypatch.setattr(http_session, "curl_requests", None)
+        assert get_yf_session() is None
+
+    def test_parse_json(self):
+        assert parse_json(b'{"results": [1, 2.5, "x"]}') == {"results": [1, 2.5, "x"]}
@@ -0,0 +1,94 @@
+import pytest
+import pandas as pd
+from datetime import date, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from models import Base, ScreenResult, Stock
+from ingest import upsert_stock, upsert_history
+from iv_refresh import plan_iv_refresh, missing_trading_days, IVRefreshPlan
+
+TODAY = date(2024, 6, 12)  # a Wednesday
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+def seed(db, symbol, dates, iv=0.3):
+    upsert_stock(db, {"symbol": symbol})
+    db.commit()
+    upsert_history(db, symbol, [{"date": d, "iv30": iv + i * 0.01} for i, d in enumerate(dates)])
+
+def weekdays(start, end):
+    """Weekdays from start through end."""
+    return [d.date() for d in pd.bdate_range(start, end)]
+
+# A year of rows, from the window start (the backfill's first bar) through end
+def year_to(end):
+    return weekdays(TODAY - timedelta(days=365), end)
+
+class TestIVRefreshPlanner:
+    def test_missing_trading_days(self):
+        assert missing_trading_days(date(2024, 6, 11), TODAY) == 0
+        # Friday -> Monday: nothing missing over the weekend
+        assert missing_trading_days(date(2024, 6, 7), date(2024, 6, 10)) == 0
+        assert missing_trading_days(date(2024, 6, 6), TODAY) == 3
+        assert missing_trading_days(TODAY, TODAY) == 0
+
+    def test_modes(self, db):
+        uptodate, stale = year_to(TODAY - timedelta(days=1)), year_to(date(2024, 6, 6))
+        seed(db, "UPTODATE", uptodate, iv=0.1)
+        seed(db, "STALE", stale, iv=0.1)
+        seed(db, "ANCIENT", [TODAY - timedelta(days=500)])
+        # A row without iv30 (e.g. a run with IV rank off) is not history
+        upsert_stock(db, {"symbol": "EMPTY"})
+        db.add(ScreenResult(symbol="EMPTY", date=TODAY - timedelta(days=1), score=1.0))
+        db.commit()
+
+        plans = plan_iv_refresh(db, ["UPTODATE", "STALE", "ANCIENT", "EMPTY", "NEW"], today=TODAY)
+
+        assert plans["UPTODATE"] == IVRefreshPlan("current", None, pytest.approx(0.1 + (len(uptodate) - 1) * 0.01))
+        assert plans["STALE"] == IVRefreshPlan("gap", date(2024, 6, 7), pytest.approx(0.1 + (len(stale) - 1) * 0.01))
+        assert plans["ANCIENT"].mode == "full"
+        assert plans["EMPTY"].mode == "full"
+        assert plans["NEW"] == IVRefreshPlan("full", None, None)
+
+    def test_short_coverage_is_backfilled(self, db):
+        # Only recent rows: an IV rank over a few days until the year is backfilled
+        seed(db, "RECENT", [TODAY - timedelta(days=d) for d in (3, 2, 1)])
+        # A year, but with two months missing in the middle
+        full_year = year_to(TODAY - timedelta(days=1))
+        seed(db, "HOLES", [d for d in full_year if not date(2024, 1, 1) <= d < date(2024, 3, 1)])
+        # Starts a few days after the window start (long weekend), otherwise complete
+        seed(db, "LATESTART", full_year[3:])
+
+        plans = plan_iv_refresh(db, ["RECENT", "HOLES", "LATESTART"], today=TODAY)
+        assert plans["RECENT"].mode == "full"
+        assert plans["HOLES"].mode == "full"
+        assert plans["LATESTART"].mode == "current"
+
+    def test_sparse_history_backfilled_once(self, db):
+        # An illiquid name: the backfill returned every other week of the year
+        sparse = [d for d in year_to(date(2024, 6, 6)) if d.isocalendar()[1] % 2]
+        for symbol, backfilled_on in (("THIN", TODAY - timedelta(days=30)), ("THINOLD", date(2023, 1, 3)),
+                                      ("THINNEVER", None)):
+            seed(db, symbol, sparse)
+            db.get(Stock, symbol).iv_backfilled_on = backfilled_on
+        db.commit()
+
+        plans = plan_iv_refresh(db, ["THIN", "THINOLD", "THINNEVER"], today=TODAY)
+        # Backfilled inside the window: a gap fill from its last row, not another full year
+        assert plans["THIN"] == IVRefreshPlan("gap", sparse[-1] + timedelta(days=1),
+                                              pytest.approx(0.3 + (len(sparse) - 1) * 0.01))
+        # A backfill from before the window, or none: the window is backfilled
+        assert plans["THINOLD"].mode == "full"
+        assert plans["THINNEVER"].mode == "full"
+
+    def test_upsert_history_accepts_date_strings(self, db):
+        seed(db, "STR", [date(2024, 6, 10)], iv=0.2)
+        upsert_history(db, "STR", [{"date": "2024-06-10", "iv30": 0.25}, {"date": "2024-06-11", "iv30": 0.3}])
+        rows = db.query(ScreenResult).filter_by(symbol="STR").order_by(ScreenResult.date).all()
+        assert [(r.date, r.iv30) for r in rows] == [(date(2024, 6, 10), 0.25), (date(2024, 6, 11), 0.3)]
@@ -0,0 +1,56 @@
+import pytest
+import numpy as np
+import pandas as pd
+from datetime import date, datetime, timedelta
+from iv_selection import plan_iv_history
+
+def reference_plan(all_contracts, stock_history):
+    """The per-day selection plan_iv_history replaces: nearest expiry to +30d beyond +7d, then nearest strike."""
+    daily = {}
+    exps = sorted({c["expiration_date"] for c in all_contracts})
+    for idx, row in stock_history.iterrows():
+        current = pd.to_datetime(idx).tz_localize(None)
+        valid = [e for e in exps if datetime.strptime(e, "%Y-%m-%d") > current + timedelta(days=7)]
+        if not valid:
+            continue
+        target = current + timedelta(days=30)
+        exp = min(valid, key=lambda e: abs((datetime.strptime(e, "%Y-%m-%d") - target).days))
+        strikes = sorted({c["strike_price"] for c in all_contracts if c["expiration_date"] == exp})
+        strike = min(strikes, key=lambda k: abs(k - row["Close"]))
+        sides = {c["contract_type"]: c["ticker"] for c in all_contracts
+                 if c["expiration_date"] == exp and c["strike_price"] == strike}
+        if "call" in sides and "put" in sides:
+            daily[current.strftime("%Y-%m-%d")] = (sides["call"], sides["put"], strike,
+                                                   (datetime.strptime(exp, "%Y-%m-%d") - current).days)
+    return daily
+
+def listing(expirations, strikes, skip=()):
+    return [{"ticker": f"O:TST{e}{t[0].upper()}{k}", "expiration_date": e, "strike_price": k, "contract_type": t}
+            for e in expirations for k in strikes for t in ("call", "put") if (e, k, t) not in skip]
+
+class TestPlanIVHistory:
+    def test_matches_per_day_selection(self):
+        rng = np.random.default_rng(7)
+        first = date(2024, 1, 5)
+        # Weeklies with a gap (a skipped week) and uneven strike spacing
+        expirations = [(first + timedelta(weeks=w)).isoformat() for w in range(24) if w != 9]
+        strikes = [80.0, 85.0, 90.0, 92.5, 95.0, 97.5, 100.0, 102.5, 105.0, 110.0, 120.0]
+        # One strike without a put: days landing on it are skipped
+        contracts = listing(expirations, strikes, skip={(expirations[6], 100.0, "put")})
+        rng.shuffle(contracts)
+        index = pd.date_range("2024-01-02", periods=120, freq="B", tz="America/New_York")
+        history = pd.DataFrame({"Close": 100 * np.exp(np.cumsum(rng.normal(0, 0.01, index.size)))}, index=index)
+
+        daily, needed = plan_iv_history(contracts, history)
+        expected = reference_plan(contracts, history)
+
+        assert {d: (v["call"], v["put"], v["strike"], v["t_days"]) for d, v in daily.items()} == expected
+        assert set(needed) == {t for v in expected.values() for t in v[:2]}
+        assert all(needed[v["call"]] == needed[v["put"]] for v in daily.values())
+        # Days near the end of the listing have no expiry > 7 days out
+        assert len(daily) < index.size
+
+    def test_empty_inputs(self):
+        history = pd.DataFrame({"Close": [100.0]}, index=pd.to_datetime(["2024-01-02"]))
+        assert plan_iv_history([], history) == ({}, {})
+        assert plan_iv_history(listing(["2024-02-02"], [100.0]), history.iloc[:0]) == ({}, {})
@@ -0,0 +1,72 @@
+import pytest
+import math
+import numpy as np
+from datetime import date
+from iv_surface import IVSurface
+
+AS_OF = date(2024, 1, 2)
+
+def flat_term_surface(short_iv=0.40, long_iv=0.25):
+    # Two expiries (20d, 60d) and one LEAP (400d), flat smiles
+    days, strikes, ivs = [], [], []
+    for d, v in [(20, short_iv), (60, short_iv), (400, long_iv)]:
+        for k in [80, 90, 100, 110, 120]:
+            days.append(d)
+            strikes.append(k)
+            ivs.append(v)
+    return IVSurface.from_quotes("TEST", 100.0, AS_OF, days, strikes, ivs)
+
+class TestIVSurface:
+    def test_constant_maturity_uses_total_variance(self):
+        surface = flat_term_surface()
+        # Between 60d (0.40) and 400d (0.25): interpolate sigma^2 * T, not sigma
+        t = 365
+        w60 = 0.40 ** 2 * 60
+        w400 = 0.25 ** 2 * 400
+        expected = math.sqrt((w60 + (w400 - w60) * (t - 60) / (400 - 60)) / t)
+        assert math.isclose(surface.iv365, expected, rel_tol=1e-9)
+        assert math.isclose(surface.iv30, 0.40, rel_tol=1e-9)
+        assert math.isclose(surface.term_structure_ratio, expected / 0.40, rel_tol=1e-9)
+
+    def test_flat_extrapolation(self):
+        surface = flat_term_surface()
+        assert math.isclose(surface.constant_maturity_iv(5), 0.40)
+        assert math.isclose(surface.constant_maturity_iv(900), 0.25)
+
+    def test_smile_lookup_vectorized(self):
+        # Linear skew in log-moneyness on a single expiry
+        strikes = np.array([70.0, 85.0, 100.0, 115.0, 130.0])
+        ivs = 0.30 - 0.2 * np.log(strikes / 100.0)
+        surface = IVSurface.from_quotes("SKEW", 100.0, AS_OF, [30] * 5, strikes, ivs)
+
+        lookup = surface.iv_at_strike(np.array([30, 30, 30]), np.array([85.0, 100.0, 115.0]))
+        np.testing.assert_allclose(lookup, ivs[1:4], atol=2e-3)
+        assert lookup.shape == (3,)
+
+    def test_drops_invalid_quotes_and_thin_expiries(self):
+        surface = IVSurface.from_quotes(
+            "THIN", 100.0, AS_OF,
+            days=[30, 30, 30, 90],
+            strikes=[95, 100, 105, 100],
+            ivs=[0.3, np.nan, 0.32, 0.5],
+        )
+        # 90d has a single quote -> dropped
+        assert list(surface.days) == [30]
+        assert IVSurface.from_quotes("NONE", 100.0, AS_OF, [30], [100], [np.nan]) is None
+
+    def test_save_load_roundtrip(self, tmp_path):
+        surface = flat_term_surface()
+        path = str(tmp_path / "2024-01-02" / "TEST.npz")
+        surface.save(path)
+        loaded = IVSurface.load(path)
+        assert loaded.symbol == "TEST"
+        assert loaded.as_of == AS_OF
+        np.testing.assert_allclose(loaded.grid, surface.grid)
+        assert math.isclose(loaded.iv365, surface.iv365)
+        assert IVSurface.load(str(tmp_path / "missing.npz")) is None
+
+    def test_load_never_unpickles(self, tmp_path):
+        # Files from before the pickle-free format (object array metadata) are ignored and rebuilt
+        path = str(tmp_path / "OLD.npz")
+        np.savez(path, days=np.array([30.0]), meta=np.array(["OLD", 100.0, "2024-01-02"], dtype=object))
+        assert IVSurface.load(path) is None
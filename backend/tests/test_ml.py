@@ -5,7 +5,9 @@ import numpy as np
 import os
 from unittest.mock import MagicMock, patch
 from backend.ml.features import FeatureEngineer
+from backend.ml.features import MACRO_SYMBOLS
 from backend.ml.dataset import HistoryLoader
+from price_store import PriceStore
 
 @pytest.fixture
 def sample_ohlcv():
@@ -102,3 +104,38 @@ class TestHistoryLoader:
         
         assert df is None
         assert "Insufficient History" in status
+
+    def test_ingest_history_bulk(self, tmp_path):
+        dates = pd.date_range(start='2022-01-03', periods=600, name='Date')
+        close = {'GOOD': np.random.normal(100, 1, 600), 'SHORT': np.r_[[np.nan] * 550, np.random.normal(50, 1, 50)]}
+        wide = pd.concat({t: pd.DataFrame({'Close': c, 'Volume': 1000.0}, index=dates) for t, c in close.items()},
+                         axis=1).swaplevel(axis=1)
+        calls = []
+
+        def fake_download(symbols, **kwargs):
+            calls.append(list(symbols))
+            return wide
+
+        loader = HistoryLoader(price_store=PriceStore(str(tmp_path)))
+        with patch('backend.ml.dataset.yf.download', side_effect=fake_download), \
+             patch.object(HistoryLoader, 'fetch_macro_data'), \
+             patch('backend.ml.dataset.HISTORY_DAYS', 2000):
+            passed = loader.ingest_history(['GOOD', 'SHORT'])
+
+        # One multi-ticker request for both symbols, both kept in the store
+        assert calls == [['GOOD', 'SHORT']]
+        assert passed == ['GOOD']
+        assert loader.store.symbols() == ['GOOD', 'SHORT']
+        assert len(loader.store.read('GOOD', columns=['Close'])) == 600
+
+class TestMacroFromStore:
+    def test_macro_features_from_price_store(self, sample_ohlcv, tmp_path):
+        store = PriceStore(str(tmp_path))
+        dates = pd.DatetimeIndex(sample_ohlcv['date']).normalize()
+        for i, symbol in enumerate(MACRO_SYMBOLS.values()):
+            store.replace(symbol, pd.DataFrame({'Close': np.linspace(10, 20, 300) * (i + 1)}, index=dates))
+        df = sample_ohlcv.assign(date=dates)
+
+        out = FeatureEngineer().add_macro_features(df, price_store=store)
+        assert list(out['SPY_close']) == list(np.linspace(10, 20, 300) * 2)
+        assert out['VIX_ret_30d'].notna().sum() == 270
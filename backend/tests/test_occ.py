@@ -0,0 +1,99 @@
+import pytest
+import math
+from datetime import date, datetime, timedelta
+from unittest.mock import MagicMock, patch
+import requests
+from occ import build_occ_ticker, parse_occ_ticker, ChainModel, third_friday
+from contract_index import ContractIndex
+from data_provider import PolygonProvider
+from options_lib import OptionPricingModel
+
+def chain(expirations, strikes):
+    return [{"ticker": build_occ_ticker("TST", e, t, k), "expiration_date": e.isoformat(), "strike_price": k,
+             "contract_type": t, "underlying_ticker": "TST"}
+            for e in expirations for k in strikes for t in ("call", "put")]
+
+class TestOCC:
+    def test_build_and_parse(self):
+        assert build_occ_ticker("AAPL", "2025-01-17", "call", 150) == "O:AAPL250117C00150000"
+        assert build_occ_ticker("SPY", date(2024, 6, 21), "P", 512.5) == "O:SPY240621P00512500"
+        assert build_occ_ticker("BRK.B", "2024-06-21", "call", 410) == "O:BRKB240621C00410000"
+
+        parsed = parse_occ_ticker("O:AAPL250117C00150000")
+        assert parsed == ("AAPL", date(2025, 1, 17), "call", 150.0)
+        assert parse_occ_ticker("SPY240621P00512500").strike == 512.5
+        with pytest.raises(ValueError):
+            parse_occ_ticker("AAPL")
+
+    def test_third_friday(self):
+        assert third_friday(2024, 6) == date(2024, 6, 21)
+        assert third_friday(2025, 1) == date(2025, 1, 17)
+
+    def test_weekly_chain_model(self):
+        fridays = [date(2024, 5, 3) + timedelta(weeks=i) for i in range(6)]
+        model = ChainModel.from_contracts("TST", chain(fridays, [90.0, 92.5, 95.0, 97.5, 100.0, 105.0, 110.0]))
+        assert model.weeklies and model.weekday == 4
+        assert model.expirations_between(date(2024, 6, 10), date(2024, 6, 24)) == [
+            date(2024, 6, 14), date(2024, 6, 21)]
+        assert model.strike_step(96.0) == 2.5
+        assert model.strikes_near(95.9, 2) == [95.0, 97.5]
+
+    def test_monthly_chain_model(self):
+        monthlies = [third_friday(2024, m) for m in (1, 2, 3, 4)]
+        model = ChainModel.from_contracts("TST", chain(monthlies, [40.0, 45.0, 50.0, 55.0]))
+        assert not model.weeklies
+        assert model.expirations_between(date(2024, 5, 1), date(2024, 7, 31)) == [
+            date(2024, 5, 17), date(2024, 6, 21), date(2024, 7, 19)]
+        # Closest expiry to the target first, then closest strike
+        candidates = model.atm_candidates(51.0, date(2024, 6, 15), date(2024, 5, 1), date(2024, 7, 31))
+        assert candidates[:2] == [(date(2024, 6, 21), 50.0), (date(2024, 6, 21), 55.0)]
+
+    def test_too_little_history(self):
+        assert ChainModel.from_contracts("TST", chain([date(2024, 6, 21)], [100.0, 105.0])) is None
+
+class TestPolygonOCC:
+    def test_current_iv_without_listing(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("data_provider.CONTRACT_INDEX_PATH", str(tmp_path / "contracts.sqlite"))
+        monkeypatch.setattr("data_provider.ENABLE_CONTRACT_INDEX", True)
+        today = datetime.now().date()
+        strikes = [90.0, 95.0, 100.0, 105.0, 110.0]
+
+        # Past weekly chains are in the index; no sync today
+        first_friday = today - timedelta(days=(today.weekday() - 4) % 7 + 56)
+        past = chain([first_friday + timedelta(weeks=i) for i in range(8)], strikes)
+        index = ContractIndex(str(tmp_path / "contracts.sqlite"))
+        index.sync("TST", lambda params: past if params["expired"] == "true" else [], today=today - timedelta(days=1))
+
+        # Live listing: every Friday except the one nearest 30 days out (e.g. a holiday)
+        target = today + timedelta(days=30)
+        nearest = min((today + timedelta(days=d) for d in range(20, 61) if (today + timedelta(days=d)).weekday() == 4),
+                      key=lambda d: abs((d - target).days))
+        live = {}
+        for d in range(20, 61):
+            exp = today + timedelta(days=d)
+            if exp.weekday() == 4 and exp != nearest:
+                for c in chain([exp], strikes):
+                    live[c["ticker"]] = c
+
+        def fake_get_json(endpoint, params=None):
+            ticker = endpoint.rsplit("/", 1)[1]
+            if ticker not in live:
+                err = requests.HTTPError("404 Not Found")
+                err.response = MagicMock(status_code=404)
+                raise err
+            c = live[ticker]
+            t_years = (datetime.strptime(c["expiration_date"], "%Y-%m-%d") - datetime.now()).days / 365.0
+            price = OptionPricingModel.black_scholes_batch(101.0, c["strike_price"], t_years, 0.05, 0.3,
+                                                            is_call=c["contract_type"] == "call")
+            return {"results": {"day": {"c": float(price)}}}
+
+        with patch.object(PolygonProvider, "_list_contracts") as mock_listing, \
+             patch.object(PolygonProvider, "_get_json", side_effect=fake_get_json) as mock_get_json:
+            iv = PolygonProvider().get_current_iv("TST", current_price=101.0)
+
+        assert math.isclose(iv, 0.3, rel_tol=1e-3)
+        mock_listing.assert_not_called()
+        # Guesses at the missing expiry 404, then the next-closest expiry is priced at the ATM strike
+        probed = [c[0][0].rsplit("/", 1)[1] for c in mock_get_json.call_args_list]
+        assert probed[0] == build_occ_ticker("TST", nearest, "call", 100.0)
+        assert parse_occ_ticker(probed[-1]).strike == 100.0
@@ -0,0 +1,145 @@
+import pytest
+import json
+import math
+import threading
+import numpy as np
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from data_provider import PolygonProvider
+from greeks import LEAPS_DELTA_BANDS
+from option_chain import OptionChain
+from options_lib import OptionPricingModel
+
+SPOT = 100.0
+SIGMA = 0.3
+
+def snapshot(days, strike, ctype, with_iv=False, quoted=True, today=None):
+    today = today or date.today()
+    exp = today + timedelta(days=days)
+    price = float(OptionPricingModel.black_scholes_batch(SPOT, strike, days / 365.0, 0.05, SIGMA,
+                                                          is_call=ctype == "call"))
+    snap = {
+        "details": {"ticker": f"O:TST{exp:%y%m%d}{ctype[0].upper()}{int(strike * 1000):08d}",
+                    "expiration_date": exp.isoformat(), "strike_price": strike, "contract_type": ctype},
+        "open_interest": 500,
+        # No trade today: day.close is missing, only the quote prices the contract
+        "day": {},
+        "underlying_asset": {"price": SPOT, "ticker": "TST"},
+    }
+    if quoted:
+        snap["last_quote"] = {"bid": price - 0.05, "ask": price + 0.05, "midpoint": price}
+    else:
+        snap["last_trade"] = {"price": price}
+    if with_iv:
+        snap["implied_volatility"] = SIGMA
+    return snap
+
+def full_chain(today=None):
+    return [snapshot(days, k, t, with_iv=(k == 120), today=today)
+            for days in (30, 60, 400, 700) for k in (60.0, 80.0, 90.0, 100.0, 110.0, 120.0, 140.0)
+            for t in ("call", "put")]
+
+class FakePolygonChain:
+    """Chain snapshot endpoint served by a local http.server, two pages per chain."""
+
+    def __init__(self, results):
+        self.results = results
+        self.paths = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                fake.paths.append(url.path)
+                half = len(fake.results) // 2
+                if parse_qs(url.query).get("cursor"):
+                    body = {"results": fake.results[half:]}
+                else:
+                    body = {"results": fake.results[:half], "next_url": f"{fake.base}{url.path}?cursor=2"}
+                payload = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setattr("data_provider.ENABLE_HTTP_CACHE", False)
+    monkeypatch.setattr("data_provider.get_rate_limiter", lambda: None)
+    monkeypatch.setattr("data_provider.IV_SURFACE_CACHE_DIR", str(tmp_path / "surfaces"))
+    monkeypatch.setattr("data_provider.SVI_PARAMS_DIR", str(tmp_path / "svi"))
+    monkeypatch.setattr("data_provider.CURRENT_IV_FROM_CHAIN", True)
+    fake = FakePolygonChain(full_chain())
+    yield fake
+    fake.stop()
+
+class TestOptionChain:
+    def test_parse_and_quotes(self):
+        today = date(2024, 6, 3)
+        snaps = [snapshot(30, 100.0, "call", today=today), snapshot(30, 100.0, "put", quoted=False, today=today),
+                 {"details": {"expiration_date": "2024-07-03"}}]  # no strike: skipped
+        chain = OptionChain.from_snapshots("TST", snaps, today)
+        assert len(chain) == 2
+        assert chain.spot == SPOT
+        assert list(chain.days) == [30.0, 30.0]
+        assert list(chain.is_call) == [True, False]
+        assert chain.open_interest[0] == 500
+        # Call priced from its quote, put (no quote) from its last trade
+        assert math.isclose(chain.mid[0], (chain.bid[0] + chain.ask[0]) / 2)
+        assert chain.mid[1] == chain.last[1]
+        np.testing.assert_allclose(chain.implied_vols(), SIGMA, rtol=1e-3)
+        assert math.isclose(chain.atm_iv(30), SIGMA, rel_tol=1e-3)
+
+    def test_no_spot(self):
+        snap = snapshot(30, 100.0, "call")
+        del snap["underlying_asset"]
+        assert OptionChain.from_snapshots("TST", [snap], date.today()) is None
+        assert OptionChain.from_snapshots("TST", [snap], date.today(), spot=SPOT) is not None
+
+    def test_atm_iv_needs_both_sides(self):
+        # The 30-day expiry only has a call; the 60-day pair is used instead
+        snaps = [snapshot(30, 100.0, "call"), snapshot(60, 100.0, "call"), snapshot(60, 100.0, "put")]
+        chain = OptionChain.from_snapshots("TST", snaps, date.today())
+        chain.iv[0] = 0.9  # would show up if the lone call were used
+        assert math.isclose(chain.atm_iv(30), SIGMA, rel_tol=1e-3)
+
+    @pytest.mark.parametrize("band,ctype", [("stock_replacement", "call"), ("aggressive", "put")])
+    def test_leaps_candidates(self, band, ctype):
+        chain = OptionChain.from_snapshots("TST", full_chain(), date.today())
+        candidates = chain.leaps_candidates(band, contract_type=ctype)
+        low, high = LEAPS_DELTA_BANDS[band]
+        assert candidates
+        assert all(c["days"] >= 365 and c["contract_type"] == ctype for c in candidates)
+        assert all(low <= abs(c["delta"]) <= high for c in candidates)
+        mid = (low + high) / 2
+        gaps = [abs(abs(c["delta"]) - mid) for c in candidates]
+        assert gaps == sorted(gaps)
+        assert chain.leaps_candidates(band, contract_type=ctype, min_open_interest=1000) == []
+
+class TestPolygonChainSnapshot:
+    def test_one_fetch_feeds_iv_surface_and_leaps(self, server):
+        provider = PolygonProvider()
+        provider.BASE_URL = server.base
+
+        iv = provider.get_current_iv("TST", current_price=SPOT)
+        assert math.isclose(iv, SIGMA, rel_tol=1e-3)
+        surface = provider.get_iv_surface("TST", current_price=SPOT)
+        assert math.isclose(surface.iv30, SIGMA, rel_tol=1e-2)
+        assert provider.get_leaps_candidates("TST", "stock_replacement", current_price=SPOT)
+
+        # The chain's two pages were the only requests
+        assert server.paths == ["/v3/snapshot/options/TST"] * 2
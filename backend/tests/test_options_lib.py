@@ -1,6 +1,7 @@
 import pytest
 import math
-from options_lib import OptionPricingModel, IVEstimator
+import numpy as np
+from options_lib import OptionPricingModel, IVEstimator, BinomialPricingModel
 
 class TestOptionPricingModel:
     def test_black_scholes_call_basic(self):
@@ -19,6 +20,40 @@ class TestOptionPricingModel:
         price = OptionPricingModel.black_scholes_call(90, 100, 0, 0.05, 0.2)
         assert price == 0
 
+class TestBlackScholesBatch:
+    def test_batch_matches_scalar(self):
+        S = np.array([100.0, 120.0, 80.0, 100.0])
+        K = np.array([100.0, 100.0, 100.0, 150.0])
+        T = np.array([1.0, 0.5, 0.25, 2.0])
+        sigma = np.array([0.2, 0.25, 0.4, 0.3])
+
+        calls = OptionPricingModel.black_scholes_call_batch(S, K, T, 0.05, sigma)
+        puts = OptionPricingModel.black_scholes_put_batch(S, K, T, 0.05, sigma)
+
+        for i in range(len(S)):
+            assert math.isclose(calls[i], OptionPricingModel.black_scholes_call(S[i], K[i], T[i], 0.05, sigma[i]), rel_tol=1e-9)
+            assert math.isclose(puts[i], OptionPricingModel.black_scholes_put(S[i], K[i], T[i], 0.05, sigma[i]), rel_tol=1e-9)
+
+    def test_batch_mixed_call_put(self):
+        is_call = np.array([True, False])
+        prices = OptionPricingModel.black_scholes_batch(100, 100, 1, 0.05, 0.2, is_call=is_call)
+        assert math.isclose(prices[0], OptionPricingModel.black_scholes_call(100, 100, 1, 0.05, 0.2), rel_tol=1e-9)
+        assert math.isclose(prices[1], OptionPricingModel.black_scholes_put(100, 100, 1, 0.05, 0.2), rel_tol=1e-9)
+
+    def test_batch_expired_is_intrinsic(self):
+        # T <= 0 -> intrinsic value, same as the scalar API
+        S = np.array([110.0, 90.0, 110.0, 90.0])
+        T = np.array([0.0, 0.0, -1.0, 0.0])
+        calls = OptionPricingModel.black_scholes_call_batch(S, 100, T, 0.05, 0.2)
+        puts = OptionPricingModel.black_scholes_put_batch(S, 100, T, 0.05, 0.2)
+        assert list(calls) == [10.0, 0.0, 10.0, 0.0]
+        assert list(puts) == [0.0, 10.0, 0.0, 10.0]
+
+    def test_batch_scalar_inputs(self):
+        price = OptionPricingModel.black_scholes_batch(100, 100, 1, 0.05, 0.2)
+        assert price.shape == ()
+        assert math.isclose(float(price), 10.45, rel_tol=0.01)
+
 class TestIVEstimator:
     def test_impl_vol_call_basic(self):
         # Reverse the BS calculation
@@ -63,3 +98,120 @@ class TestIVEstimator:
         # But main result is no exception.
         assert True
 
+class TestIVBatch:
+    def test_batch_recovers_sigma(self):
+        S = np.array([100.0, 120.0, 120.0, 90.0])
+        K = np.array([100.0, 100.0, 100.0, 100.0])
+        T = np.array([1.0, 0.5, 0.5, 0.25])
+        sigma = np.array([0.30, 0.25, 0.25, 0.45])
+        is_call = np.array([True, True, False, False])
+        prices = OptionPricingModel.black_scholes_batch(S, K, T, 0.05, sigma, is_call=is_call)
+
+        ivs = IVEstimator.impl_vol_batch(prices, S, K, T, 0.05, is_call=is_call)
+        np.testing.assert_allclose(ivs, sigma, atol=1e-4)
+
+    def test_batch_matches_scalar(self):
+        prices = np.array([10.4506, 5.2833, 99.0])
+        ivs = IVEstimator.impl_vol_batch(prices, 100, 100, 1, 0.05)
+        for price, iv in zip(prices, ivs):
+            assert math.isclose(iv, IVEstimator.impl_vol_call(price, 100, 100, 1, 0.05), rel_tol=1e-3)
+
+    def test_batch_failures_are_nan(self):
+        # T <= 0, price below intrinsic, price above the underlying
+        prices = np.array([5.0, 1.0, 150.0])
+        S = np.array([100.0, 120.0, 100.0])
+        T = np.array([0.0, 0.5, 0.5])
+        ivs = IVEstimator.impl_vol_batch(prices, S, 100, T, 0.05)
+        assert np.isnan(ivs).all()
+
+    def test_batch_small_vega_uses_bracketing(self):
+        # Deep OTM: vega at the initial guess is < 1e-8 so Newton bails out,
+        # bisection should still recover the volatility.
+        price = OptionPricingModel.black_scholes_call(100, 300, 0.1, 0.05, 2.0)
+        iv = IVEstimator.impl_vol_batch(price, 100, 300, 0.1, 0.05)
+        assert math.isclose(float(iv), 2.0, rel_tol=1e-3)
+
+    def test_initial_guess_near_solution(self):
+        S = np.array([100.0, 100.0, 100.0])
+        K = np.array([100.0, 80.0, 130.0])
+        sigma = np.array([0.25, 0.35, 0.5])
+        prices = OptionPricingModel.black_scholes_call_batch(S, K, 1.0, 0.05, sigma)
+        guess = IVEstimator.initial_guess(prices, S, K, 1.0, 0.05)
+        np.testing.assert_allclose(guess, sigma, rtol=0.15)
+
+    def test_warm_start_reduces_iterations(self):
+        S = np.array([100.0, 110.0, 90.0])
+        sigma = np.array([0.2, 0.3, 0.4])
+        prices = OptionPricingModel.black_scholes_put_batch(S, 100, 0.5, 0.05, sigma)
+
+        cold, cold_iters = IVEstimator.impl_vol_batch(prices, S, 100, 0.5, 0.05, is_call=False, return_iterations=True)
+        warm, warm_iters = IVEstimator.impl_vol_batch(prices, S, 100, 0.5, 0.05, is_call=False,
+                                                      initial_sigma=sigma + 0.001, return_iterations=True)
+        np.testing.assert_allclose(warm, sigma, atol=1e-4)
+        np.testing.assert_allclose(cold, sigma, atol=1e-4)
+        assert warm_iters.sum() <= cold_iters.sum()
+        assert (warm_iters >= 1).all()
+
+    def test_scalar_iteration_count(self):
+        sigma, iterations = IVEstimator.impl_vol_call(10.4506, 100, 100, 1, 0.05, return_iterations=True)
+        assert math.isclose(sigma, 0.2, rel_tol=0.01)
+        assert 1 <= iterations <= 10
+
+        sigma, iterations = IVEstimator.impl_vol_call(5, 100, 100, 0, 0.05, return_iterations=True)
+        assert sigma is None and iterations == 0
+
+class TestBinomialPricingModel:
+    @pytest.mark.parametrize("method", ["lr", "crr"])
+    def test_european_tree_converges_to_black_scholes(self, method):
+        steps = 101 if method == "lr" else 1000
+        price = BinomialPricingModel.price_batch(100, 100, 1, 0.05, 0.2, steps=steps, method=method, american=False)
+        assert math.isclose(float(price), OptionPricingModel.black_scholes_call(100, 100, 1, 0.05, 0.2), abs_tol=0.01)
+
+    def test_american_put_benchmark(self):
+        # Longstaff-Schwartz reference value for S=36, K=40, T=1, r=6%, sigma=20%: 4.478
+        price = BinomialPricingModel.price_batch(36, 40, 1, 0.06, 0.2, is_call=False)
+        assert math.isclose(float(price), 4.478, abs_tol=0.01)
+
+    def test_american_call_without_dividends_is_european(self):
+        american = BinomialPricingModel.price_batch(100, 80, 2, 0.05, 0.3)
+        european = BinomialPricingModel.price_batch(100, 80, 2, 0.05, 0.3, american=False)
+        assert math.isclose(float(american), float(european), rel_tol=1e-9)
+
+    def test_dividends_add_early_exercise_premium_to_deep_itm_leaps(self):
+        american = BinomialPricingModel.price_batch(100, 60, 2, 0.05, 0.25, q=0.06)
+        european = BinomialPricingModel.price_batch(100, 60, 2, 0.05, 0.25, q=0.06, american=False)
+        assert american > european + 0.5
+        assert american >= 40.0 - 1e-9  # never below intrinsic
+
+    def test_batch_delta_and_expired(self):
+        S = np.array([100.0, 100.0, 110.0])
+        T = np.array([1.0, 1.0, 0.0])
+        is_call = np.array([True, False, True])
+        prices, deltas = BinomialPricingModel.price_batch(S, 100, T, 0.05, 0.2, is_call=is_call,
+                                                          american=False, return_delta=True)
+        bs_call_delta = 0.6368  # N(d1) for S=K=100, T=1, r=5%, sigma=20%
+        assert math.isclose(deltas[0], bs_call_delta, abs_tol=0.01)
+        assert math.isclose(deltas[1], bs_call_delta - 1, abs_tol=0.01)
+        assert prices[2] == 10.0 and deltas[2] == 1.0
+
+    def test_impl_vol_round_trip(self):
+        S = np.array([100.0, 100.0, 90.0, 120.0])
+        K = np.array([70.0, 100.0, 100.0, 100.0])
+        T = np.array([2.0, 1.5, 0.5, 1.0])
+        sigma = np.array([0.3, 0.25, 0.4, 0.2])
+        q = np.array([0.04, 0.02, 0.0, 0.03])
+        is_call = np.array([True, True, False, False])
+        prices = BinomialPricingModel.price_batch(S, K, T, 0.05, sigma, q=q, is_call=is_call)
+
+        ivs = BinomialPricingModel.impl_vol_batch(prices, S, K, T, 0.05, q=q, is_call=is_call)
+        np.testing.assert_allclose(ivs, sigma, atol=1e-3)
+
+    def test_impl_vol_unsolvable_is_nan(self):
+        # Below intrinsic and at intrinsic (exercise now) have no implied vol
+        ivs = BinomialPricingModel.impl_vol_batch([5.0, 20.0], 120, 100, 1.0, 0.05)
+        assert np.isnan(ivs).all()
+
+    def test_unknown_method(self):
+        with pytest.raises(ValueError):
+            BinomialPricingModel.price_batch(100, 100, 1, 0.05, 0.2, method="trinomial")
+
@@ -0,0 +1,153 @@
+import pytest
+import math
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from aiohttp import web
+from options_lib import OptionPricingModel
+from polygon_async import AsyncPolygonClient, run_sync
+
+SPOT = 100.0
+SIGMA = 0.3
+
+class FakePolygon:
+    """Minimal Polygon stand-in served from a background thread."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = 0
+        exp = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+        self.expiration = exp
+        self.contracts = [
+            {"ticker": f"O:TST{k}{t[0].upper()}", "expiration_date": exp, "strike_price": float(k), "contract_type": t}
+            for k in (95, 100, 105) for t in ("call", "put")
+        ]
+
+    async def contracts_handler(self, request):
+        self.requests += 1
+        # Two pages to exercise next_url
+        if request.query.get("cursor"):
+            return web.json_response({"results": self.contracts[3:]})
+        return web.json_response({"results": self.contracts[:3],
+                                  "next_url": f"{self.base}/v3/reference/options/contracts?cursor=2"})
+
+    async def snapshot_handler(self, request):
+        self.requests += 1
+        ticker = request.match_info["ticker"]
+        contract = next(c for c in self.contracts if c["ticker"] == ticker)
+        t_years = (datetime.strptime(self.expiration, "%Y-%m-%d") - datetime.now()).days / 365.0
+        price = OptionPricingModel.black_scholes_batch(SPOT, contract["strike_price"], t_years, 0.05, SIGMA,
+                                                        is_call=contract["contract_type"] == "call")
+        return web.json_response({"results": {"day": {"c": float(price)}}})
+
+    async def aggs_handler(self, request):
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.02)
+        self.in_flight -= 1
+        return web.json_response({"results": [{"t": 1704283200000, "c": 1.0}]})
+
+    def start(self):
+        started = threading.Event()
+
+        def serve():
+            self.loop = asyncio.new_event_loop()
+            app = web.Application()
+            app.router.add_get("/v3/reference/options/contracts", self.contracts_handler)
+            app.router.add_get("/v2/snapshot/locale/us/markets/options/tickers/{ticker}", self.snapshot_handler)
+            app.router.add_get("/v2/aggs/ticker/{ticker}/range/1/day/{start}/{end}", self.aggs_handler)
+            self.runner = web.AppRunner(app)
+            self.loop.run_until_complete(self.runner.setup())
+            site = web.TCPSite(self.runner, "127.0.0.1", 0)
+            self.loop.run_until_complete(site.start())
+            port = site._server.sockets[0].getsockname()[1]
+            self.base = f"http://127.0.0.1:{port}"
+            started.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=serve, daemon=True)
+        self.thread.start()
+        started.wait(5)
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr("polygon_async.ENABLE_HTTP_CACHE", False)
+    monkeypatch.setattr("polygon_async.get_rate_limiter", lambda: None)
+    fake = FakePolygon()
+    fake.start()
+    yield fake
+    fake.stop()
+
+def make_client(server, max_in_flight=64):
+    client = AsyncPolygonClient(api_key="test", max_in_flight=max_in_flight)
+    client.BASE_URL = server.base
+    return client
+
+class TestAsyncPolygonClient:
+    def test_in_flight_limit(self, server):
+        client = make_client(server, max_in_flight=5)
+        expirations = {f"O:TST{i}C": "2024-01-19" for i in range(40)}
+        closes = client.fetch_contract_closes_sync(expirations)
+        assert len(closes) == 40
+        assert closes["O:TST0C"] == {datetime.fromtimestamp(1704283200).strftime("%Y-%m-%d"): 1.0}
+        assert server.max_in_flight == 5
+
+    def test_list_contracts_follows_pages(self, server):
+        contracts = make_client(server).list_contracts_sync("TST", expiration_date__gte="2024-01-01")
+        assert len(contracts) == 6
+        assert server.requests == 2
+
+    def test_get_current_iv(self, server):
+        iv = make_client(server).get_current_iv_sync("TST", current_price=SPOT)
+        # Recovers the volatility the fake priced the ATM pair with
+        assert math.isclose(iv, SIGMA, rel_tol=1e-3)
+
+    def test_sqlite_stores_kept_off_the_loop(self, server, tmp_path, monkeypatch):
+        from http_cache import ResponseCache
+        from rate_limiter import TokenBucketLimiter
+        threads = []
+
+        class Cache(ResponseCache):
+            def get(self, key):
+                threads.append(threading.get_ident())
+                return super().get(key)
+
+            def put(self, *args):
+                threads.append(threading.get_ident())
+                return super().put(*args)
+
+        class Limiter(TokenBucketLimiter):
+            def reserve(self, *args):
+                threads.append(threading.get_ident())
+                return super().reserve(*args)
+
+        limiter = Limiter(str(tmp_path / "rl.sqlite"), {})
+        monkeypatch.setattr("polygon_async.get_rate_limiter", lambda: limiter)
+        client = AsyncPolygonClient(api_key="test", http_cache=Cache(str(tmp_path / "cache.sqlite"), 1 << 20))
+        client.BASE_URL = server.base
+
+        async def run():
+            async with client:
+                await client.list_contracts("TST", expiration_date__gte="2024-01-01")
+            return threading.get_ident()
+        loop_thread = asyncio.run(run())
+        assert len(threads) >= 3 and loop_thread not in threads
+
+    def test_run_sync_inside_running_loop(self, server):
+        async def handler():
+            # e.g. an async web endpoint calling a sync provider method
+            return make_client(server).get_current_iv_sync("TST", current_price=SPOT)
+        assert math.isclose(asyncio.run(handler()), SIGMA, rel_tol=1e-3)
+
+    def test_run_sync_propagates_errors(self):
+        async def boom():
+            raise ValueError("nope")
+        with pytest.raises(ValueError):
+            run_sync(boom())
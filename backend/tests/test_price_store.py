@@ -0,0 +1,136 @@
+import pytest
+import numpy as np
+import pandas as pd
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import patch
+from data_provider import YFinanceProvider
+from price_store import PriceStore, update_store, period_start, last_closed_session
+
+def bars(index, seed=1):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index))))
+    return pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+                         "Volume": rng.integers(1_000, 5_000, len(index)).astype(float),
+                         "Dividends": 0.0, "Stock Splits": 0.0}, index=pd.DatetimeIndex(index, name="Date"))
+
+class FakeYahoo:
+    """yf.download stand-in serving each symbol's adjusted bars for start <= day < end."""
+
+    def __init__(self, histories):
+        self.histories = histories
+        self.calls = []
+
+    def __call__(self, symbols, start=None, end=None, **kwargs):
+        self.calls.append((list(symbols), str(start)))
+        frames = {}
+        for s in symbols:
+            h = self.histories.get(s)
+            if h is not None:
+                frames[s] = h[(h.index >= pd.Timestamp(start)) & (h.index < pd.Timestamp(end))]
+        if not frames:
+            return pd.DataFrame()
+        wide = pd.concat(frames, axis=1, sort=True).swaplevel(axis=1)
+        wide.columns.names = ["Price", "Ticker"]
+        return wide
+
+INDEX = pd.bdate_range("2024-03-01", periods=40)
+
+@pytest.fixture
+def yahoo():
+    fake = FakeYahoo({"AAA": bars(INDEX, 1), "BBB": bars(INDEX, 2)})
+    with patch("bulk_history.yf.download", fake):
+        yield fake
+
+def day(i):
+    return INDEX[i].date()
+
+class TestUpdateStore:
+    def test_initial_load_then_daily_append(self, tmp_path, yahoo):
+        store = PriceStore(str(tmp_path))
+        assert update_store(store, ["AAA", "BBB", "MISSING"], through=day(19)) == \
+            {"loaded": 2, "appended": 0, "refetched": 0, "current": 0, "failed": 1}
+        assert store.last_date("AAA") == INDEX[19].strftime("%Y-%m-%d")
+
+        # Next day: one bulk download from the last stored bar, one new bar appended per symbol
+        yahoo.calls.clear()
+        counts = update_store(store, ["AAA", "BBB"], through=day(20))
+        assert counts["appended"] == 2
+        assert yahoo.calls == [(["AAA", "BBB"], INDEX[19].strftime("%Y-%m-%d"))]
+        assert len(list((tmp_path / "AAA").glob("part-*.parquet"))) == 2
+        expected = yahoo.histories["AAA"].iloc[:21]
+        pd.testing.assert_frame_equal(store.read("AAA"), expected, check_freq=False, check_index_type=False)
+
+        # Re-running the same day downloads nothing
+        yahoo.calls.clear()
+        assert update_store(store, ["AAA", "BBB"], through=day(20))["current"] == 2
+        assert yahoo.calls == []
+
+    def test_dividend_readjusts_history(self, tmp_path, yahoo):
+        store = PriceStore(str(tmp_path))
+        update_store(store, ["AAA", "BBB"], through=day(19))
+
+        # BBB goes ex-dividend on day 20: Yahoo scales every earlier bar
+        adjusted = yahoo.histories["BBB"].copy()
+        adjusted.iloc[:20, :4] *= 0.99
+        adjusted.iloc[20, adjusted.columns.get_loc("Dividends")] = 1.0
+        yahoo.histories["BBB"] = adjusted
+        yahoo.calls.clear()
+
+        counts = update_store(store, ["AAA", "BBB"], through=day(20))
+        assert counts["appended"] == 1 and counts["refetched"] == 1
+        assert [symbols for symbols, _ in yahoo.calls] == [["AAA", "BBB"], ["BBB"]]
+        pd.testing.assert_frame_equal(store.read("BBB"), adjusted.iloc[:21], check_freq=False, check_index_type=False)
+        assert len(list((tmp_path / "BBB").glob("part-*.parquet"))) == 1
+
+    def test_parts_are_compacted(self, tmp_path, yahoo):
+        store = PriceStore(str(tmp_path))
+        update_store(store, ["AAA"], through=day(19))
+        with patch("price_store.COMPACT_AFTER", 3):
+            for i in range(21, 25):
+                update_store(store, ["AAA"], through=day(i - 1))
+        assert len(list((tmp_path / "AAA").glob("part-*.parquet"))) <= 3
+        pd.testing.assert_frame_equal(store.read("AAA"), yahoo.histories["AAA"].iloc[:24], check_freq=False, check_index_type=False)
+
+    def test_projected_range_read(self, tmp_path, yahoo):
+        store = PriceStore(str(tmp_path))
+        update_store(store, ["AAA"], through=day(29))
+        df = store.read("AAA", columns=["Close"], start=day(5), end=day(9))
+        assert list(df.columns) == ["Close"]
+        assert list(df.index) == list(INDEX[5:10])
+        assert store.read("NOPE").empty
+
+def test_last_closed_session():
+    from price_store import MARKET_TZ
+    assert last_closed_session(datetime(2024, 6, 3, 15, 59, tzinfo=MARKET_TZ)) == date(2024, 6, 2)
+    assert last_closed_session(datetime(2024, 6, 3, 16, 45, tzinfo=MARKET_TZ)) == date(2024, 6, 3)
+    # 21:00 UTC is 17:00 in New York
+    assert last_closed_session(datetime(2024, 6, 3, 21, 0, tzinfo=timezone.utc)) == date(2024, 6, 3)
+
+def test_period_start():
+    assert period_start("1y", date(2024, 6, 3)) == date(2023, 6, 3)
+    assert period_start("6mo", date(2024, 6, 3)) == date(2023, 12, 3)
+    assert period_start("max", date(2024, 6, 3)) is None
+
+class TestProviderReadsStore:
+    def test_history_from_fresh_store(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("data_provider.PRICE_STORE_DIR", str(tmp_path))
+        today, closed = date.today(), last_closed_session()
+        index = pd.bdate_range(end=closed, periods=300)
+        store = PriceStore(str(tmp_path))
+        with patch("bulk_history.yf.download", FakeYahoo({"AAA": bars(index)})):
+            update_store(store, ["AAA"])
+
+        provider = YFinanceProvider()
+        with patch("data_provider._yf_ticker") as ticker:
+            hist = provider.get_history("AAA", period="1y")
+            gap = provider.get_history_range("AAA", index[-5].date(), closed + timedelta(days=1))
+            ticker.assert_not_called()
+        assert hist.index[0] >= pd.Timestamp(period_start("1y", today))
+        assert hist.index[-1] == index[-1]
+        assert list(gap.index) == list(index[-5:])
+
+        # Not synced through the last closed session: back to Yahoo
+        store.mark_synced({"AAA": store.last_date("AAA")}, closed - timedelta(days=1))
+        with patch("data_provider._yf_ticker") as ticker:
+            provider.get_history("AAA", period="1y")
+            ticker.assert_called_once_with("AAA")
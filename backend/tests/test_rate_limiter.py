@@ -0,0 +1,76 @@
+import pytest
+import time
+import asyncio
+import multiprocessing
+from unittest.mock import patch
+from rate_limiter import TokenBucketLimiter, polygon_bucket
+
+def _worker(path, n, queue):
+    limiter = TokenBucketLimiter(path, {"polygon.aggs": (20.0, 1.0)})
+    queue.put(sum(limiter.acquire("polygon.aggs") for _ in range(n)))
+
+class TestTokenBucketLimiter:
+    def test_bucket_classes(self):
+        assert polygon_bucket("/v2/aggs/ticker/O:X/range/1/day/2024-01-01/2024-02-01") == "polygon.aggs"
+        assert polygon_bucket("/v3/snapshot/options/AAPL?cursor=abc") == "polygon.snapshot"
+        assert polygon_bucket("/v2/snapshot/locale/us/markets/options/tickers/O:X") == "polygon.snapshot"
+        assert polygon_bucket("/v3/reference/options/contracts") == "polygon.reference"
+
+    def test_burst_then_paced(self, tmp_path):
+        limiter = TokenBucketLimiter(str(tmp_path / "rl.sqlite"), {"a": (50.0, 3.0), "b": (50.0, 3.0)})
+        waits = [limiter.reserve("a") for _ in range(5)]
+        # Burst of 3 goes immediately, then one slot every 1/50 s
+        assert waits[:3] == [0.0, 0.0, 0.0]
+        assert waits[3] == pytest.approx(0.02, abs=5e-3)
+        assert waits[4] == pytest.approx(0.04, abs=5e-3)
+        # Budgets are independent; unknown buckets are not limited
+        assert limiter.reserve("b") == 0.0
+        assert limiter.reserve("unlisted") == 0.0
+
+        stats = limiter.stats()
+        assert stats["a"]["acquired"] == 5
+        assert stats["a"]["waited_s"] == pytest.approx(sum(waits))
+
+    def test_clock_read_under_the_lock(self, tmp_path):
+        limiter = TokenBucketLimiter(str(tmp_path / "rl.sqlite"), {"a": (50.0, 3.0)})
+        conn, events = limiter._conn(), []
+
+        class Spy:
+            def execute(self, sql, *args):
+                events.append(sql.split()[0])
+                return conn.execute(sql, *args)
+
+        def clock():
+            events.append("clock")
+            return 1000.0
+        with patch.object(limiter, "_conn", return_value=Spy()), patch("rate_limiter.time.time", clock):
+            limiter.reserve("a")
+        assert events.index("BEGIN") < events.index("clock")
+
+    def test_async_acquire_waits(self, tmp_path):
+        limiter = TokenBucketLimiter(str(tmp_path / "rl.sqlite"), {"a": (20.0, 1.0)})
+
+        async def run():
+            start = time.perf_counter()
+            await asyncio.gather(*(limiter.acquire_async("a") for _ in range(4)))
+            return time.perf_counter() - start
+        # Burst of 1, then 3 more at 20/s
+        assert asyncio.run(run()) >= 0.14
+
+    def test_shared_across_processes(self, tmp_path):
+        path = str(tmp_path / "rl.sqlite")
+        TokenBucketLimiter(path, {})  # create schema up front
+        ctx = multiprocessing.get_context("spawn")
+        queue = ctx.Queue()
+        start = time.perf_counter()
+        procs = [ctx.Process(target=_worker, args=(path, 4, queue)) for _ in range(2)]
+        for p in procs: p.start()
+        for p in procs: p.join(30)
+        elapsed = time.perf_counter() - start
+        waited = queue.get() + queue.get()
+
+        # 8 requests at 20/s with a burst of 1 need at least 7/20 s, whichever process sends them
+        stats = TokenBucketLimiter(path, {}).stats()
+        assert stats["polygon.aggs"]["acquired"] == 8
+        assert elapsed >= 0.35
+        assert waited > 0
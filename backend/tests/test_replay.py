@@ -0,0 +1,154 @@
+import pytest
+import json
+import asyncio
+import requests
+from unittest.mock import patch
+from curl_cffi import requests as curl_requests
+import replay
+from data_provider import PolygonProvider
+from http_session import _PacedSession
+from polygon_async import AsyncPolygonClient
+from utils import http_status
+from replay import (ResponseArchive, RecordingTape, ReplayTape, RecordingNewsFetcher, ReplayNewsFetcher,
+                    ReplayMiss, ReplayedError)
+
+TICKER = {"results": {"ticker": "AAA", "market_cap": 5_000_000_000}}
+SNAPSHOT = {"ticker": {"day": {"c": 101.5}}}
+
+def http_response(status, body):
+    resp = requests.Response()
+    resp.status_code, resp._content = status, json.dumps(body).encode()
+    return resp
+
+def polygon_upstream(method, url, params=None, **kwargs):
+    """requests.Session.request standing in for Polygon: two endpoints for AAA, 404 otherwise."""
+    assert params["apiKey"]
+    if url.endswith("/v3/reference/tickers/AAA"):
+        return http_response(200, TICKER)
+    if url.endswith("/v2/snapshot/locale/us/markets/stocks/tickers/AAA"):
+        return http_response(200, SNAPSHOT)
+    return http_response(404, {"status": "NOT_FOUND"})
+
+class FakeTiingo:
+    def __init__(self, articles):
+        self.articles = articles
+
+    async def fetch_news_batch(self, session, tickers):
+        return [a for a in self.articles if set(a["tickers"]) & {t.lower() for t in tickers}]
+
+@pytest.fixture
+def archive(tmp_path):
+    yield ResponseArchive(str(tmp_path / "replay.sqlite"))
+    replay.uninstall()
+
+class TestPolygonReplay:
+    def test_record_then_replay(self, archive):
+        replay.install(RecordingTape(archive))
+        with patch("requests.Session.request", side_effect=polygon_upstream) as upstream, \
+             patch("data_provider.get_rate_limiter", return_value=None):
+            provider = PolygonProvider()
+            assert provider.http_cache is None  # every request reaches the tape
+            recorded = provider.get_ticker_details("AAA")
+            with pytest.raises(requests.HTTPError):
+                provider._get_json("/v3/reference/tickers/GONE")
+        assert upstream.call_count == 3
+        assert archive.stats()["api.polygon.io"]["calls"] == 3
+
+        # The provider's own parsing runs again on the recorded bodies, offline
+        replay.install(ReplayTape(archive))
+        with patch("requests.Session.request", side_effect=AssertionError("network used")):
+            provider = PolygonProvider()
+            assert provider.get_ticker_details("AAA") == recorded == {
+                "symbol": "AAA", "current_price": 101.5, "market_cap": 5_000_000_000, "total_revenue": None}
+            with pytest.raises(requests.HTTPError) as err:
+                provider._get_json("/v3/reference/tickers/GONE")
+            assert http_status(err.value) == 404
+            # Not recorded: a miss, not the nearest recorded response (and not retried)
+            with pytest.raises(ReplayMiss):
+                provider._get_json("/v3/reference/tickers/AAA", {"date": "2024-06-10"})
+        assert replay.current_tape().stats == {"hit": 3, "miss": 1}
+
+    def test_async_client_replays(self, archive):
+        with patch("requests.Session.request", side_effect=polygon_upstream), \
+             patch("data_provider.get_rate_limiter", return_value=None):
+            replay.install(RecordingTape(archive))
+            PolygonProvider()._get_json("/v3/reference/tickers/AAA")
+
+        # Recorded by the sync provider, replayed to the async client: same request key
+        replay.install(ReplayTape(archive))
+        archive.put("api.polygon.io", replay.request_key("GET", "https://api.polygon.io/v2/aggs/X", {}), 403, b"{}")
+        archive.put("api.polygon.io", replay.request_key("GET", "https://api.polygon.io/v2/aggs/Y", {}), 0,
+                    b"ClientConnectorError: reset")
+
+        async def run():
+            async with AsyncPolygonClient(http_cache=None) as client:
+                data = await client._get_json("/v3/reference/tickers/AAA")
+                with pytest.raises(Exception) as forbidden:
+                    await client._fetch_json("/v2/aggs/X", {})
+                with pytest.raises(ReplayedError, match="reset"):
+                    await client._fetch_json("/v2/aggs/Y", {})
+                return data, forbidden.value
+        data, forbidden = asyncio.run(run())
+        assert data == TICKER
+        assert http_status(forbidden) == 403
+
+    def test_recorded_latency(self, archive):
+        archive.put("api.polygon.io", replay.request_key("GET", "https://api.polygon.io/x", {"a": 1}), 200, b"{}",
+                    latency=0.2)
+        with patch("replay.time.sleep") as sleep:
+            ReplayTape(archive).replay("GET", "https://api.polygon.io/x", {"a": 1})
+            sleep.assert_not_called()
+            ReplayTape(archive, latency_scale=0.5).replay("GET", "https://api.polygon.io/x", {"a": 1})
+            sleep.assert_called_once_with(pytest.approx(0.1))
+
+class TestYahooReplay:
+    def test_session_taped_without_crumb(self, archive):
+        url = "https://query2.finance.yahoo.com/v10/finance/quoteSummary/AAA"
+        upstream = curl_requests.Response()
+        upstream.status_code, upstream.content = 200, b'{"quoteSummary": {"result": [{"price": {}}]}}'
+
+        replay.install(RecordingTape(archive))
+        with patch("curl_cffi.requests.Session.request", return_value=upstream), \
+             patch("http_session.get_rate_limiter", return_value=None):
+            _PacedSession().get(url, params={"modules": "price", "crumb": "abc"})
+
+        # A new Yahoo session gets a new crumb; the request still matches
+        replay.install(ReplayTape(archive))
+        with patch("curl_cffi.requests.Session.request", side_effect=AssertionError("network used")):
+            resp = _PacedSession().get(url, params={"modules": "price", "crumb": "xyz"})
+            assert resp.json() == {"quoteSummary": {"result": [{"price": {}}]}}
+            with pytest.raises(ReplayMiss):
+                _PacedSession().get(url, params={"modules": "summaryDetail"})
+
+class TestNewsReplay:
+    def test_articles_replayed_per_ticker(self, archive):
+        articles = [{"id": 1, "title": "AAA beats", "tickers": ["aaa"]},
+                    {"id": 2, "title": "AAA and BBB merge", "tickers": ["aaa", "bbb"]},
+                    {"id": 3, "title": "CCC recall", "tickers": ["ccc"]}]
+        recorder = RecordingNewsFetcher(FakeTiingo(articles), archive)
+        asyncio.run(recorder.fetch_news_batch(None, ["AAA", "BBB"]))
+        asyncio.run(recorder.fetch_news_batch(None, ["CCC"]))
+
+        # Batched differently than when recorded
+        replayer = ReplayNewsFetcher(archive)
+        got = asyncio.run(replayer.fetch_news_batch(None, ["BBB", "CCC"]))
+        assert sorted(a["id"] for a in got) == [2, 3]
+        assert asyncio.run(replayer.fetch_news_batch(None, ["ZZZ"])) == []
+
+class TestProviderFactory:
+    def test_modes(self, tmp_path, monkeypatch, archive):
+        from ingest import make_provider, make_news_fetcher
+        from data_provider import HybridProvider
+        monkeypatch.setattr("ingest.REPLAY_ARCHIVE", str(tmp_path / "run.sqlite"))
+        ResponseArchive(str(tmp_path / "run.sqlite")).put_symbols(["AAA", "BBB"])
+
+        assert isinstance(make_provider("replay"), HybridProvider)
+        assert isinstance(replay.current_tape(), ReplayTape) and replay.replaying()
+        assert replay.current_tape().archive.symbols() == ["AAA", "BBB"]
+        assert isinstance(make_news_fetcher("replay"), ReplayNewsFetcher)
+
+        make_provider("record")
+        assert isinstance(replay.current_tape(), RecordingTape) and not replay.replaying()
+        assert make_news_fetcher("live") is None
+        with pytest.raises(ValueError):
+            make_provider("bogus")
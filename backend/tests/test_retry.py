@@ -50,3 +50,120 @@ class TestRetry:
         # 3. x=2. Call. Fail. x==2 -> Raise.
         # Total calls = 3.
         assert mock_func.call_count == 3
+
+class HTTPError(Exception):
+    """requests-style HTTP error: status and headers on .response"""
+    def __init__(self, status, headers=None):
+        super().__init__(f"HTTP {status}")
+        self.response = Mock(status_code=status, headers=headers or {})
+
+class TestRetryPolicy:
+    def make_policy(self, **kwargs):
+        from utils import RetryPolicy
+        kwargs.setdefault("retries", 3)
+        kwargs.setdefault("backoff_in_seconds", 0.01)
+        return RetryPolicy("test", **kwargs)
+
+    def test_classification(self):
+        from utils import is_retryable
+        assert is_retryable(HTTPError(429))
+        assert is_retryable(HTTPError(503))
+        assert is_retryable(ConnectionError("reset"))
+        assert is_retryable(TimeoutError())
+        assert not is_retryable(HTTPError(404))
+        assert not is_retryable(HTTPError(401))
+        assert not is_retryable(ValueError("Expecting value: line 1 column 1"))
+        assert not is_retryable(KeyError("regularMarketPrice"))
+
+    def test_fatal_errors_not_retried(self):
+        mock_func = Mock(side_effect=HTTPError(404))
+        mock_func.__name__ = "mock_func"
+        with pytest.raises(HTTPError):
+            self.make_policy()(mock_func)()
+        assert mock_func.call_count == 1
+
+    @patch("utils.time.sleep")
+    def test_honors_retry_after(self, mock_sleep):
+        mock_func = Mock(side_effect=[HTTPError(429, {"Retry-After": "7"}), "ok"])
+        mock_func.__name__ = "mock_func"
+        assert self.make_policy()(mock_func)() == "ok"
+        mock_sleep.assert_called_once_with(7.0)
+
+    @patch("utils.time.sleep")
+    def test_backoff_is_capped(self, mock_sleep):
+        mock_func = Mock(side_effect=[HTTPError(503)] * 6 + ["ok"])
+        mock_func.__name__ = "mock_func"
+        policy = self.make_policy(retries=6, backoff_in_seconds=2, max_backoff=5, maximize_jitter=False)
+        assert policy(mock_func)() == "ok"
+        # 2, 4, then capped at 5 (+ up to 1s jitter)
+        assert all(call[0][0] <= 6 for call in mock_sleep.call_args_list)
+
+    def test_retry_budget(self):
+        from utils import RetryBudget
+        budget = RetryBudget(2)
+        mock_func = Mock(side_effect=HTTPError(503))
+        mock_func.__name__ = "mock_func"
+        with pytest.raises(HTTPError):
+            self.make_policy(retries=10, budget=budget)(mock_func)()
+        # First try + the 2 retries the budget allowed
+        assert mock_func.call_count == 3
+        assert budget.spent == 2
+
+    def test_retry_budget_refills_outside_a_run(self):
+        from utils import RetryBudget
+        budget = RetryBudget(1, refill_seconds=0.05)
+        assert budget.try_spend() and not budget.try_spend()
+        time.sleep(0.06)
+        assert budget.try_spend()
+
+        # A run's budget (a worker's share) does not refill
+        budget.start_run(2)
+        assert budget.try_spend() and budget.try_spend()
+        time.sleep(0.06)
+        assert not budget.try_spend()
+
+    def test_circuit_breaker_trips_and_recovers(self):
+        from utils import CircuitBreaker, CircuitOpenError
+        breaker = CircuitBreaker("test", window=10, min_calls=4, failure_ratio=0.5, cooldown=0.05)
+        policy = self.make_policy(retries=0, breaker=breaker)
+        failing = Mock(side_effect=HTTPError(503))
+        failing.__name__ = "failing"
+        for _ in range(4):
+            with pytest.raises(HTTPError):
+                policy(failing)()
+        assert breaker.is_open
+
+        healthy = Mock(return_value="ok")
+        healthy.__name__ = "healthy"
+        with pytest.raises(CircuitOpenError):
+            policy(healthy)()
+        assert healthy.call_count == 0
+
+        # After the cooldown one trial call goes through and closes the breaker
+        time.sleep(0.06)
+        assert policy(healthy)() == "ok"
+        assert not breaker.is_open
+
+    def test_fatal_errors_do_not_trip_breaker(self):
+        from utils import CircuitBreaker
+        breaker = CircuitBreaker("test", window=10, min_calls=2, failure_ratio=0.5)
+        missing = Mock(side_effect=HTTPError(404))
+        missing.__name__ = "missing"
+        for _ in range(5):
+            with pytest.raises(HTTPError):
+                self.make_policy(breaker=breaker)(missing)()
+        assert not breaker.is_open
+
+    def test_async_variant(self):
+        import asyncio
+        calls = []
+
+        @self.make_policy()
+        async def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise HTTPError(502)
+            return "ok"
+
+        assert asyncio.run(flaky()) == "ok"
+        assert len(calls) == 3
@@ -0,0 +1,74 @@
+import pytest
+import pandas as pd
+import numpy as np
+from unittest.mock import MagicMock, PropertyMock, patch
+from run_memo import RunMemo, run_scope, current_run, memoized
+
+class Source:
+    def __init__(self):
+        self.calls = 0
+
+    @memoized("info")
+    def info(self, symbol, extra=None):
+        self.calls += 1
+        if symbol == "BAD":
+            raise ValueError("upstream error")
+        return {"symbol": symbol, "extra": extra}
+
+class TestRunMemo:
+    def test_pass_through_outside_run(self):
+        source = Source()
+        source.info("AAA")
+        source.info("AAA")
+        assert source.calls == 2 and current_run() is None
+
+    def test_dedupes_within_run(self):
+        source, other = Source(), Source()
+        with run_scope() as memo:
+            first = source.info("AAA")
+            first["added_by_caller"] = 1
+            # Another instance, same request: answered from the memo, unaffected by the caller's edit
+            assert other.info("AAA") == {"symbol": "AAA", "extra": None}
+            source.info("AAA", extra=1)
+            with pytest.raises(ValueError):
+                source.info("BAD")
+            with pytest.raises(ValueError):
+                source.info("BAD")  # errors are retried, not memoized
+        assert source.calls + other.calls == 4
+        assert memo.stats() == {"info": {"calls": 2, "avoided": 1}}
+        assert current_run() is None
+
+class TestHybridProviderMemo:
+    def test_one_info_and_history_fetch_per_symbol(self):
+        from data_provider import HybridProvider
+        from screener import Screener
+        hist = pd.DataFrame({"Close": 100 * np.exp(np.cumsum(np.full(250, 0.001)))},
+                            index=pd.date_range("2024-01-01", periods=250, freq="B"))
+        info = PropertyMock(return_value={"currentPrice": 100.0, "marketCap": 5e10, "freeCashflow": 1e9})
+
+        provider = HybridProvider()
+        provider.poly = MagicMock()
+        provider.poly.get_iv_surface.return_value = None
+        provider.poly.get_iv_history.return_value = []
+        with patch("data_provider.yf.Ticker") as mock_ticker, patch("screener.ENABLE_IV_RANK", True), \
+             run_scope() as memo:
+            type(mock_ticker.return_value).info = info
+            mock_ticker.return_value.history.return_value = hist
+            mock_ticker.return_value.options = ()
+            Screener(provider).process_ticker("AAA", fetch_mode="full")
+
+        # Screener + hybrid provider both read details; Yahoo HV + IV backfill both read 1y history
+        assert info.call_count == 1
+        assert mock_ticker.return_value.history.call_count == 1
+        assert memo.stats()["info"] == {"calls": 1, "avoided": 1}
+        assert memo.stats()["history"] == {"calls": 1, "avoided": 1}
+
+def test_ingest_task_scopes_the_memo():
+    import ingest
+    screener = MagicMock()
+    screener.process_ticker.side_effect = lambda ticker, **kwargs: {"seen": current_run() is not None}
+    with patch("ingest._get_worker_screener", return_value=screener):
+        details, counts = ingest.process_ticker_task("AAA")
+    # Active while the ticker is processed, dropped once the task returns
+    assert details == {"seen": True} and counts == {}
+    assert current_run() is None
@@ -0,0 +1,61 @@
+import pytest
+import numpy as np
+from datetime import date
+from iv_surface import IVSurface
+from svi import SVICalibrator, svi_total_variance
+
+TRUE_PARAMS = {
+    30: [0.005, 0.08, -0.5, 0.02, 0.10],
+    90: [0.015, 0.10, -0.4, 0.03, 0.15],
+    400: [0.060, 0.15, -0.3, 0.05, 0.25],
+}
+
+def svi_surface(as_of=date(2024, 1, 2), shift_days=0, noise=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+    days, strikes, ivs = [], [], []
+    k = np.linspace(-0.4, 0.3, 25)
+    for d, p in TRUE_PARAMS.items():
+        iv = np.sqrt(svi_total_variance(np.array(p), k) / (d / 365.0))
+        iv = iv * (1 + rng.normal(0, noise, k.size))
+        days += [d - shift_days] * k.size
+        strikes += list(100.0 * np.exp(k))
+        ivs += list(iv)
+    return IVSurface.from_quotes("SVI", 100.0, as_of, days, strikes, ivs)
+
+class TestSVICalibrator:
+    def test_fit_recovers_smiles(self, tmp_path):
+        surface = svi_surface()
+        fits, nfev = SVICalibrator(str(tmp_path)).fit(surface)
+
+        assert set(fits) == {30.0, 90.0, 400.0}
+        k = np.linspace(-0.3, 0.3, 7)
+        for d, params in fits.items():
+            expected = svi_total_variance(np.array(TRUE_PARAMS[int(d)]), k)
+            np.testing.assert_allclose(svi_total_variance(params, k), expected, rtol=1e-3)
+        assert nfev > 0
+
+    def test_warm_start_from_disk_converges_faster(self, tmp_path):
+        calibrator = SVICalibrator(str(tmp_path))
+        calibrator.smooth(svi_surface(noise=0.005, seed=1))
+        assert (tmp_path / "SVI.json").exists()
+
+        # Next day: same expiration dates, one day closer
+        tomorrow = svi_surface(as_of=date(2024, 1, 3), shift_days=1, noise=0.005, seed=2)
+        _, warm_nfev = calibrator.fit(tomorrow)
+        _, cold_nfev = calibrator.fit(tomorrow, warm_start=False)
+        assert warm_nfev < cold_nfev
+
+    def test_smooth_denoises_atm_and_skew(self, tmp_path):
+        clean = svi_surface()
+        noisy = svi_surface(noise=0.03, seed=3)
+        smoothed = SVICalibrator(str(tmp_path)).smooth(noisy)
+
+        assert abs(smoothed.iv30 - clean.iv30) < abs(noisy.iv30 - clean.iv30) + 1e-3
+        assert abs(smoothed.skew() - clean.skew()) < 0.01
+        assert smoothed.quotes is noisy.quotes
+
+    def test_thin_expiries_are_left_raw(self, tmp_path):
+        surface = IVSurface.from_quotes("THIN", 100.0, date(2024, 1, 2), [30, 30, 30], [90, 100, 110], [0.35, 0.3, 0.28])
+        smoothed = SVICalibrator(str(tmp_path)).smooth(surface)
+        assert smoothed is surface
+        assert not (tmp_path / "THIN.json").exists()
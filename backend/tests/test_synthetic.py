@@ -0,0 +1,122 @@
+import pytest
+import asyncio
+import numpy as np
+import pandas as pd
+from datetime import date, timedelta
+from unittest.mock import patch
+from options_lib import IVEstimator
+from screener import Screener
+from synthetic import (SyntheticMarket, SyntheticProvider, SyntheticNewsFetcher, SyntheticError,
+                       synthetic_symbols, listed_expirations)
+
+AS_OF = date(2024, 6, 3)
+
+@pytest.fixture
+def market():
+    return SyntheticMarket(seed=7)
+
+def large_cap(market, as_of=None):
+    """First generated symbol above the screener's market cap filter."""
+    return next(s for s in market.symbols(50) if market.fundamentals(s, as_of)["market_cap"] > 5e9)
+
+def test_symbols_distinct_and_stable():
+    symbols = synthetic_symbols(10_000)
+    assert len(set(symbols)) == 10_000
+    assert synthetic_symbols(100) == symbols[:100]
+    assert synthetic_symbols(100, seed=1) != symbols[:100]
+
+class TestMarket:
+    def test_history_is_stable_across_days(self, market):
+        bars = market.history("SYABCD", AS_OF)
+        later = SyntheticMarket(seed=7).history("SYABCD", AS_OF + timedelta(days=30))
+        assert bars.index[-1] < pd.Timestamp(AS_OF)
+        pd.testing.assert_frame_equal(later.loc[:bars.index[-1]], bars, check_freq=False)
+        assert (bars["High"] >= bars[["Open", "Close"]].max(axis=1)).all()
+        assert (bars["Low"] <= bars[["Open", "Close"]].min(axis=1)).all()
+
+    def test_fundamentals_follow_the_price(self, market):
+        symbol = large_cap(market, AS_OF)
+        d, p = market.fundamentals(symbol, AS_OF), market.profile(symbol)
+        assert d["current_price"] == market.history(symbol, AS_OF)["Close"].iloc[-1]
+        assert d["market_cap"] == pytest.approx(d["current_price"] * p["shares"])
+        if d["pe_ratio"] is not None:
+            assert d["pe_ratio"] == pytest.approx(d["current_price"] / d["trailing_eps"])
+        assert d["target_low"] < d["target_mean"] < d["target_high"]
+
+    def test_chain_prices_the_smile(self, market):
+        symbol = large_cap(market, AS_OF)
+        chain = market.chain(symbol, AS_OF)
+        assert set(chain.expirations) == {d.isoformat() for d in listed_expirations(AS_OF)}
+        assert (chain.bid <= chain.ask).all()
+
+        # Quotes solve back to the smile they were priced from
+        near = (np.abs(np.log(chain.strikes / chain.spot)) < 0.1) & (chain.days > 20)
+        solved = IVEstimator.impl_vol_batch(chain.mid[near], chain.spot, chain.strikes[near],
+                                            chain.days[near] / 365.0, is_call=chain.is_call[near])
+        np.testing.assert_allclose(solved, chain.iv[near], atol=0.03)
+
+        surface = chain.surface()
+        iv30 = market.iv30(symbol, market.history(symbol, AS_OF)).iloc[-1]
+        assert surface.iv30 == pytest.approx(iv30, abs=0.02)
+        # Put skew: downside strikes richer than upside
+        assert surface.iv(60, -0.2) > surface.iv(60, 0.0) > surface.iv(60, 0.2)
+
+    def test_news_is_fixed_per_day(self, market):
+        symbol = large_cap(market, AS_OF)
+        week = market.news(symbol, AS_OF)
+        next_day = market.news(symbol, AS_OF + timedelta(days=1))
+        assert week and all(a["tickers"] == [symbol.lower()] for a in week)
+        # The six days both windows share carry the same articles
+        shared = {a["id"] for a in week if a["publishedDate"] >= (AS_OF - timedelta(days=6)).isoformat()}
+        assert shared <= {a["id"] for a in next_day}
+
+class TestProvider:
+    def test_advanced_metrics_modes(self, market):
+        provider = SyntheticProvider(market)
+        symbol = large_cap(market)
+        full = provider.get_advanced_metrics(symbol, fetch_mode="full")
+        assert 240 <= len(full["iv_history"]) <= 262
+        assert 0.0 <= full["iv_rank"] <= 1.0
+        assert full["iv_short"] == pytest.approx(full["iv_history"][-1]["iv30"], abs=0.02)
+
+        since = date.today() - timedelta(days=10)
+        gap = provider.get_advanced_metrics(symbol, fetch_mode="gap", history_since=since)
+        assert all(row["date"] >= since.isoformat() for row in gap["iv_history"])
+        assert gap["iv30_current"] == gap["iv_history"][-1]["iv30"]
+
+        current = provider.get_advanced_metrics(symbol, fetch_mode="current")
+        assert "iv_history" not in current and current["iv30_current"]
+
+    def test_screener_end_to_end(self, market):
+        screener = Screener(SyntheticProvider(market))
+        details = screener.process_ticker(large_cap(market), sentiment_score=0.2)
+        assert details["iv_short"] and details["historical_volatility"]
+        assert 0 <= details["calculated_metrics"]["score"] <= 100
+
+    def test_leaps_candidates(self, market):
+        leaps = SyntheticProvider(market).get_leaps_candidates(large_cap(market))
+        assert leaps and all(0.80 <= c["delta"] <= 0.90 and c["days"] >= 365 for c in leaps)
+
+    def test_latency_and_errors(self, market):
+        with patch("synthetic.time.sleep") as sleep:
+            SyntheticProvider(market, latency=0.05).get_options_chain("SYABCD")
+            sleep.assert_called_once()
+        failing = SyntheticProvider(market, error_rate=1.0)
+        with pytest.raises(SyntheticError):
+            failing.get_ticker_details("SYABCD")
+        # The screener reports the failure and drops the ticker
+        assert Screener(failing).process_ticker("SYABCD") is None
+
+def test_news_fetcher(market):
+    symbols = market.symbols(20)
+    articles = asyncio.run(SyntheticNewsFetcher(market).fetch_news_batch(None, symbols))
+    assert {t for a in articles for t in a["tickers"]} <= {s.lower() for s in symbols}
+    assert asyncio.run(SyntheticNewsFetcher(market, error_rate=1.0).fetch_news_batch(None, symbols)) == []
+
+def test_factory():
+    from ingest import make_provider, make_news_fetcher
+    with patch("ingest.SYNTHETIC_SYMBOLS", 25):
+        provider = make_provider("synthetic")
+    assert isinstance(provider, SyntheticProvider)
+    assert len(provider.symbols()) == 25
+    assert isinstance(make_news_fetcher("synthetic"), SyntheticNewsFetcher)
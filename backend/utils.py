@@ -1,7 +1,15 @@
+import os
 import time
+import email.utils
+import asyncio
 import random
 import functools
+import threading
+import collections
 import logging
+from datetime import datetime, timezone
+
+import aiohttp
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -43,3 +51,249 @@ def retry_with_backoff(retries=3, backoff_in_seconds=1, maximize_jitter=False):
                     x += 1
         return wrapper
     return decorator
+
+# --- Retry policy ---
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+class CircuitBreaker:
+    """
+    Trips when too many recent calls to one provider failed with retryable
+    errors, then rejects calls for cooldown seconds. After the cooldown a single
+    trial call is let through: success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(self, name: str, window: int = 50, min_calls: int = 20, failure_ratio: float = 0.5,
+                 cooldown: float = 60.0):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.cooldown = cooldown
+        self._outcomes = collections.deque(maxlen=window)  # True = failure
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.cooldown:
+                # Half-open: let this call probe the provider
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._outcomes.append(False)
+            if self._opened_at is not None:
+                logger.info(f"Circuit breaker {self.name} closed")
+                self._opened_at = None
+                self._outcomes.clear()
+
+    def record_failure(self):
+        with self._lock:
+            self._outcomes.append(True)
+            failures = sum(self._outcomes)
+            if (self._opened_at is None and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_ratio):
+                logger.error(f"Circuit breaker {self.name} opened: {failures}/{len(self._outcomes)} recent calls failed")
+                self._opened_at = time.monotonic()
+            elif self._opened_at is not None:
+                self._opened_at = time.monotonic()
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Process-wide breaker per provider name."""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+class RetryBudget:
+    """
+    Caps the number of retries across all providers and threads of one process.
+    Ingestion starts a run in each worker process with its share of
+    RETRY_BUDGET_PER_RUN, so the whole run stays under the setting. A process
+    that never starts a run (the API server) gets a fresh budget every
+    refill_seconds instead of running dry for good.
+    """
+
+    def __init__(self, max_retries: int, refill_seconds: float = 3600.0):
+        self.max_retries = max_retries
+        self.refill_seconds = refill_seconds
+        self.spent = 0
+        self._in_run = False
+        self._since = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if not self._in_run and time.monotonic() - self._since >= self.refill_seconds:
+                self.spent, self._since = 0, time.monotonic()
+            if self.spent >= self.max_retries:
+                return False
+            self.spent += 1
+            return True
+
+    def start_run(self, max_retries: int = None):
+        """A full budget (max_retries, if given) that lasts until the process exits."""
+        with self._lock:
+            if max_retries is not None:
+                self.max_retries = max_retries
+            self.spent = 0
+            self._in_run = True
+
+    def reset(self):
+        with self._lock:
+            self.spent, self._since = 0, time.monotonic()
+
+RETRY_BUDGET_PER_RUN = int(os.getenv("RETRY_BUDGET_PER_RUN", "1000"))
+RETRY_BUDGET = RetryBudget(RETRY_BUDGET_PER_RUN)
+
+# HTTP statuses worth retrying; any other 4xx is permanent (404 for a delisted symbol, 401, ...)
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+# Third-party exceptions classified by name, so this module needn't import them
+FATAL_EXCEPTION_NAMES = {"YFTickerMissingError", "YFPricesMissingError", "YFTzMissingError",
+                         "YFInvalidPeriodError", "YFNotImplementedError",
+                         "ReplayMiss", "ReplayedError"}  # a replay answers the same way every time
+RETRYABLE_EXCEPTION_NAMES = {"YFRateLimitError"}
+
+def http_status(exc: Exception):
+    """Status code of an HTTP error from requests, curl_cffi or aiohttp, else None."""
+    status = getattr(exc, "status", None)  # aiohttp.ClientResponseError
+    if isinstance(status, int):
+        return status
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+def is_retryable(exc: Exception) -> bool:
+    """
+    Transient errors (throttling, 5xx, timeouts, dropped connections) are
+    retryable. Other 4xx responses, missing-symbol errors and parse errors are not.
+    """
+    name = type(exc).__name__
+    if name in RETRYABLE_EXCEPTION_NAMES:
+        return True
+    if name in FATAL_EXCEPTION_NAMES:
+        return False
+    status = http_status(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    if isinstance(exc, (ValueError, KeyError, TypeError, AttributeError, IndexError)):
+        # Includes JSON decode errors
+        return False
+    return isinstance(exc, (OSError, asyncio.TimeoutError, aiohttp.ClientError))
+
+def retry_after_seconds(exc: Exception):
+    """Seconds from a Retry-After header (delta or HTTP date) on an HTTP error, else None."""
+    headers = getattr(exc, "headers", None) or getattr(getattr(exc, "response", None), "headers", None)
+    value = headers.get("Retry-After") if headers else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+class RetryPolicy:
+    """
+    Retry decorator for sync and async functions that share one policy.
+
+    Only retryable errors (see is_retryable) are retried. The wait is the
+    server's Retry-After when given, else capped exponential backoff with
+    jitter. Each retry draws from a per-run RetryBudget. Retryable failures
+    feed the provider's CircuitBreaker, and an open breaker fails calls
+    immediately with CircuitOpenError.
+    """
+
+    def __init__(self, name: str, retries: int = 3, backoff_in_seconds: float = 1, max_backoff: float = 30,
+                 maximize_jitter: bool = True, max_retry_after: float = 120,
+                 budget: RetryBudget = None, breaker: CircuitBreaker = None, classify=is_retryable):
+        self.name = name
+        self.retries = retries
+        self.backoff_in_seconds = backoff_in_seconds
+        self.max_backoff = max_backoff
+        self.maximize_jitter = maximize_jitter
+        self.max_retry_after = max_retry_after
+        self.budget = budget
+        self.breaker = breaker
+        self.classify = classify
+
+    def _before_call(self):
+        if self.breaker is not None and not self.breaker.allow():
+            raise CircuitOpenError(f"{self.name} circuit breaker is open")
+
+    def _on_success(self):
+        if self.breaker is not None:
+            self.breaker.record_success()
+
+    def _on_failure(self, exc: Exception, attempt: int, func_name: str):
+        """Returns the seconds to wait before the next attempt, or re-raises exc."""
+        retryable = self.classify(exc)
+        if retryable and self.breaker is not None:
+            self.breaker.record_failure()
+        if not retryable:
+            logger.warning(f"{func_name} failed with non-retryable {type(exc).__name__}: {exc}")
+            raise exc
+        if attempt >= self.retries:
+            logger.error(f"Function {func_name} failed after {self.retries} retries. Final error: {exc}")
+            raise exc
+        if self.budget is not None and not self.budget.try_spend():
+            logger.error(f"Retry budget exhausted; not retrying {func_name}: {exc}")
+            raise exc
+
+        delay = retry_after_seconds(exc)
+        if delay is not None:
+            delay = min(delay, self.max_retry_after)
+        else:
+            delay = min(self.max_backoff, self.backoff_in_seconds * 2 ** attempt)
+            delay = random.uniform(0, delay) if self.maximize_jitter else delay + random.uniform(0, 1)
+        logger.warning(f"Error in {func_name}: {exc}. Retrying in {delay:.2f}s... (Attempt {attempt+1}/{self.retries})")
+        return delay
+
+    def __call__(self, func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                attempt = 0
+                while True:
+                    self._before_call()
+                    try:
+                        result = await func(*args, **kwargs)
+                    except Exception as e:
+                        await asyncio.sleep(self._on_failure(e, attempt, func.__name__))
+                        attempt += 1
+                        continue
+                    self._on_success()
+                    return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            attempt = 0
+            while True:
+                self._before_call()
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as e:
+                    time.sleep(self._on_failure(e, attempt, func.__name__))
+                    attempt += 1
+                    continue
+                self._on_success()
+                return result
+        return wrapper